@@ -14,6 +14,10 @@ Update-AppveyorBuild -Version $buildTag
 
 conda activate $env:APPVEYOR_PROJECT_NAME
 
+# Run tests (benchmarks are run once each, without timing).
+python -m pytest -q --benchmark-disable dinner_daily_helpers
+if ($LASTEXITCODE) { throw "Tests failed." }
+
 python -m dinner_daily_helpers.download current .
 foreach ($menu in $(dir ????-??-??-weekly-menu-Any?Store.html)) { 
     echo $menu;
@@ -19,7 +19,7 @@ if ($env:CONDA_EXTRA_CHANNELS) {
 }
 
 # Create new project environment
-conda create -n $env:APPVEYOR_PROJECT_NAME pandoc $(cat .\requirements.txt)
+conda create -n $env:APPVEYOR_PROJECT_NAME "python=$env:PYTHON_VERSION" pandoc $(cat .\requirements.txt)
 if ($LASTEXITCODE) { throw "Failed to create build Conda environment." }
 
 conda activate $env:APPVEYOR_PROJECT_NAME
@@ -1,48 +1,401 @@
 # -*- coding: utf-8 -*-
 from __future__ import print_function, unicode_literals
-import itertools as it
+import collections
+import functools
+import inspect
 import re
+import threading
+import tokenize
 
-import bs4
-import pandas as pd
-import pint
+from . import profiling
 
+#: Non-default units used by Dinner Daily.
+CUSTOM_UNITS = ('bulb', 'bunch', 'head', 'loaf', 'package')
+#: Unit abbreviations used by Dinner Daily, mapped to the unit each is an
+#: alias of (only defined if not already defined by ``pint``).
+UNIT_ALIASES = {'tbs': 'tablespoon', 'Tbs': 'tablespoon', 'pkg': 'package'}
 
-ureg = pint.UnitRegistry(system='cgs')
+# Unit registry is slow to build, so it is created on first use (see
+# `get_ureg()`) rather than on import.
+_ureg = None
+_ureg_lock = threading.Lock()
 
-# Add non-default units used by Dinner Daily.
-ureg.define('bulb = []')
-ureg.define('bunch = []')
-ureg.define('head = []')
-ureg.define('loaf = []')
-ureg.define('package = []')
 
+def get_ureg():
+    '''
+    Returns
+    -------
+    pint.UnitRegistry
+        Unit registry (``cgs`` system) with :data:`CUSTOM_UNITS` and
+        :data:`UNIT_ALIASES` defined.  Created on first call; also available
+        as ``ureg`` module attribute.
+
+        Also set as ``pint`` application registry, so quantities (e.g., in
+        tables returned by :func:`get_section_ingredients`) can be unpickled,
+        e.g., in worker processes (which must call :func:`get_ureg` first,
+        e.g., as process pool initializer).
+    '''
+    global _ureg
+
+    with _ureg_lock:
+        if _ureg is None:
+            import pint
+
+            ureg = pint.UnitRegistry(system='cgs')
+            # Add non-default units used by Dinner Daily.
+            for unit_i in CUSTOM_UNITS:
+                ureg.define('%s = []' % unit_i)
+            for alias_i, unit_i in sorted(UNIT_ALIASES.items()):
+                if alias_i not in ureg:
+                    ureg.define('@alias %s = %s' % (unit_i, alias_i))
+            pint.set_application_registry(ureg)
+            _ureg = ureg
+    return _ureg
+
+
+def __getattr__(name):
+    # Create `ureg` on first access (see PEP 562).
+    if name == 'ureg':
+        return get_ureg()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
+
+
+@functools.lru_cache(maxsize=4096)
+def is_unit(token):
+    '''
+    Parameters
+    ----------
+    token : str
+        Unit token, e.g., ``"cups"``, ``"bunch"``, or ``"tbs"``.
+
+    Returns
+    -------
+    bool
+        ``True`` if :data:`token` is defined in the unit registry (including
+        plural and prefixed forms and :data:`CUSTOM_UNITS`).  ``False`` if
+        :data:`token` is not a unit, including if it cannot be parsed (e.g.,
+        ``"(15"``, ``"lb/"`` or ``"15-oz"``).
+
+        Lookups are memoized, since the same few unit tokens are used in
+        every menu.
+    '''
+    if token in CUSTOM_UNITS:
+        return True
+    try:
+        get_ureg().parse_expression(token)
+    except _parse_errors():
+        return False
+    return True
+
+
+def _parse_errors():
+    '''
+    Returns
+    -------
+    tuple
+        Errors raised by ``pint`` when parsing an invalid expression, e.g.,
+        unbalanced parentheses (``TokenError``), a dangling operator
+        (``AssertionError`` raised by the ``pint`` expression parser), or an
+        arithmetic error (e.g., ``"15-oz"`` or ``"lb/0"``).
+    '''
+    import pint.errors
+
+    return (pint.errors.PintError, tokenize.TokenError, ArithmeticError,
+            AssertionError, AttributeError, TypeError, ValueError)
+
+
+#: Maximum number of distinct quantity strings memoized by
+#: :func:`parse_quantity` and :func:`parse_base_quantity`.
+QUANTITY_CACHE_SIZE = 2048
+#: Mixed number, e.g., ``"1 1/2"`` (which ``pint`` would otherwise parse as
+#: ``1 * 1/2``).
+CRE_MIXED_NUMBER = re.compile(r'^\s*(\d+)\s+(\d+)/(\d+)')
 
-def get_staple_ingredients(html):
-    soup = bs4.BeautifulSoup(html, 'html5lib')
+
+@functools.lru_cache(maxsize=QUANTITY_CACHE_SIZE)
+def parse_quantity(quantity):
+    '''
+    Parameters
+    ----------
+    quantity : str
+        Quantity, e.g., ``"3/4 lb"``, ``"1 1/2 cups"`` or ``"1 bunch"``.
+
+    Returns
+    -------
+    pint.Quantity or float
+        Parsed quantity (or number, if no unit was specified).
+
+        Results are memoized (see :func:`quantity_cache_info`) and shared
+        between callers, so they must **not** be modified in place.
+
+    .. versionchanged:: X.X.X
+        Parse mixed numbers, e.g., ``"1 1/2 cups"`` as ``3/2 cups``.
+    '''
+    match = CRE_MIXED_NUMBER.match(quantity)
+    if match:
+        whole, numerator, denominator = map(int, match.groups())
+        quantity = '%d/%d%s' % (whole * denominator + numerator, denominator,
+                                quantity[match.end():])
+    return get_ureg().parse_expression(quantity)
+
+
+@functools.lru_cache(maxsize=QUANTITY_CACHE_SIZE)
+def parse_base_quantity(quantity):
+    '''
+    Same as :func:`parse_quantity`, but converted to base units (e.g.,
+    ``"8 oz"`` becomes ``226.8 gram``).
+    '''
+    quantity = parse_quantity(quantity)
+    if isinstance(quantity, get_ureg().Quantity):
+        return quantity.to_base_units()
+    return quantity
+
+
+def quantity_cache_info():
+    '''
+    Returns
+    -------
+    dict
+        Memoization statistics (i.e., ``hits``, ``misses``, ``maxsize``,
+        ``currsize``) of :func:`is_unit`, :func:`parse_quantity` and
+        :func:`parse_base_quantity`, keyed by function name.
+    '''
+    return {func.__name__: func.cache_info()._asdict()
+            for func in (is_unit, parse_quantity, parse_base_quantity)}
+
+
+def clear_quantity_cache():
+    for func in (is_unit, parse_quantity, parse_base_quantity):
+        func.cache_clear()
+
+
+def quantity_columns(quantities, base_units=False, errors='raise'):
+    '''
+    Compact numeric representation of quantity strings.
+
+    Each distinct quantity string is parsed once (see
+    :func:`parse_quantity`), so a table does not need to hold a
+    ``pint.Quantity`` object per row.
+
+    Parameters
+    ----------
+    quantities : pandas.Series
+        Quantity strings, e.g., ``"3/4 lb"``.
+    base_units : bool, optional
+        If ``True``, convert quantities to base units (e.g., ``gram``).
+    errors : str, optional
+        If ``'raise'`` (default), raise an error if a quantity cannot be
+        parsed (e.g., ``"/"``).  If ``'coerce'``, treat unparsable
+        quantities as missing.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table with the columns ``magnitude`` (``float``) and ``unit``
+        (``category``; use ``unit.cat.codes`` for integer unit codes),
+        indexed like :data:`quantities`.  Unit is ``"dimensionless"`` for
+        unitless quantities, and both columns are null for missing
+        quantities.
+
+    .. versionchanged:: X.X.X
+        Add ``errors`` kwarg.
+    '''
+    import numpy as np
+    import pandas as pd
+
+    parse = parse_base_quantity if base_units else parse_quantity
+    if errors == 'coerce':
+        parse_errors = _parse_errors()
+
+        def parse(quantity, parse=parse):
+            try:
+                return parse(quantity)
+            except parse_errors:
+                return np.nan
+    elif errors != 'raise':
+        raise ValueError('`errors` must be one of: raise, coerce')
+
+    codes, uniques = pd.factorize(quantities)
+    parsed = [parse(quantity_i) for quantity_i in uniques]
+    magnitudes = np.array([getattr(q, 'magnitude', q) for q in parsed] +
+                          [np.nan], dtype=float)
+    units = [str(q.units) if isinstance(q, get_ureg().Quantity)
+             else None if np.isnan(q) else 'dimensionless' for q in parsed]
+    unit_codes, unit_categories = pd.factorize(units)
+    unit_codes = np.append(unit_codes, -1)
+    # Code -1 (i.e., missing quantity) selects the trailing null entries.
+    return pd.DataFrame({'magnitude': magnitudes[codes],
+                         'unit': pd.Categorical
+                         .from_codes(unit_codes[codes],
+                                     categories=unit_categories)},
+                        index=quantities.index)
+
+
+#: Default ``bs4`` tree builder used to parse Dinner Daily HTML documents.
+DEFAULT_PARSER = 'lxml'
+#: Slow, but lenient ``bs4`` tree builder used if extraction fails using a
+#: faster tree builder (e.g., due to malformed HTML).
+FALLBACK_PARSER = 'html5lib'
+#: Errors raised by extraction functions when an expected element is missing.
+EXTRACTION_ERRORS = (AttributeError, IndexError, KeyError, ValueError)
+
+
+@profiling.stage('parse_html')
+def parse_html(html, parser=None, parse_only=None):
+    '''
+    Parameters
+    ----------
+    html : str
+        HTML document.
+    parser : str, optional
+        ``bs4`` tree builder, e.g., ``"lxml"``, ``"html.parser"``, or
+        ``"html5lib"`` (default: :data:`DEFAULT_PARSER`).
+    parse_only : bs4.SoupStrainer, optional
+        Only parse matching elements (and their descendants).  Ignored by
+        ``html5lib``, which always parses the whole document.
+
+    .. versionchanged:: X.X.X
+        Add ``parse_only`` kwarg.
+
+    Returns
+    -------
+    bs4.BeautifulSoup
+        Parsed document.  Falls back to :data:`FALLBACK_PARSER` if the
+        requested tree builder is not installed.
+    '''
+    import bs4
+
+    if parser is None:
+        parser = DEFAULT_PARSER
+    try:
+        return bs4.BeautifulSoup(html, parser, parse_only=None
+                                 if parser == 'html5lib' else parse_only)
+    except bs4.FeatureNotFound:
+        return bs4.BeautifulSoup(html, FALLBACK_PARSER)
+
+
+def parser_fallback(func):
+    '''
+    Decorate an HTML extraction function accepting a ``parser`` argument
+    (see :func:`parse_html`) to retry using :data:`FALLBACK_PARSER` if
+    extraction with the requested tree builder fails.  ``parser`` may be
+    passed either by position or by keyword.
+    '''
+    signature = inspect.signature(func)
+
+    @functools.wraps(func)
+    def _wrapped(*args, **kwargs):
+        try:
+            return func(*args, **kwargs)
+        except EXTRACTION_ERRORS:
+            arguments = signature.bind(*args, **kwargs)
+            if ((arguments.arguments.get('parser') or DEFAULT_PARSER) ==
+                    FALLBACK_PARSER):
+                raise
+            arguments.arguments['parser'] = FALLBACK_PARSER
+            profiling.count('parser fallbacks')
+            return func(*arguments.args, **arguments.kwargs)
+    return _wrapped
+
+
+@parser_fallback
+def get_staple_ingredients(html, parser=None):
+    '''
+    .. versionchanged:: X.X.X
+        Add ``parser`` kwarg (see :func:`parse_html`).
+    .. versionchanged:: X.X.X
+        Only parse staples list (``div#staple``), and build index of recipes
+        using each staple in a single pass.
+
+    Returns
+    -------
+    list[tuple]
+        Sorted list of ``(staple, recipes)``, where ``recipes`` is the sorted
+        list of recipe numbers (starting at 1) using the staple.
+    '''
+    import bs4
+
+    soup = parse_html(html, parser,
+                      parse_only=bs4.SoupStrainer('div', id='staple'))
     staples_div = soup.find('div', attrs={'id': 'staple'})
     staples_list = staples_div.find('ul', attrs={'class': 'shopping-list'})
-    staple_ingredients = [c.find_all('span')[-1].contents[0].lower()
-                          .replace('*', '').split(', ')
-                          for c in staples_list.find_all('li')]
-    staples_combined = set(it.chain(*staple_ingredients))
-    return sorted([(staple, [i + 1 for i, recipe_staples in
-                             enumerate(staple_ingredients)
-                             if staple in recipe_staples])
-                   for staple in staples_combined])
+    recipes = {}
+    for i, li in enumerate(staples_list.find_all('li')):
+        for staple in (li.find_all('span')[-1].contents[0].lower()
+                       .replace('*', '').split(', ')):
+            recipes_i = recipes.setdefault(staple, [])
+            # Recipes are visited in order, so each list is already sorted.
+            if not recipes_i or recipes_i[-1] != i + 1:
+                recipes_i.append(i + 1)
+    return sorted(recipes.items())
 
 
-def get_section_ingredients(html):
+def staple_frequency(htmls, parser=None):
+    '''
+    Usage of staple ingredients across many weeks, e.g., to plan pantry
+    restocking.
+
+    Parameters
+    ----------
+    htmls : iterable[str]
+        Shopping list HTML documents, e.g., one per week (only one document
+        is held in memory at a time if a generator is passed).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table indexed by ``staple``, with the columns ``weeks`` (number of
+        documents using the staple), ``recipes`` (total number of recipes
+        using the staple), and ``frequency`` (fraction of documents using
+        the staple), sorted by descending ``weeks`` and ``recipes``.
+    '''
+    import pandas as pd
+
+    weeks = collections.Counter()
+    recipes = collections.Counter()
+    count = 0
+    for html in htmls:
+        count += 1
+        for staple, recipes_i in get_staple_ingredients(html, parser=parser):
+            weeks[staple] += 1
+            recipes[staple] += len(recipes_i)
+    df_staples = pd.DataFrame({'weeks': pd.Series(weeks, dtype=int),
+                               'recipes': pd.Series(recipes, dtype=int)},
+                              columns=['weeks', 'recipes'])
+    df_staples.index.name = 'staple'
+    df_staples['frequency'] = df_staples['weeks'] / max(count, 1)
+    return (df_staples.reset_index()
+            .sort_values(['weeks', 'recipes', 'staple'],
+                         ascending=[False, False, True])
+            .set_index('staple'))
+
+
+@parser_fallback
+def get_section_ingredients(html, parser=None, compact=False):
     '''
     Combine all section (i.e., grocery, meat, etc.) shopping lists into a
     single dataframe with imperial and metric quantities.
+
+    .. versionchanged:: X.X.X
+        Add ``parser`` kwarg (see :func:`parse_html`).
+    .. versionchanged:: X.X.X
+        Parse quantities using memoized :func:`parse_quantity`.  Add
+        ``compact`` kwarg.
+
+    Parameters
+    ----------
+    compact : bool, optional
+        If ``True``, replace ``quantity_metric`` and ``quantity_imperial``
+        columns of ``pint.Quantity`` objects with ``magnitude_*`` (``float``)
+        and ``unit_*`` (``category``) columns (see :func:`quantity_columns`).
     '''
-    soup = bs4.BeautifulSoup(html, 'html5lib')
+    import pandas as pd
+
+    soup = parse_html(html, parser)
     main_list_section = soup.find('section', id='main-list')
     list_sections = {list_i.attrs['id']: list_i
                      for list_i in
                      main_list_section.find_all('div', class_='list-section')}
-    name_i, list_i = list_sections.items()[1]
 
     frames = []
     keys = []
@@ -63,18 +416,27 @@ def get_section_ingredients(html):
         df_ingredients_i = pd.DataFrame([cre_ingredient.match(i).groupdict()
                                         for i in ingredient_strs_i
                                          if cre_ingredient.match(i)])
-        df_ingredients_i.insert(2, 'quantity_imperial',
-                                df_ingredients_i.quantity
-                                .map(ureg.parse_expression))
-        df_ingredients_i.insert(3, 'quantity_metric',
-                                [q.to_base_units()
-                                 if isinstance(q, ureg.Quantity) else q
-                                 for q in df_ingredients_i.quantity_imperial])
+        if not compact:
+            df_ingredients_i.insert(2, 'quantity_imperial',
+                                    df_ingredients_i.quantity
+                                    .map(parse_quantity))
+            df_ingredients_i.insert(3, 'quantity_metric',
+                                    df_ingredients_i.quantity
+                                    .map(parse_base_quantity))
         frames.append(df_ingredients_i)
         keys.append(name_i)
 
     df_ingredients = pd.concat(frames, keys=keys)
     df_ingredients.side_dish = (df_ingredients.side_dish == '*')
     df_ingredients.optional = (df_ingredients.optional == 'optional')
+    if compact:
+        for suffix, base_units in (('imperial', False), ('metric', True)):
+            df_quantity = quantity_columns(df_ingredients.quantity,
+                                           base_units=base_units)
+            df_ingredients['magnitude_%s' % suffix] = df_quantity.magnitude
+            df_ingredients['unit_%s' % suffix] = df_quantity.unit
+        return df_ingredients[['quantity', 'name', 'magnitude_metric',
+                               'unit_metric', 'magnitude_imperial',
+                               'unit_imperial', 'optional', 'side_dish']]
     return df_ingredients[['quantity', 'name', 'quantity_metric',
                            'quantity_imperial', 'optional', 'side_dish']]
@@ -1,19 +1,12 @@
 from __future__ import print_function, unicode_literals, division
 import argparse
-import io
 import json
 import os
-import pathlib
-import subprocess as sp
 import sys
 
-import jinja2
-import pandas as pd
-
-from .menu import extract_menu, ingredients_table
-
-
-PARENT_DIR = os.path.realpath(os.path.join(__file__, os.path.pardir))
+from . import profiling
+from .cache import load_menu
+from .render import HTML_BACKENDS, markdown_to_html, render_markdown
 
 
 def parse_args():
@@ -24,18 +17,45 @@ def parse_args():
                         '(default: write to `stdout`)', nargs='?')
     parser.add_argument('--json', action='store_true')
     parser.add_argument('--markdown', action='store_true')
+    parser.add_argument('--html-backend', choices=HTML_BACKENDS,
+                        default='markdown', help='Markdown to HTML converter '
+                        '(default: %(default)s).')
+    parser.add_argument('--cache-dir',
+                        default=os.environ.get('DINNER_DAILY_CACHE_DIR'),
+                        help='Cache extracted menus in this directory '
+                        '(default: `DINNER_DAILY_CACHE_DIR` environment '
+                        'variable, if set).')
+    parser.add_argument('--cache-max-size', type=float, help='Maximum cache '
+                        'size in MB.')
+    parser.add_argument('--cache-max-age', type=float, help='Maximum age of '
+                        'cache entries in days.')
+    parser.add_argument('--profile', action='store_true',
+                        default=profiling.enabled(), help='Print per-stage '
+                        'timings and counters to `stderr` (default: enabled '
+                        'if `%s` environment variable is set).' %
+                        profiling.ENVIRONMENT_VARIABLE)
+    parser.add_argument('--profile-report', help='Write per-stage timings '
+                        'and counters as JSON to this path (implies '
+                        '`--profile`).')
+    parser.add_argument('--profile-stats', help='Write `cProfile` stats to '
+                        'this path, e.g., to view using `python -m pstats` '
+                        '(implies `--profile`).')
 
     return parser.parse_args()
 
 
-if __name__ == '__main__':
-    args = parse_args()
+def main(args):
     with open(args.weekly_menu_html, 'r') as input_:
         menu_html = input_.read()
 
-    menu = extract_menu(menu_html)
+    cache_kwargs = {'cache_dir': args.cache_dir}
+    if args.cache_max_size is not None:
+        cache_kwargs['max_size'] = int(args.cache_max_size * 1024 ** 2)
+    if args.cache_max_age is not None:
+        cache_kwargs['max_age'] = args.cache_max_age * 24 * 60 * 60
 
     if args.json:
+        menu = load_menu(menu_html, ingredients=False, **cache_kwargs)
         # Dump as JSON output.
         if args.output_path == '-':
             output = sys.stdout
@@ -48,35 +68,41 @@ if __name__ == '__main__':
             if args.output_path != '-':
                 output.close()
     else:
-        menu_markdown = io.StringIO()
-        templates_dir = pathlib.Path(os.path.join(PARENT_DIR, 'templates'))
-        template_path = templates_dir.joinpath('weekly_menu.template.md')
-        with open(template_path, 'r') as input_:
-            template = jinja2.Template(input_.read())
-
-        df_ingredients = ingredients_table(menu)
-
-        print(template.render(menu=menu, df_ingredients=df_ingredients),
-              file=menu_markdown)
+        menu, df_ingredients = load_menu(menu_html, **cache_kwargs)
+        menu_markdown = render_markdown(menu, df_ingredients) + '\n'
 
         if args.markdown:
             # Dump as markdown.
             if args.output_path == '-':
-                print(menu_markdown.getvalue(), end='')
+                print(menu_markdown, end='')
             else:
                 with open(args.output_path, 'w') as output:
-                    output.write(menu_markdown.getvalue())
+                    output.write(menu_markdown)
         else:
             # Dump as HTML.
-            p = sp.Popen('pandoc -f gfm -t html - --template %s '
-                         '--toc --toc-depth 2' %
-                         templates_dir.joinpath('GitHub.html5'),
-                         stdout=sp.PIPE, stdin=sp.PIPE)
-            p.stdin.write(menu_markdown.getvalue().encode('utf8'))
-            stdout, stderr = p.communicate()
+            menu_html = markdown_to_html(menu_markdown,
+                                         backend=args.html_backend)
 
             if args.output_path == '-':
-                print(stdout.strip())
+                print(menu_html.strip())
             else:
                 with open(args.output_path, 'w') as output:
-                    output.write(stdout.decode('utf8'))
+                    output.write(menu_html)
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    if args.profile or args.profile_report or args.profile_stats:
+        profiling.enable()
+    with profiling.timer('total'):
+        if args.profile_stats:
+            with profiling.cprofile(args.profile_stats):
+                main(args)
+        else:
+            main(args)
+    if profiling.enabled():
+        print(profiling.format_report(), file=sys.stderr)
+        if args.profile_report:
+            with open(args.profile_report, 'w') as output:
+                json.dump(profiling.report(), output, indent=4,
+                          sort_keys=True)
@@ -0,0 +1,268 @@
+'''
+Aggregate ingredients over many weekly menus (e.g., to plan purchasing over a
+4-8 week window), e.g.::
+
+    python -m dinner_daily_helpers.aggregate menus/ totals.csv --units lb cup
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import logging
+import re
+import sys
+
+from . import get_ureg, is_unit, quantity_columns
+
+#: Number and (optional) unit of quantity string, e.g., ``"1 1/2 cups"``.
+CRE_QUANTITY = re.compile(r'^\s*(?P<number>\d+(?:\s+\d+/\d+|/\d+|\.\d+)?)'
+                          r'\s*(?P<unit>.*?)\s*$')
+#: Unit of quantities without a (recognized) unit.
+COUNT_UNIT = 'dimensionless'
+
+
+def canonical_ingredient(names):
+    '''
+    Minimal ingredient normalization: lower case, with runs of whitespace
+    collapsed (see :func:`canonical.canonicalize` for default
+    normalization).
+
+    Parameters
+    ----------
+    names : pandas.Series
+        Ingredient names.
+
+    Returns
+    -------
+    pandas.Series
+        Canonical ingredient names.
+    '''
+    return names.str.lower().str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def merge_tables(tables, names=('week', )):
+    '''
+    Parameters
+    ----------
+    tables : dict
+        Ingredient tables (see :func:`menu.ingredients_table` and
+        :func:`shopping_list.extract_shopping_list`), keyed by e.g., week, or
+        ``(household, week)`` tuple.
+    names : tuple, optional
+        Name of each key level.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Single table, with a column per key level.
+    '''
+    import pandas as pd
+
+    keys = sorted(tables)
+    df_merged = pd.concat([tables[k] for k in keys], keys=keys,
+                          names=list(names) + [None])
+    return df_merged.reset_index(level=list(names)).reset_index(drop=True)
+
+
+def normalized_quantities(df_ingredients):
+    '''
+    Normalize quantities to base units (e.g., ``gram``, ``centimeter ** 3``).
+
+    Each distinct quantity string is parsed only once (see
+    :func:`dinner_daily_helpers.quantity_columns`).
+
+    Parameters
+    ----------
+    df_ingredients : pandas.DataFrame
+        Table with ``quantity`` and ``unit`` columns (see
+        :func:`menu.ingredients_table`), or with ``quantity`` strings
+        including unit, e.g., ``"3/4 lb"`` (see
+        :func:`shopping_list.extract_shopping_list`).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table with the columns ``magnitude`` (``float``) and ``unit``
+        (``category``), indexed like :data:`df_ingredients`.
+
+        Units that are not defined in the unit registry (e.g., ``"can"``)
+        are kept as is, and missing units (or ``"each"``) are
+        :data:`COUNT_UNIT`.  Both columns are null for quantities that
+        cannot be parsed (e.g., ``"/"``).
+
+    .. versionchanged:: X.X.X
+        Unparsable quantities are null instead of raising an error.
+    '''
+    quantities = df_ingredients['quantity']
+    if 'unit' in df_ingredients:
+        numbers = quantities.where(quantities.isna(), quantities.astype(str))
+        units = df_ingredients['unit']
+    else:
+        df_split = quantities.str.extract(CRE_QUANTITY, expand=True)
+        numbers, units = df_split['number'], df_split['unit']
+    # Count quantities without a unit in the same unit as e.g., `2 each`.
+    units = units.where(~units.isin(['', 'each']), None)
+
+    known = {unit_i: is_unit(unit_i) for unit_i in units.dropna().unique()}
+    is_known = units.map(known).eq(True)
+    df_quantities = \
+        quantity_columns(numbers.where(~is_known, numbers + ' ' + units),
+                         base_units=True, errors='coerce')
+
+    # Count quantities with unrecognized units in the unit as is.
+    other = ~is_known & units.notna() & df_quantities['magnitude'].notna()
+    unit = df_quantities['unit'].astype(object)
+    unit[other] = units[other]
+    df_quantities['unit'] = unit.astype('category')
+    return df_quantities
+
+
+def aggregate_ingredients(tables, by=None, names=('week', ), canonical=None,
+                          units=None):
+    '''
+    Sum quantities of each ingredient over many weekly ingredient tables.
+
+    Quantities are normalized to base units once per distinct quantity
+    string, and summed as plain ``float`` columns (i.e., without per-row
+    ``pint`` arithmetic).
+
+    Parameters
+    ----------
+    tables : dict or pandas.DataFrame
+        Ingredient tables keyed by e.g., week (see :func:`merge_tables`), or
+        a merged table.
+    by : list[str], optional
+        Additional columns to group by, e.g., ``['household']``.
+    names : tuple, optional
+        Name of each key level of :data:`tables` (if a ``dict``).
+    canonical : function, optional
+        Function mapping a series of ingredient names to canonical names
+        (default: :func:`canonical.canonicalize`, e.g., ``"onion, small"``
+        and ``"onions"`` both become ``"onion"``).  Only called once with
+        the distinct names.
+    units : list[str], optional
+        Display units, e.g., ``['lb', 'cup']``.  Each total with the same
+        dimensionality as a display unit is converted to that unit (see
+        :func:`to_units`).
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table with the columns ``*by, ingredient, unit, magnitude, count``,
+        where ``count`` is the number of occurrences of the ingredient (in
+        the respective unit).  Quantities of an ingredient with incompatible
+        units (e.g., ``gram`` and ``bunch``) are listed separately, and
+        ingredients without a quantity (e.g., staples) are omitted.
+    '''
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(tables, dict):
+        tables = merge_tables(tables, names=names)
+    by = list(by or [])
+    if canonical is None:
+        from .canonical import canonicalize as canonical
+
+    codes, uniques = pd.factorize(tables['ingredient'])
+    canonical_codes, canonical_names = \
+        pd.factorize(canonical(pd.Series(uniques)))
+    # Code -1 (i.e., missing ingredient name) selects the trailing null code.
+    ingredients = pd.Categorical.from_codes(np.append(canonical_codes,
+                                                      -1)[codes],
+                                            categories=canonical_names)
+    df_quantities = normalized_quantities(tables)
+    df_values = pd.DataFrame({'ingredient': ingredients,
+                              'unit': df_quantities['unit'].values,
+                              'magnitude': df_quantities['magnitude'].values},
+                             index=tables.index)
+    for column in by:
+        df_values[column] = tables[column]
+
+    df_aggregate = (df_values.groupby(by + ['ingredient', 'unit'],
+                                      observed=True, sort=True)['magnitude']
+                    .agg(['sum', 'count'])
+                    .rename(columns={'sum': 'magnitude'})
+                    .reset_index()
+                    .sort_values(by + ['ingredient', 'unit'])
+                    .reset_index(drop=True))
+    df_aggregate['unit'] = df_aggregate['unit'].astype(str)
+    df_aggregate['ingredient'] = df_aggregate['ingredient'].astype(str)
+    if units:
+        df_aggregate = to_units(df_aggregate, units)
+    return df_aggregate
+
+
+def to_units(df_aggregate, units):
+    '''
+    Parameters
+    ----------
+    df_aggregate : pandas.DataFrame
+        Table with ``magnitude`` and ``unit`` columns, e.g., returned by
+        :func:`aggregate_ingredients`.
+    units : list[str]
+        Display units, e.g., ``['lb', 'cup']``.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Copy of :data:`df_aggregate`, with each quantity with the same
+        dimensionality as a display unit converted to that unit.  Conversion
+        factors are computed once per distinct unit.
+    '''
+    import pint
+
+    ureg = get_ureg()
+    factors = {}
+    for unit_i in df_aggregate['unit'].unique():
+        try:
+            quantity_i = ureg.Quantity(1, unit_i)
+        except pint.UndefinedUnitError:
+            continue
+        for display_unit in units:
+            try:
+                factors[unit_i] = (display_unit,
+                                   quantity_i.to(display_unit).magnitude)
+            except pint.DimensionalityError:
+                continue
+            break
+
+    df_aggregate = df_aggregate.copy()
+    convert = df_aggregate['unit'].isin(list(factors))
+    if convert.any():
+        converted = df_aggregate.loc[convert, 'unit'].map(factors)
+        df_aggregate.loc[convert, 'magnitude'] *= converted.str[1]
+        df_aggregate.loc[convert, 'unit'] = converted.str[0]
+    return df_aggregate
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Sum ingredient quantities '
+                                     'over many weekly menus.')
+
+    parser.add_argument('input', help='Directory containing weekly menu HTML '
+                        'documents, or glob pattern (e.g., `"2019-*.html"`).')
+    parser.add_argument('output_path', default='-', help='Output path '
+                        '(default: write to `stdout`)', nargs='?')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='Number of worker processes (default: number of '
+                        'CPUs).')
+    parser.add_argument('--units', nargs='+', default=['lb', 'cup'],
+                        help='Display units (default: %(default)s).')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from .batch import extract_ingredients_tables, find_menus
+
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    paths = find_menus(args.input)
+    if not paths:
+        raise SystemExit('No weekly menu documents found matching `%s`.' %
+                         args.input)
+    df_ingredients = (extract_ingredients_tables(paths,
+                                                 processes=args.processes)
+                      .reset_index(level='path').reset_index(drop=True))
+    df_aggregate = aggregate_ingredients(df_ingredients, units=args.units)
+    df_aggregate.to_csv(sys.stdout if args.output_path == '-'
+                        else args.output_path, index=False)
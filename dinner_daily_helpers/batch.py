@@ -0,0 +1,200 @@
+from __future__ import print_function, unicode_literals, division
+import argparse
+import concurrent.futures as cf
+import glob
+import json
+import logging
+import os
+import sys
+
+import pandas as pd
+
+from .menu import extract_menu, ingredients_table, plain_menu
+
+#: Name pattern of weekly menus written by :func:`download.download`.
+WEEKLY_MENU_PATTERN = '????-??-??-weekly-menu-*.html'
+
+
+def find_menus(path):
+    '''
+    Parameters
+    ----------
+    path : str
+        Directory containing weekly menu HTML documents, or glob pattern
+        matching weekly menu HTML documents.
+
+    Returns
+    -------
+    list[str]
+        Sorted list of weekly menu HTML document paths.
+    '''
+    if os.path.isdir(path):
+        path = os.path.join(path, WEEKLY_MENU_PATTERN)
+    return sorted(glob.glob(path))
+
+
+def _extract_menu_file(path, ingredients=False):
+    with open(path, 'r') as input_:
+        menu = plain_menu(extract_menu(input_.read()))
+    df_ingredients = ingredients_table(menu) if ingredients else None
+    return menu, df_ingredients
+
+
+def iter_extract_menus(paths, processes=None, ingredients=False,
+                       ordered=False):
+    '''
+    Extract menus from weekly menu HTML documents using a process pool.
+
+    Parameters
+    ----------
+    paths : list[str]
+        Weekly menu HTML document paths.
+    processes : int, optional
+        Number of worker processes (default: number of CPUs).
+    ingredients : bool, optional
+        If ``True``, also compute :func:`menu.ingredients_table` for each
+        menu in the worker processes.
+    ordered : bool, optional
+        If ``True``, yield results in order of :data:`paths` (each as soon
+        as it and all results before it are available).
+
+    Yields
+    ------
+    path : str
+        Weekly menu HTML document path.
+    menu : dict or tuple
+        Menu in format returned by :func:`extract_menu` (with plain strings),
+        or ``(menu, df_ingredients)`` if :data:`ingredients` is ``True``.
+        ``None`` if extraction failed.
+    error : str
+        Description of error if extraction failed, otherwise ``None``.
+
+    Unless :data:`ordered` is ``True``, results are yielded in order of
+    completion, *not* in order of :data:`paths`.  Files that fail to parse
+    are reported and skipped.
+
+    .. versionchanged:: X.X.X
+        Add ``ordered`` kwarg.
+    '''
+    with cf.ProcessPoolExecutor(max_workers=processes) as executor:
+        futures = {executor.submit(_extract_menu_file, path, ingredients):
+                   path for path in paths}
+        for future in (futures if ordered else cf.as_completed(futures)):
+            path = futures[future]
+            try:
+                menu, df_ingredients = future.result()
+            except Exception as exception:
+                error = '%s: %s' % (type(exception).__name__, exception)
+                logging.warning('Failed to extract menu from `%s`: %s', path,
+                                error)
+                yield path, None, error
+                continue
+            if ingredients:
+                yield path, (menu, df_ingredients), None
+            else:
+                yield path, menu, None
+
+
+def extract_ingredients_tables(paths, processes=None, errors=None):
+    '''
+    Parameters
+    ----------
+    paths : list[str]
+        Weekly menu HTML document paths.
+    processes : int, optional
+        Number of worker processes (default: number of CPUs).
+    errors : dict, optional
+        If specified, add ``path -> error`` entry for each file that failed to
+        parse.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Combined table of ingredients (see :func:`menu.ingredients_table`)
+        for all menus, indexed by weekly menu file name.
+    '''
+    frames = {}
+
+    for path, result, error in iter_extract_menus(paths, processes=processes,
+                                                  ingredients=True):
+        if error is not None:
+            if errors is not None:
+                errors[path] = error
+            continue
+        frames[os.path.basename(path)] = result[1]
+
+    if not frames:
+        return pd.DataFrame()
+    keys = sorted(frames)
+    return pd.concat([frames[k] for k in keys], keys=keys,
+                     names=['path', None])
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Extract menus from many '
+                                     'weekly menu HTML documents in '
+                                     'parallel.')
+
+    parser.add_argument('input', help='Directory containing weekly menu HTML '
+                        'documents, or glob pattern (e.g., `"2019-*.html"`).')
+    parser.add_argument('output_path', default='-', help='Output path '
+                        '(default: write to `stdout`)', nargs='?')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='Number of worker processes (default: number of '
+                        'CPUs).')
+    parser.add_argument('--csv', action='store_true', help='Write combined '
+                        'ingredients table as CSV instead of menus as JSON '
+                        'Lines.')
+    parser.add_argument('--error-report', help='Write per-file errors as JSON '
+                        'Lines to this path (default: log to `stderr`).')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    paths = find_menus(args.input)
+    if not paths:
+        raise SystemExit('No weekly menu documents found matching `%s`.' %
+                         args.input)
+    logging.info('Extracting %d weekly menus', len(paths))
+
+    if args.output_path == '-':
+        output = sys.stdout
+    else:
+        output = open(args.output_path, 'w')
+
+    errors = {}
+    try:
+        if args.csv:
+            df_ingredients = extract_ingredients_tables(paths,
+                                                        processes=args
+                                                        .processes,
+                                                        errors=errors)
+            df_ingredients.to_csv(output)
+        else:
+            # Stream menus as JSON Lines as soon as each one is extracted.
+            for path, menu, error in iter_extract_menus(paths,
+                                                        processes=args
+                                                        .processes):
+                if error is not None:
+                    errors[path] = error
+                    continue
+                print(json.dumps({'path': path, 'menu': menu},
+                                 sort_keys=True), file=output)
+                output.flush()
+    finally:
+        if args.output_path != '-':
+            output.close()
+
+    if args.error_report:
+        with open(args.error_report, 'w') as report:
+            for path in sorted(errors):
+                print(json.dumps({'path': path, 'error': errors[path]}),
+                      file=report)
+    logging.info('Extracted %d of %d weekly menus (%d errors)',
+                 len(paths) - len(errors), len(paths), len(errors))
+    if errors:
+        raise SystemExit(1)
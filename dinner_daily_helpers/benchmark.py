@@ -0,0 +1,652 @@
+'''
+Benchmarks comparing optimized code paths against reference (previous)
+implementations (see :mod:`dinner_daily_helpers.tests.legacy`).
+
+For example::
+
+    python -m dinner_daily_helpers.benchmark units --weeks 52
+    python -m dinner_daily_helpers.benchmark meals --meals 500
+    python -m dinner_daily_helpers.benchmark model --weeks 52
+    python -m dinner_daily_helpers.benchmark date
+    python -m dinner_daily_helpers.benchmark decode --rows 1000000
+    python -m dinner_daily_helpers.benchmark aggregate --years 3
+    python -m dinner_daily_helpers.benchmark canonical --weeks 520
+    python -m dinner_daily_helpers.benchmark render
+    python -m dinner_daily_helpers.benchmark loadtest weekly-menu.html
+    python -m dinner_daily_helpers.benchmark importtime --max-ms 200
+    python -m dinner_daily_helpers.benchmark suite --save baseline.json
+    python -m dinner_daily_helpers.benchmark suite --compare baseline.json
+
+The same stages are also timed by the ``pytest-benchmark`` suite in
+``tests/test_benchmarks.py``.
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import concurrent.futures as cf
+import functools
+import gc
+import io
+import json
+import os
+import platform
+import re
+import subprocess as sp
+import sys
+import threading
+import time
+import timeit
+import tracemalloc
+
+import numpy as np
+import requests
+
+import pint
+
+from . import (get_section_ingredients, get_staple_ingredients, get_ureg,
+               parse_html, parse_quantity)
+from .aggregate import (aggregate_ingredients, canonical_ingredient,
+                        merge_tables)
+from .canonical import CanonicalIndex
+from .download import menu_date
+from .dump_list import dump_list
+from .menu import (CRE_MEAL_ID, decode_ingredients, extract_meal,
+                   extract_menu, ingredients_table, plain_menu)
+from .model import Menu
+from .render import markdown_to_html, render_markdown
+from .shopping_list import extract_shopping_list, iter_shopping_list
+from .synthetic import (FIXTURES_DIR, SAMPLE_INGREDIENTS, shopping_list_html,
+                        synthetic_menu, weekly_menu_html)
+from .tests.legacy import (legacy_decode_ingredients, legacy_default_units,
+                           legacy_extract_meal)
+
+#: Heavy modules which must *not* be loaded on import of each lightweight
+#: entry point (they are imported on first use instead).
+LAZY_MODULES = {'dinner_daily_helpers': ('bs4', 'dateparser', 'jinja2',
+                                         'markdown', 'pandas', 'pint'),
+                'dinner_daily_helpers.__main__': ('dateparser', 'jinja2',
+                                                  'markdown', 'pandas',
+                                                  'pint'),
+                'dinner_daily_helpers.download': ('dateparser', 'pandas',
+                                                  'pint')}
+
+
+def legacy_aggregate_ingredients(df_merged, by):
+    '''
+    Reference implementation of :func:`aggregate.aggregate_ingredients`,
+    parsing every row with ``pint`` and summing ``pint.Quantity`` objects.
+    '''
+    ureg = get_ureg()
+    # Not memoized.
+    parse = parse_quantity.__wrapped__
+    totals = {}
+    for i, row_i in df_merged.iterrows():
+        unit_i = row_i['unit']
+        if unit_i != unit_i or unit_i == 'each':
+            # No unit (note: `nan` would be parsed as a number).
+            quantity_i = ureg.Quantity(parse('%s' % row_i['quantity']))
+            unit_i = 'dimensionless'
+        else:
+            try:
+                quantity_i = parse('%s %s' % (row_i['quantity'], unit_i))
+                unit_i = str(quantity_i.to_base_units().units)
+            except pint.UndefinedUnitError:
+                # Count in unrecognized unit as is.
+                quantity_i = ureg.Quantity(parse('%s' % row_i['quantity']))
+        key = (tuple(row_i[by]), row_i['ingredient'].lower(), unit_i)
+        totals.setdefault(key, []).append(quantity_i)
+    return {key: functools.reduce(lambda a, b: a + b, quantities)
+            .to_base_units().magnitude
+            for key, quantities in totals.items()}
+
+
+def best_time(func, repeat=5):
+    '''
+    Returns
+    -------
+    float
+        Shortest of :data:`repeat` run times of :data:`func` in seconds.
+    '''
+    return min(timeit.repeat(func, repeat=repeat, number=1))
+
+
+def report(name, timings):
+    '''
+    Print run time of each implementation relative to the first one.
+    '''
+    baseline = timings[0][1]
+    print(name)
+    for label, seconds in timings:
+        print('  %-24s %10.2f ms  (%.1fx)' % (label, seconds * 1e3,
+                                               baseline / seconds))
+
+
+def benchmark_units(args):
+    menu = synthetic_menu(meals=5 * args.weeks)
+    ingredients = ingredients_table(menu, decode_processing=False).ingredient
+
+    legacy = legacy_decode_ingredients(ingredients,
+                                       default_units=legacy_default_units)
+    assert legacy.equals(decode_ingredients(ingredients, typed=False)), \
+        'Results do not match.'
+
+    report('Default units (%d ingredients)' % len(ingredients),
+           [('iterrows/pint',
+             best_time(lambda: legacy_decode_ingredients
+                       (ingredients, default_units=legacy_default_units),
+                       args.repeat)),
+            ('decode_ingredients',
+             best_time(lambda: decode_ingredients(ingredients, typed=False),
+                       args.repeat))])
+    report('ingredients_table (%d ingredients)' % len(ingredients),
+           [('ingredients_table', best_time(lambda: ingredients_table(menu),
+                                            args.repeat))])
+
+
+def benchmark_meals(args):
+    menu_html = weekly_menu_html(synthetic_menu(meals=args.meals))
+    meal_divs = parse_html(menu_html).find_all('li', id=CRE_MEAL_ID)
+    assert ([legacy_extract_meal(div) for div in meal_divs] ==
+            [extract_meal(div) for div in meal_divs]), 'Results do not match.'
+
+    # Document is parsed once; only extraction from the tree is timed.
+    timings = [('selector per field',
+                best_time(lambda: [legacy_extract_meal(div)
+                                   for div in meal_divs], args.repeat)),
+               ('single walk', best_time(lambda: [extract_meal(div)
+                                                  for div in meal_divs],
+                                         args.repeat))]
+    report('Extract meals (%d meals)' % args.meals, timings)
+    for label, seconds in timings:
+        print('  %-24s %10.0f meals/s' % (label, args.meals / seconds))
+
+
+def benchmark_date(args):
+    import dateparser
+
+    htmls = []
+    for header in ('old', 'new'):
+        with open(os.path.join(FIXTURES_DIR, 'weekly-menu-%s-header.html' %
+                               header), 'r') as input_:
+            htmls.append(input_.read())
+
+    def legacy():
+        return [dateparser.parse(re.sub(r' to .*', '',
+                                        extract_menu(html)['date']))
+                for html in htmls]
+
+    assert legacy() == [menu_date(html) for html in htmls], \
+        'Results do not match.'
+    report('Weekly menu start date (old and new header)',
+           [('extract_menu/dateparser', best_time(legacy, args.repeat)),
+            ('header only', best_time(lambda: [menu_date(html)
+                                               for html in htmls],
+                                      args.repeat))])
+
+
+def benchmark_decode(args):
+    import pandas as pd
+
+    random_ = np.random.RandomState(0)
+    quantities = np.array(['1', '2', '3', '1/2', '3/4', '1 1/2', '2 1/4', '8',
+                           '12'], dtype=object)
+    descriptions = np.array([ingredient.split(' ', 1)[1]
+                             for ingredient in SAMPLE_INGREDIENTS
+                             if ingredient[0].isdigit()], dtype=object)
+    ingredients = pd.Series(quantities[random_.randint(len(quantities),
+                                                       size=args.rows)] +
+                            ' ' + descriptions[random_
+                                               .randint(len(descriptions),
+                                                        size=args.rows)])
+    df_legacy = legacy_decode_ingredients(ingredients)
+    assert df_legacy.equals(decode_ingredients(ingredients, typed=False)), \
+        'Results do not match.'
+
+    print('Decode ingredients (%d rows, %d distinct)' %
+          (args.rows, ingredients.nunique()))
+    print('  %-24s %10s %10s' % ('', 'ms', 'peak MiB'))
+    for label, func in (('str.extract (2 passes)',
+                         lambda: legacy_decode_ingredients(ingredients)),
+                        ('single pass',
+                         lambda: decode_ingredients(ingredients, typed=False)),
+                        ('single pass (typed)',
+                         lambda: decode_ingredients(ingredients))):
+        print('  %-24s %10.1f %10.1f' % (label,
+                                          best_time(func, args.repeat) * 1e3,
+                                          peak_memory(func) / 1024 ** 2))
+
+
+def benchmark_aggregate(args):
+    weeks = [ingredients_table(synthetic_menu(seed=i)) for i in range(8)]
+    tables = {('household %d' % i, 'week %03d' % j): weeks[(i + j) % 8]
+              for i in range(args.households) for j in range(52 * args.years)}
+    df_merged = merge_tables(tables, names=('household', 'week'))
+
+    aggregate = functools.partial(aggregate_ingredients, by=['household'],
+                                  canonical=canonical_ingredient)
+    df_aggregate = aggregate(df_merged)
+    # Reference implementation is slow, so only verify a single household.
+    df_household = df_merged[df_merged.household == 'household 0']
+    legacy = legacy_aggregate_ingredients(df_household, ['household'])
+    df_aggregate_i = df_aggregate[df_aggregate.household == 'household 0']
+    assert len(legacy) == len(df_aggregate_i), 'Results do not match.'
+    for household, ingredient, unit, magnitude, count in \
+            df_aggregate_i.itertuples(index=False):
+        assert np.isclose(legacy[((household, ), ingredient, unit)],
+                          magnitude), 'Results do not match.'
+
+    timings = [('iterrows/pint (1 household)',
+                best_time(lambda: legacy_aggregate_ingredients(df_household,
+                                                               ['household']),
+                          1))]
+    timings.append(('vectorized (1 household)',
+                    best_time(lambda: aggregate(df_household), args.repeat)))
+    timings.append(('vectorized (%d households)' % args.households,
+                    best_time(lambda: aggregate(df_merged), args.repeat)))
+    report('Aggregate ingredients (%d weeks, %d rows)' %
+           (len(tables), len(df_merged)), timings)
+
+
+def benchmark_canonical(args):
+    weeks = [ingredients_table(synthetic_menu(seed=i)) for i in range(8)]
+    raw_names = merge_tables({'%03d' % i: weeks[i % 8]
+                              for i in range(args.weeks)})['ingredient']
+
+    def per_row():
+        index = CanonicalIndex()
+        return [index.normalize(name_i) for name_i in raw_names]
+
+    # Cold index on each run, i.e., distinct names are not memoized yet.
+    timings = [('per row', best_time(per_row, args.repeat)),
+               ('bulk', best_time(lambda: CanonicalIndex()
+                                  .canonicalize(raw_names), args.repeat))]
+    report('Canonical ingredient names (%d weeks, %d names)' %
+           (args.weeks, len(raw_names)), timings)
+    for label, seconds in timings:
+        print('  %-24s %10.0f names/s' % (label, len(raw_names) / seconds))
+
+
+def benchmark_render(args):
+    menu = synthetic_menu(meals=args.meals)
+    df_ingredients = ingredients_table(menu)
+    menu_markdown = render_markdown(menu, df_ingredients)
+
+    report('Render markdown template (%d meals)' % args.meals,
+           [('render_markdown', best_time(lambda:
+                                          render_markdown(menu,
+                                                          df_ingredients),
+                                          args.repeat))])
+
+    timings = []
+    try:
+        timings.append(('pandoc (subprocess)',
+                        best_time(lambda: markdown_to_html(menu_markdown,
+                                                           backend='pandoc'),
+                                  args.repeat)))
+    except OSError:
+        print('`pandoc` not found; skipping pandoc backend.')
+    timings.append(('markdown (in-process)',
+                    best_time(lambda: markdown_to_html(menu_markdown),
+                              args.repeat)))
+    report('Markdown to HTML (%d meals)' % args.meals, timings)
+
+
+def import_time(module):
+    '''
+    Import :data:`module` in a fresh interpreter (using ``python -X
+    importtime``).
+
+    Returns
+    -------
+    float, set
+        Cumulative import time of :data:`module` in seconds, and names of all
+        (top-level) packages imported as a side effect.
+    '''
+    output = sp.check_output([sys.executable, '-X', 'importtime', '-c',
+                              'import %s' % module], stderr=sp.STDOUT,
+                             universal_newlines=True)
+    cumulative = {}
+    for line in output.splitlines():
+        match = re.match(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|\s+'
+                         r'(\S+)\s*$', line.rstrip())
+        if match:
+            cumulative[match.group(3)] = int(match.group(2)) * 1e-6
+    packages = set(name.split('.')[0] for name in cumulative)
+    return cumulative[module], packages
+
+
+def benchmark_importtime(args):
+    failed = False
+    print('Import time (best of %d)' % args.repeat)
+    for module, lazy_modules in sorted(LAZY_MODULES.items()):
+        results = [import_time(module) for i in range(args.repeat)]
+        seconds = min(seconds_i for seconds_i, packages_i in results)
+        eager = sorted(set(lazy_modules) & results[0][1])
+        print('  %-32s %10.2f ms' % (module, seconds * 1e3))
+        if eager:
+            print('    error: eagerly imports: %s' % ', '.join(eager))
+            failed = True
+        if args.max_ms is not None and seconds * 1e3 > args.max_ms:
+            print('    error: exceeds %.0f ms' % args.max_ms)
+            failed = True
+    if failed:
+        raise SystemExit(1)
+
+
+def peak_memory(func):
+    '''
+    Returns
+    -------
+    int
+        Peak memory (in bytes) allocated by Python while running
+        :data:`func` (see :mod:`tracemalloc`).
+    '''
+    tracemalloc.start()
+    try:
+        func()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def retained_memory(func):
+    '''
+    Returns
+    -------
+    int
+        Memory (in bytes) allocated by Python while running :data:`func`
+        which is still referenced by its result (see :mod:`tracemalloc`).
+    '''
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = func()  # noqa: F841
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+
+
+def benchmark_model(args):
+    htmls = [weekly_menu_html(synthetic_menu(seed=i))
+             for i in range(args.weeks)]
+    menus = [Menu.from_html(html) for html in htmls]
+    assert [menu.to_dict() for menu in menus] == \
+        [plain_menu(extract_menu(html)) for html in htmls], \
+        'Results do not match.'
+
+    print('Retained memory (%d menus)' % args.weeks)
+    for label, func in (('dict (bs4 strings)', extract_menu),
+                        ('Menu records', Menu.from_html)):
+        bytes_ = retained_memory(lambda: [func(html) for html in htmls])
+        print('  %-24s %10.1f KiB/menu' % (label, bytes_ / 1024 / args.weeks))
+
+    timings = [('json', best_time(lambda: [Menu.from_json(menu.to_json())
+                                           for menu in menus], args.repeat))]
+    try:
+        timings.append(('msgpack',
+                        best_time(lambda: [Menu.from_msgpack(menu
+                                                             .to_msgpack())
+                                           for menu in menus], args.repeat)))
+    except ImportError:
+        print('`msgpack` not installed; skipping msgpack serialization.')
+    report('Serialization round trip (%d menus)' % args.weeks, timings)
+
+
+def suite_stages(meals=5, items=40, weeks=4):
+    '''
+    Returns
+    -------
+    list[tuple]
+        ``(name, func)`` of each parsing and rendering stage, on sample
+        documents in :data:`synthetic.FIXTURES_DIR` and on synthetic documents
+        scaled by number of :data:`meals` (per week), shopping list
+        :data:`items` and :data:`weeks`.
+    '''
+    def fixture(name):
+        with io.open(os.path.join(FIXTURES_DIR, name), encoding='utf8') as \
+                input_:
+            return input_.read()
+
+    old_html = fixture('weekly-menu-old-header.html')
+    new_html = fixture('weekly-menu-new-header.html')
+    list_html = fixture('shopping-list.html')
+    menu = plain_menu(extract_menu(new_html))
+    df_ingredients = ingredients_table(menu)
+    menu_markdown = render_markdown(menu, df_ingredients)
+    df_section = get_section_ingredients(list_html)
+
+    synthetic_htmls = [weekly_menu_html(synthetic_menu(meals=meals, seed=i),
+                                        header=('old', 'new')[i % 2])
+                       for i in range(weeks)]
+    synthetic_menus = [plain_menu(extract_menu(html))
+                       for html in synthetic_htmls]
+    synthetic_list_html = shopping_list_html(meals=meals, items=items)
+
+    return [('extract_menu (old header)', lambda: extract_menu(old_html)),
+            ('extract_menu (new header)', lambda: extract_menu(new_html)),
+            ('ingredients_table', lambda: ingredients_table(menu)),
+            ('render_markdown', lambda: render_markdown(menu,
+                                                        df_ingredients)),
+            ('markdown_to_html', lambda: markdown_to_html(menu_markdown)),
+            ('extract_shopping_list',
+             lambda: extract_shopping_list(list_html)),
+            ('iter_shopping_list', lambda: list(iter_shopping_list(list_html))),
+            ('get_section_ingredients',
+             lambda: get_section_ingredients(list_html)),
+            ('get_section_ingredients (compact)',
+             lambda: get_section_ingredients(list_html, compact=True)),
+            ('get_staple_ingredients',
+             lambda: get_staple_ingredients(list_html)),
+            ('dump_list', lambda: dump_list(df_section)),
+            ('synthetic: extract_menu x %d' % weeks,
+             lambda: [extract_menu(html) for html in synthetic_htmls]),
+            ('synthetic: ingredients_table x %d' % weeks,
+             lambda: [ingredients_table(menu_i)
+                      for menu_i in synthetic_menus]),
+            ('synthetic: extract_shopping_list',
+             lambda: extract_shopping_list(synthetic_list_html))]
+
+
+def versions():
+    import bs4
+    import jinja2
+    import lxml.etree
+    import markdown
+    import pandas as pd
+
+    return {'python': platform.python_version(), 'bs4': bs4.__version__,
+            'lxml': '.'.join(map(str, lxml.etree.LXML_VERSION)),
+            'pandas': pd.__version__, 'pint': pint.__version__,
+            'numpy': np.__version__, 'jinja2': jinja2.__version__,
+            'markdown': markdown.__version__}
+
+
+def benchmark_suite(args):
+    stages = suite_stages(meals=args.meals, items=args.items,
+                          weeks=args.weeks)
+    results = {}
+    for name, func in stages:
+        # Warm up, e.g., memoized unit lookups and compiled templates.
+        func()
+        results[name] = {'seconds': best_time(func, args.repeat),
+                         'peak_bytes': peak_memory(func)}
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r') as input_:
+            baseline = json.load(input_)
+        print('Baseline: `%s` (%s)' % (args.compare, ', '.join('%s %s' % item
+                                                              for item in
+                                                              sorted(baseline
+                                                                     ['versions']
+                                                                     .items()))))
+
+    regressions = []
+    print('%-40s %10s %10s %10s %10s' % ('stage', 'ms', 'peak KiB',
+                                         'time', 'memory'))
+    for name, func in stages:
+        result = results[name]
+        line = '%-40s %10.2f %10.1f' % (name, result['seconds'] * 1e3,
+                                        result['peak_bytes'] / 1024)
+        baseline_i = baseline and baseline['stages'].get(name)
+        if baseline_i:
+            ratios = (result['seconds'] / baseline_i['seconds'],
+                      result['peak_bytes'] / max(baseline_i['peak_bytes'], 1))
+            line += ' %9.2fx %9.2fx' % ratios
+            if max(ratios) > 1 + args.tolerance:
+                line += '  (regression)'
+                regressions.append(name)
+        print(line)
+
+    if args.save:
+        with open(args.save, 'w') as output:
+            json.dump({'versions': versions(), 'stages': results}, output,
+                      indent=4, sort_keys=True)
+        print('Saved results to `%s`.' % args.save)
+    if regressions:
+        raise SystemExit('%d stage(s) slower or using more memory than '
+                         'baseline (tolerance: %d%%).' %
+                         (len(regressions), 100 * args.tolerance))
+
+
+def benchmark_loadtest(args):
+    with open(args.html, 'rb') as input_:
+        html = input_.read()
+    url = '%s/%s?format=%s' % (args.url.rstrip('/'), args.endpoint,
+                               args.format)
+    local = threading.local()
+
+    def post(i):
+        # One persistent connection per client thread.
+        session = getattr(local, 'session', None)
+        if session is None:
+            session = local.session = requests.Session()
+        start = time.time()
+        response = session.post(url, data=html)
+        response.raise_for_status()
+        return time.time() - start
+
+    with cf.ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        # Warm up connections (and server workers).
+        list(executor.map(post, range(args.concurrency)))
+        start = time.time()
+        latencies = np.array(list(executor.map(post, range(args.requests))))
+        duration = time.time() - start
+
+    print('%s (%d requests, concurrency %d)' % (url, args.requests,
+                                                args.concurrency))
+    print('  p50 latency  %10.2f ms' % (np.percentile(latencies, 50) * 1e3))
+    print('  p99 latency  %10.2f ms' % (np.percentile(latencies, 99) * 1e3))
+    print('  throughput   %10.2f requests/s' % (args.requests / duration))
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5, help='Number of '
+                        'timing repetitions (default: %(default)s).')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    units = subparsers.add_parser('units', help='Unit classification in '
+                                  '`ingredients_table`.')
+    units.add_argument('--weeks', type=int, default=52, help='Number of '
+                       'weeks of synthetic menus (default: %(default)s).')
+    units.set_defaults(func=benchmark_units)
+
+    meals = subparsers.add_parser('meals', help='Meal extraction from parsed '
+                                  'weekly menu.')
+    meals.add_argument('--meals', type=int, default=500, help='Number of '
+                       'meals in synthetic menu (default: %(default)s).')
+    meals.set_defaults(func=benchmark_meals)
+
+    model = subparsers.add_parser('model', help='Memory and serialization '
+                                  'of menu records.')
+    model.add_argument('--weeks', type=int, default=52, help='Number of '
+                       'weeks of synthetic menus (default: %(default)s).')
+    model.set_defaults(func=benchmark_model)
+
+    date = subparsers.add_parser('date', help='Weekly menu start date (for '
+                                 'download file names).')
+    date.set_defaults(func=benchmark_date)
+
+    decode = subparsers.add_parser('decode', help='Ingredient decoding '
+                                   '(quantity, unit, processing).')
+    decode.add_argument('--rows', type=int, default=1000000, help='Number '
+                        'of ingredient strings (default: %(default)s).')
+    decode.set_defaults(func=benchmark_decode)
+
+    aggregate = subparsers.add_parser('aggregate', help='Multi-week '
+                                      'ingredient aggregation.')
+    aggregate.add_argument('--years', type=int, default=3, help='Number of '
+                           'years of synthetic weekly menus per household '
+                           '(default: %(default)s).')
+    aggregate.add_argument('--households', type=int, default=4,
+                           help='Number of households (default: '
+                           '%(default)s).')
+    aggregate.set_defaults(func=benchmark_aggregate)
+
+    canonical = subparsers.add_parser('canonical', help='Canonical '
+                                      'ingredient name lookup throughput.')
+    canonical.add_argument('--weeks', type=int, default=520, help='Number of '
+                           'weeks of synthetic menus (default: %(default)s).')
+    canonical.set_defaults(func=benchmark_canonical)
+
+    render = subparsers.add_parser('render', help='Markdown to HTML '
+                                   'conversion backends.')
+    render.add_argument('--meals', type=int, default=5, help='Number of '
+                        'meals in synthetic menu (default: %(default)s).')
+    render.set_defaults(func=benchmark_render)
+
+    loadtest = subparsers.add_parser('loadtest', help='Latency and '
+                                     'throughput of render service (see '
+                                     '`dinner_daily_helpers.server`).')
+    loadtest.add_argument('html', help='HTML document to post.')
+    loadtest.add_argument('--url', default='http://127.0.0.1:8000',
+                          help='Render service URL (default: %(default)s).')
+    loadtest.add_argument('--endpoint', default='menu', choices=('menu',
+                                                                 'ingredients',
+                                                                 'shopping-list'))
+    loadtest.add_argument('--format', default='html', help='Output format '
+                          '(default: %(default)s).')
+    loadtest.add_argument('-n', '--requests', type=int, default=200,
+                          help='Number of requests (default: %(default)s).')
+    loadtest.add_argument('-c', '--concurrency', type=int, default=8,
+                          help='Number of concurrent clients (default: '
+                          '%(default)s).')
+    loadtest.set_defaults(func=benchmark_loadtest)
+
+    suite = subparsers.add_parser('suite', help='Time and peak memory of '
+                                  'each parsing and rendering stage.  Exits '
+                                  'with non-zero status if a stage regressed '
+                                  'compared to `--compare` baseline.')
+    suite.add_argument('--meals', type=int, default=5, help='Number of meals '
+                       'per synthetic week (default: %(default)s).')
+    suite.add_argument('--items', type=int, default=40, help='Number of '
+                       'synthetic shopping list items (default: '
+                       '%(default)s).')
+    suite.add_argument('--weeks', type=int, default=4, help='Number of '
+                       'synthetic weeks (default: %(default)s).')
+    suite.add_argument('--save', help='Save results as baseline to this '
+                       'path.')
+    suite.add_argument('--compare', help='Compare results to baseline saved '
+                       'at this path.')
+    suite.add_argument('--tolerance', type=float, default=.25,
+                       help='Relative slow down (or memory increase) '
+                       'reported as regression (default: %(default)s).')
+    suite.set_defaults(func=benchmark_suite)
+
+    importtime = subparsers.add_parser('importtime', help='Start up time of '
+                                       'command-line entry points.  Exits '
+                                       'with non-zero status if a heavy '
+                                       'dependency is imported eagerly.')
+    importtime.add_argument('--max-ms', type=float, help='Also fail if any '
+                            'import takes longer than this many '
+                            'milliseconds.')
+    importtime.set_defaults(func=benchmark_importtime)
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    args.func(args)
@@ -0,0 +1,237 @@
+from __future__ import print_function, unicode_literals, division
+import hashlib
+import logging
+import os
+import pickle
+import tempfile
+import time
+
+from . import DEFAULT_PARSER, profiling
+from .menu import extract_menu, ingredients_table, plain_menu
+from .shopping_list import extract_shopping_list
+
+#: Version of extraction output format.  Bump to invalidate existing cache
+#: entries when extraction results change.
+#:
+#: .. versionchanged:: X.X.X
+#:     2: mixed-number quantities, ``tbs``/``pkg`` unit aliases, and single
+#:     pass ingredient decoding.
+#:     3: meal duration, nutrition and notes nested in dishes.
+PARSER_VERSION = 3
+
+
+class ParseCache(object):
+    '''
+    On-disk cache of extraction results, keyed by content hash of the input
+    HTML, the ``bs4`` tree builder, :data:`PARSER_VERSION`, and the versions
+    of ``bs4``, ``pandas`` and ``pint`` (cached tables and quantities are
+    pickled).
+
+    Parameters
+    ----------
+    cache_dir : str
+        Cache directory (created if it does not exist).
+    max_size : int, optional
+        Maximum total size of cache entries in bytes.  Least recently used
+        entries are evicted first.
+    max_age : float, optional
+        Maximum age of cache entries in seconds since last use.
+    '''
+    suffix = '.pickle'
+
+    def __init__(self, cache_dir, max_size=None, max_age=None):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.max_age = max_age
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+
+    def key(self, html, kind, parser=None):
+        '''
+        Parameters
+        ----------
+        html : str
+            Input HTML document.
+        kind : str
+            Kind of extraction result, e.g., ``"menu"``.
+        parser : str, optional
+            ``bs4`` tree builder (default:
+            :data:`dinner_daily_helpers.DEFAULT_PARSER`).
+
+        Returns
+        -------
+        str
+            Cache key.
+        '''
+        import bs4
+        import pandas as pd
+        import pint
+
+        hash_ = hashlib.sha256()
+        hash_.update(('%s:%s:%s:%s:%s:%s:' %
+                      (kind, parser or DEFAULT_PARSER, PARSER_VERSION,
+                       bs4.__version__, pd.__version__, pint.__version__))
+                     .encode('utf8'))
+        hash_.update(html.encode('utf8'))
+        return hash_.hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key + self.suffix)
+
+    def get(self, key):
+        '''
+        Returns
+        -------
+        object
+            Cached object, or ``None`` if :data:`key` is not in the cache (or
+            has expired).
+        '''
+        path = self._path(key)
+        try:
+            if (self.max_age is not None and
+                    time.time() - os.path.getmtime(path) > self.max_age):
+                os.remove(path)
+                return None
+            with open(path, 'rb') as input_:
+                obj = pickle.load(input_)
+        except (IOError, OSError):
+            return None
+        except Exception:
+            # Corrupt (or incompatible) cache entry.
+            logging.debug('Discarding unreadable cache entry: `%s`', path,
+                          exc_info=True)
+            os.remove(path)
+            return None
+        # Mark entry as recently used.
+        os.utime(path, None)
+        return obj
+
+    def put(self, key, obj):
+        '''
+        Write :data:`obj` to cache (atomically), then evict entries exceeding
+        the configured size or age limits.
+        '''
+        fd, temp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                pickle.dump(obj, output, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except Exception:
+            os.remove(temp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        '''
+        Remove entries older than :attr:`max_age`, then remove least recently
+        used entries until total size is at most :attr:`max_size`.
+        '''
+        if self.max_size is None and self.max_age is None:
+            return
+        now = time.time()
+        entries = []
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.suffix):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+                if (self.max_age is not None and
+                        now - stat.st_mtime > self.max_age):
+                    os.remove(path)
+                else:
+                    entries.append((stat.st_mtime, stat.st_size, path))
+            except OSError:
+                # Entry removed concurrently.
+                continue
+        if self.max_size is None:
+            return
+        total_size = sum(size for mtime, size, path in entries)
+        for mtime, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+            total_size -= size
+
+    def clear(self):
+        for name in os.listdir(self.cache_dir):
+            if name.endswith(self.suffix):
+                os.remove(os.path.join(self.cache_dir, name))
+
+
+def _cached(cache, html, kind, parser, func, *args, **kwargs):
+    if cache is None:
+        return func(*args, **kwargs)
+    key = cache.key(html, kind, parser)
+    obj = cache.get(key)
+    if obj is None:
+        profiling.count('parse cache misses')
+        obj = func(*args, **kwargs)
+        cache.put(key, obj)
+    else:
+        profiling.count('parse cache hits')
+    return obj
+
+
+def _extract_plain_menu(menu_html, parser=None):
+    return plain_menu(extract_menu(menu_html, parser=parser))
+
+
+def _extract_shopping_list(shopping_list_html, parser=None):
+    return extract_shopping_list(shopping_list_html, csv=False, parser=parser)
+
+
+def load_menu(menu_html, cache_dir=None, parser=None, ingredients=True,
+              max_size=None, max_age=None):
+    '''
+    Extract menu (and ingredients table) from weekly menu HTML, reusing
+    results cached in :data:`cache_dir` when available.
+
+    Parameters
+    ----------
+    menu_html : str
+        Weekly menu HTML document.
+    cache_dir : str, optional
+        Cache directory.  If not specified, results are not cached.
+    parser : str, optional
+        ``bs4`` tree builder (see :func:`dinner_daily_helpers.parse_html`).
+    ingredients : bool, optional
+        If ``True`` (default), also return decoded ingredients table (see
+        :func:`menu.ingredients_table`).
+    max_size : int, optional
+        Maximum total cache size in bytes.
+    max_age : float, optional
+        Maximum age of cache entries in seconds.
+
+    Returns
+    -------
+    dict or tuple
+        Menu in format returned by :func:`menu.extract_menu` (with plain
+        strings), or ``(menu, df_ingredients)`` if :data:`ingredients` is
+        ``True``.
+    '''
+    cache = (None if cache_dir is None
+             else ParseCache(cache_dir, max_size=max_size, max_age=max_age))
+    menu = _cached(cache, menu_html, 'menu', parser, _extract_plain_menu,
+                   menu_html, parser)
+    if not ingredients:
+        return menu
+    df_ingredients = _cached(cache, menu_html, 'ingredients', parser,
+                             ingredients_table, menu)
+    return menu, df_ingredients
+
+
+def load_shopping_list(shopping_list_html, cache_dir=None, parser=None,
+                       max_size=None, max_age=None):
+    '''
+    Extract shopping list table (see
+    :func:`shopping_list.extract_shopping_list`), reusing result cached in
+    :data:`cache_dir` when available.
+    '''
+    cache = (None if cache_dir is None
+             else ParseCache(cache_dir, max_size=max_size, max_age=max_age))
+    return _cached(cache, shopping_list_html, 'shopping-list', parser,
+                   _extract_shopping_list, shopping_list_html, parser)
@@ -0,0 +1,379 @@
+'''
+Canonical ingredient names, e.g., ``"Cauliflower, small"`` and
+``"cauliflower"`` both map to ``"cauliflower"``, and ``"frozen corn (fresh
+works, too)"`` maps to ``"frozen corn"``.
+
+Accuracy report over an archive of weekly menus, e.g.::
+
+    python -m dinner_daily_helpers.canonical menus/ --expected labels.csv
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import logging
+import re
+import threading
+
+from .menu import PROCESSING_ACTIONS
+
+#: Size qualifiers (removed anywhere in a name).
+SIZE_QUALIFIERS = ('small', 'medium', 'large', 'extra large', 'jumbo')
+#: Unit terms which may be left in the description by
+#: :func:`menu.decode_ingredient` if not defined in the unit registry
+#: (removed at the start of a name), e.g., ``"can black beans"``.
+UNIT_TERMS = ('tbs', 'tbsp', 'tsp', 'can', 'cans', 'jar', 'jars', 'pkg',
+              'slice', 'slices')
+#: Aliases of canonical names (after normalization).
+ALIASES = {'garlic clove': 'garlic', 'green onion': 'scallion',
+           'flat-leaf parsley': 'parsley', 'fresh parsley': 'parsley',
+           'salad greens': 'salad mix', 'kosher salt': 'salt'}
+
+CRE_PARENTHETICAL = re.compile(r'\s*\([^)]*\)')
+CRE_TOKEN = re.compile(r"[a-z0-9]+(?:['-][a-z0-9]+)*|&")
+
+
+def singular(token):
+    '''
+    Returns
+    -------
+    str
+        Singular form of (English) plural noun, using simple suffix rules
+        (e.g., ``"berries"`` becomes ``"berry"``, ``"tomatoes"`` becomes
+        ``"tomato"``, and ``"asparagus"`` is unchanged).
+    '''
+    if len(token) <= 3 or token.endswith(('ss', 'us', 'is')):
+        return token
+    if token.endswith('ies'):
+        return token[:-3] + 'y'
+    if token.endswith('oes'):
+        return token[:-2]
+    if token.endswith('s'):
+        return token[:-1]
+    return token
+
+
+class TermTrie(object):
+    '''
+    Trie over (multi-word) terms, matching every term occurring in a token
+    sequence in a single pass per start position.
+
+    Each term is stored as a path of tokens, with the associated value at the
+    final node.
+    '''
+    _value = object()
+
+    def __init__(self):
+        self.root = {}
+
+    def add(self, term, value):
+        node = self.root
+        for token in term:
+            node = node.setdefault(token, {})
+        node[self._value] = value
+
+    def matches(self, tokens):
+        '''
+        Parameters
+        ----------
+        tokens : list[str]
+            Token sequence.
+
+        Returns
+        -------
+        list[tuple]
+            ``(start, end, value)`` of longest term matching at each start
+            position (if any), for non-overlapping matches, from left to
+            right.
+        '''
+        matches = []
+        start = 0
+        while start < len(tokens):
+            node = self.root
+            match = None
+            for end in range(start, len(tokens)):
+                node = node.get(tokens[end])
+                if node is None:
+                    break
+                if self._value in node:
+                    match = (start, end + 1, node[self._value])
+            if match is None:
+                start += 1
+            else:
+                matches.append(match)
+                start = match[1]
+        return matches
+
+
+class CanonicalIndex(object):
+    '''
+    Map raw ingredient names to canonical names (and integer IDs).
+
+    A raw name is normalized by:
+
+     1. lower case, and removing side dish markers (``*``), parenthetical
+        notes, and trailing comma-separated clauses (e.g., ``", small"``,
+        ``", drained & rinsed"``);
+     2. removing :data:`SIZE_QUALIFIERS`, leading :data:`UNIT_TERMS` and
+        trailing :data:`menu.PROCESSING_ACTIONS`, using a precompiled
+        :class:`TermTrie`;
+     3. converting the last word to singular form.
+
+    If the normalized name contains a known name (see :meth:`add`), the
+    longest known name is the canonical name, e.g., with ``"sesame oil"``
+    known, ``"toasted sesame oil"`` maps to ``"sesame oil"``.  Otherwise,
+    the normalized name is the canonical name.
+
+    Parameters
+    ----------
+    names : list[str], optional
+        Known canonical names.
+    aliases : dict, optional
+        Mapping from alias to canonical name (default: :data:`ALIASES`).
+    '''
+    def __init__(self, names=None, aliases=None):
+        self.terms = TermTrie()
+        for term in SIZE_QUALIFIERS:
+            self.terms.add(term.split(), 'size')
+        for term in UNIT_TERMS:
+            self.terms.add(term.split(), 'unit')
+        for term in PROCESSING_ACTIONS:
+            self.terms.add(term.split(), 'processing')
+        self.names = TermTrie()
+        #: Canonical names, in order of ID.
+        self.ids = []
+        self._id = {}
+        self._cache = {}
+        self._lock = threading.Lock()
+
+        for alias, name in (ALIASES if aliases is None else aliases).items():
+            self.add(name, alias=alias)
+        for name in names or []:
+            self.add(name)
+
+    def add(self, name, alias=None):
+        '''
+        Add known canonical name (or alias of canonical name).
+
+        Parameters
+        ----------
+        name : str
+            Canonical name.
+        alias : str, optional
+            Alternative name mapped to :data:`name` (only the alias is added
+            as a known name; e.g., ``"garlic powder"`` does not map to
+            ``"garlic"`` because of the alias ``"garlic clove"``).
+        '''
+        name = self.normalize(name)
+        term = name if alias is None else self.normalize(alias)
+        with self._lock:
+            self.names.add(term.split(), name)
+            # Canonical names of previously seen raw names may change.
+            self._cache.clear()
+
+    def normalize(self, raw_name):
+        '''
+        Returns
+        -------
+        str
+            Normalized form of :data:`raw_name` (see
+            :class:`CanonicalIndex`).
+        '''
+        name = raw_name.lower().replace('*', '')
+        name = CRE_PARENTHETICAL.sub('', name).split(',')[0]
+        tokens = CRE_TOKEN.findall(name)
+        remove = set()
+        for start, end, kind in self.terms.matches(tokens):
+            if (kind == 'size' or (kind == 'unit' and start == 0) or
+                    (kind == 'processing' and end == len(tokens))):
+                remove.update(range(start, end))
+        tokens = [token for i, token in enumerate(tokens) if i not in remove]
+        if tokens:
+            tokens[-1] = singular(tokens[-1])
+        return ' '.join(tokens)
+
+    def canonical(self, raw_name):
+        '''
+        Returns
+        -------
+        str
+            Canonical name of :data:`raw_name` (memoized).
+        '''
+        name = self._cache.get(raw_name)
+        if name is None:
+            name = self.normalize(raw_name)
+            matches = self.names.matches(name.split())
+            if matches:
+                # Longest known name.
+                name = max(matches, key=lambda match: match[1] - match[0])[2]
+            self._cache[raw_name] = name
+        return name
+
+    def canonicalize(self, raw_names):
+        '''
+        Parameters
+        ----------
+        raw_names : pandas.Series
+            Raw ingredient names.
+
+        Returns
+        -------
+        pandas.Series
+            Canonical names, indexed like :data:`raw_names`.  Each distinct
+            raw name is only looked up once.
+        '''
+        import numpy as np
+        import pandas as pd
+
+        codes, uniques = pd.factorize(raw_names)
+        canonical = np.array([self.canonical(name_i) for name_i in uniques] +
+                             [None], dtype=object)
+        return pd.Series(canonical[codes], index=raw_names.index,
+                         name=raw_names.name)
+
+    def canonical_ids(self, raw_names):
+        '''
+        Parameters
+        ----------
+        raw_names : pandas.Series
+            Raw ingredient names.
+
+        Returns
+        -------
+        pandas.Series
+            Integer ID of each canonical name (see :attr:`ids`), indexed like
+            :data:`raw_names`, or -1 for missing names.  IDs are assigned in
+            order of first occurrence, and are stable for the lifetime of the
+            index.
+        '''
+        import numpy as np
+        import pandas as pd
+
+        codes, uniques = pd.factorize(raw_names)
+        with self._lock:
+            ids = []
+            for name_i in uniques:
+                name_i = self.canonical(name_i)
+                if name_i not in self._id:
+                    self._id[name_i] = len(self.ids)
+                    self.ids.append(name_i)
+                ids.append(self._id[name_i])
+        ids = np.array(ids + [-1], dtype=int)
+        return pd.Series(ids[codes], index=raw_names.index,
+                         name=raw_names.name)
+
+
+_default_index = None
+
+
+def default_index():
+    '''
+    Returns
+    -------
+    CanonicalIndex
+        Shared index with default :data:`ALIASES` (created on first call).
+    '''
+    global _default_index
+
+    if _default_index is None:
+        _default_index = CanonicalIndex()
+    return _default_index
+
+
+def canonicalize(raw_names):
+    '''
+    Same as :meth:`CanonicalIndex.canonicalize`, using
+    :func:`default_index`.
+    '''
+    return default_index().canonicalize(raw_names)
+
+
+def accuracy_report(raw_names, index=None, expected=None):
+    '''
+    Parameters
+    ----------
+    raw_names : pandas.Series
+        Raw ingredient names, e.g., from all menus in an archive.
+    index : CanonicalIndex, optional
+        Index (default: :func:`default_index`).
+    expected : dict, optional
+        Expected canonical name of (some) raw names.
+
+    Returns
+    -------
+    dict
+        Report with the following keys:
+
+         - ``raw_names``: number of distinct raw names;
+         - ``canonical_names``: number of distinct canonical names;
+         - ``merged``: mapping from each canonical name to its distinct raw
+           names, for canonical names with more than one raw name;
+         - ``labelled``, ``correct``, ``accuracy`` and ``errors`` (list of
+           ``(raw, expected, actual)``): only if :data:`expected` is
+           specified.
+    '''
+    index = index or default_index()
+    uniques = raw_names.dropna().unique()
+    canonical = {raw: index.canonical(raw) for raw in uniques}
+    groups = {}
+    for raw, name in canonical.items():
+        groups.setdefault(name, []).append(raw)
+    report = {'raw_names': len(uniques), 'canonical_names': len(groups),
+              'merged': {name: sorted(raws) for name, raws in groups.items()
+                         if len(raws) > 1}}
+    if expected is not None:
+        errors = [(raw, expected_i, index.canonical(raw))
+                  for raw, expected_i in sorted(expected.items())
+                  if index.canonical(raw) != expected_i]
+        report.update(labelled=len(expected),
+                      correct=len(expected) - len(errors),
+                      accuracy=(1 - len(errors) / len(expected)
+                                if expected else None),
+                      errors=errors)
+    return report
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Report how ingredient '
+                                     'names in weekly menus are '
+                                     'canonicalized.')
+
+    parser.add_argument('input', help='Directory containing weekly menu HTML '
+                        'documents, or glob pattern (e.g., `"2019-*.html"`).')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='Number of worker processes (default: number of '
+                        'CPUs).')
+    parser.add_argument('--expected', help='CSV file with `raw` and '
+                        '`canonical` columns of expected canonical names.')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    import pandas as pd
+
+    from .batch import extract_ingredients_tables, find_menus
+
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    paths = find_menus(args.input)
+    if not paths:
+        raise SystemExit('No weekly menu documents found matching `%s`.' %
+                         args.input)
+    df_ingredients = extract_ingredients_tables(paths,
+                                                processes=args.processes)
+    expected = None
+    if args.expected:
+        df_expected = pd.read_csv(args.expected)
+        expected = dict(zip(df_expected['raw'], df_expected['canonical']))
+
+    report = accuracy_report(df_ingredients['ingredient'], expected=expected)
+    print('Distinct raw names:       %d' % report['raw_names'])
+    print('Distinct canonical names: %d' % report['canonical_names'])
+    for name, raws in sorted(report['merged'].items()):
+        print('  %s <- %s' % (name, ' | '.join(raws)))
+    if expected is not None:
+        print('Accuracy: %d of %d (%.1f%%)' % (report['correct'],
+                                               report['labelled'],
+                                               100 * report['accuracy']))
+        for raw, expected_i, actual in report['errors']:
+            print('  %r: expected %r, got %r' % (raw, expected_i, actual))
@@ -0,0 +1,331 @@
+'''
+Change detection between two versions of a weekly menu or shopping list,
+e.g., to only republish notifications when a menu was edited::
+
+    python -m dinner_daily_helpers.diff old-menu.html new-menu.html
+
+Each meal (and, for modified meals, each recipe) is identified by a content
+digest, so unchanged subtrees are skipped by comparing digests.  Digests of
+a previous version may also be stored (see :func:`menu_digest` and
+:func:`shopping_list_digest`) to detect changes without keeping (or
+parsing) the previous version.
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import collections
+import hashlib
+import json
+
+from .menu import decode_ingredient
+from .shopping_list import FIELDS
+
+#: Menu header fields.
+MENU_FIELDS = ('title', 'store', 'date', 'servings')
+#: Meal fields compared directly (i.e., excluding recipes).
+MEAL_FIELDS = ('duration', 'nutrition', 'notes')
+
+
+def digest(value):
+    '''
+    Returns
+    -------
+    str
+        Hex digest of JSON-serializable :data:`value` (e.g., a meal or recipe
+        returned by :func:`menu.extract_menu`), independent of dict key order.
+    '''
+    return hashlib.sha1(json.dumps(value, sort_keys=True)
+                        .encode('utf8')).hexdigest()
+
+
+def _meal_digests(menu):
+    return [digest(meal) for meal in menu['meals']]
+
+
+def menu_digest(menu, meal_digests=None):
+    '''
+    Parameters
+    ----------
+    menu : dict
+        Menu in format returned by :func:`menu.extract_menu`.
+
+    Returns
+    -------
+    str
+        Hex digest of menu, computed from the header fields and the digest of
+        each meal.
+    '''
+    if meal_digests is None:
+        meal_digests = _meal_digests(menu)
+    return digest([[menu.get(key) for key in MENU_FIELDS], meal_digests])
+
+
+def _meal_title(meal):
+    return meal['main_dish'].get('title')
+
+
+def _match(old, new, old_digests, new_digests, key):
+    '''
+    Match items of :data:`old` and :data:`new` sequences.
+
+    Returns
+    -------
+    removed, added : list
+        Unmatched items.
+    modified : list[tuple]
+        ``(old_item, new_item)`` pairs with equal :data:`key` but different
+        digests.  Items with equal digests are skipped.
+    '''
+    unmatched = collections.defaultdict(list)
+    for digest_i, item in zip(old_digests, old):
+        unmatched[digest_i].append(item)
+    changed_new = []
+    for digest_i, item in zip(new_digests, new):
+        if unmatched.get(digest_i):
+            # Unchanged.
+            unmatched[digest_i].pop(0)
+        else:
+            changed_new.append(item)
+    changed_old = collections.defaultdict(list)
+    for items in unmatched.values():
+        for item in items:
+            changed_old[key(item)].append(item)
+
+    added = []
+    modified = []
+    for item in changed_new:
+        if changed_old.get(key(item)):
+            modified.append((changed_old[key(item)].pop(0), item))
+        else:
+            added.append(item)
+    removed = [item for items in changed_old.values() for item in items]
+    return removed, added, modified
+
+
+def _field_changes(old, new, fields):
+    return {key: [old.get(key), new.get(key)] for key in fields
+            if old.get(key) != new.get(key)}
+
+
+def _ingredient_changes(old, new):
+    # Ingredients removed/added, and quantity/unit changes of ingredients
+    # with the same description and processing instructions.
+    old_counts = collections.Counter(old)
+    new_counts = collections.Counter(new)
+    removed = list((old_counts - new_counts).elements())
+    added = list((new_counts - old_counts).elements())
+
+    def key(ingredient):
+        quantity, unit, description, processing = \
+            decode_ingredient(ingredient)
+        return description.lower(), processing
+
+    removed_by_key = collections.defaultdict(list)
+    for ingredient in removed:
+        removed_by_key[key(ingredient)].append(ingredient)
+    quantities = []
+    added_ = []
+    for ingredient in added:
+        if removed_by_key.get(key(ingredient)):
+            old_ingredient = removed_by_key[key(ingredient)].pop(0)
+            quantities.append([old_ingredient, ingredient])
+        else:
+            added_.append(ingredient)
+    changes = {'added': added_,
+               'removed': [ingredient for ingredients
+                           in removed_by_key.values()
+                           for ingredient in ingredients],
+               'quantity': quantities}
+    return {k: v for k, v in changes.items() if v}
+
+
+def _recipe_changes(old, new):
+    changes = {}
+    ingredients = _ingredient_changes(old['ingredients'], new['ingredients'])
+    if ingredients:
+        changes['ingredients'] = ingredients
+    if old['instructions'] != new['instructions']:
+        changes['instructions'] = [old['instructions'], new['instructions']]
+    return changes
+
+
+def _meal_changes(old, new):
+    changes = {'title': _meal_title(new)}
+    fields = _field_changes(old, new, MEAL_FIELDS)
+    if fields:
+        changes['fields'] = fields
+    old_recipes = [old['main_dish']] + old['side_dishes']
+    new_recipes = [new['main_dish']] + new['side_dishes']
+    removed, added, modified = _match(old_recipes, new_recipes,
+                                      map(digest, old_recipes),
+                                      map(digest, new_recipes),
+                                      lambda recipe: recipe.get('title'))
+    recipes = {'added': [recipe.get('title') for recipe in added],
+               'removed': [recipe.get('title') for recipe in removed],
+               'modified': [dict(title=new_i.get('title'),
+                                 **_recipe_changes(old_i, new_i))
+                            for old_i, new_i in modified]}
+    recipes = {k: v for k, v in recipes.items() if v}
+    if recipes:
+        changes['recipes'] = recipes
+    return changes
+
+
+def diff_menus(old, new):
+    '''
+    Parameters
+    ----------
+    old, new : dict
+        Menus in format returned by :func:`menu.extract_menu`.
+
+    Returns
+    -------
+    dict
+        Change set with the keys:
+
+         - ``changed``: ``True`` if menus differ;
+         - ``fields``: ``{field: [old, new]}`` of changed header fields;
+         - ``meals``: ``added`` and ``removed`` meal titles, and
+           ``modified`` meals (matched by title), each with ``title``, and
+           (if changed) ``fields`` (e.g., ``duration``), and ``recipes``
+           changes: ``added`` and ``removed`` recipe titles, and
+           ``modified`` recipes with ``ingredients`` (``added``,
+           ``removed``, and ``quantity`` changes as ``[old, new]``) and
+           ``instructions`` changes.
+
+        Empty entries are omitted, e.g., ``{"changed": False}`` if menus are
+        equal.
+    '''
+    old_digests = _meal_digests(old)
+    new_digests = _meal_digests(new)
+    if menu_digest(old, old_digests) == menu_digest(new, new_digests):
+        return {'changed': False}
+
+    changes = {'changed': True}
+    fields = _field_changes(old, new, MENU_FIELDS)
+    if fields:
+        changes['fields'] = fields
+    removed, added, modified = _match(old['meals'], new['meals'],
+                                      old_digests, new_digests, _meal_title)
+    meals = {'added': [_meal_title(meal) for meal in added],
+             'removed': [_meal_title(meal) for meal in removed],
+             'modified': [_meal_changes(old_i, new_i)
+                          for old_i, new_i in modified]}
+    meals = {k: v for k, v in meals.items() if v}
+    if meals:
+        changes['meals'] = meals
+    return changes
+
+
+def _json_value(value):
+    # E.g., numpy integers and booleans, and `nan` (missing quantity of
+    # staples) from `extract_shopping_list` table.
+    if value != value:
+        return None
+    return value.item() if hasattr(value, 'item') else value
+
+
+def _shopping_list_records(shopping_list):
+    if hasattr(shopping_list, 'itertuples'):
+        # Table returned by `extract_shopping_list`.
+        records = shopping_list[list(FIELDS)].itertuples(index=False,
+                                                         name=None)
+    else:
+        records = shopping_list
+    return [tuple(map(_json_value, record)) for record in records]
+
+
+def shopping_list_digest(shopping_list):
+    '''
+    Parameters
+    ----------
+    shopping_list : pandas.DataFrame or iterable
+        Table returned by :func:`shopping_list.extract_shopping_list`, or
+        records yielded by :func:`shopping_list.iter_shopping_list`.
+
+    Returns
+    -------
+    str
+        Hex digest of shopping list items (independent of item order).
+    '''
+    return digest(sorted(_shopping_list_records(shopping_list), key=repr))
+
+
+def diff_shopping_lists(old, new):
+    '''
+    Parameters
+    ----------
+    old, new : pandas.DataFrame or iterable
+        Shopping lists (see :func:`shopping_list_digest`).
+
+    Returns
+    -------
+    dict
+        Change set with the keys ``changed``, and (if not empty) ``added``
+        and ``removed`` items (as dicts with the fields of
+        :class:`shopping_list.ShoppingListItem`), and ``quantity`` changes
+        (items with ``quantity`` as ``[old, new]``) of items with the same
+        category, meal, ingredient and side dish flag.
+    '''
+    old_counts = collections.Counter(_shopping_list_records(old))
+    new_counts = collections.Counter(_shopping_list_records(new))
+    if old_counts == new_counts:
+        return {'changed': False}
+
+    def item(record, quantity=None):
+        item_ = dict(zip(FIELDS, record))
+        if quantity is not None:
+            item_['quantity'] = quantity
+        return item_
+
+    removed = collections.defaultdict(list)
+    for record in (old_counts - new_counts).elements():
+        removed[record[:-1]].append(record)
+    added = []
+    quantities = []
+    for record in (new_counts - old_counts).elements():
+        if removed.get(record[:-1]):
+            old_record = removed[record[:-1]].pop(0)
+            quantities.append(item(record, [old_record[-1], record[-1]]))
+        else:
+            added.append(item(record))
+    changes = {'changed': True, 'added': added,
+               'removed': [item(record) for records in removed.values()
+                           for record in records],
+               'quantity': quantities}
+    return {k: v for k, v in changes.items() if v or k == 'changed'}
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Show changes between two '
+                                     'versions of a weekly menu (or shopping '
+                                     'list).  Exits with status 1 if they '
+                                     'differ.')
+
+    parser.add_argument('old', help='Previous HTML document.')
+    parser.add_argument('new', help='Current HTML document.')
+    parser.add_argument('--shopping-list', action='store_true', help='Compare '
+                        'shopping lists instead of weekly menus.')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    documents = []
+    for path in (args.old, args.new):
+        with open(path, 'r') as input_:
+            documents.append(input_.read())
+
+    if args.shopping_list:
+        from .shopping_list import iter_shopping_list
+
+        changes = diff_shopping_lists(*[iter_shopping_list(document)
+                                        for document in documents])
+    else:
+        from .menu import extract_menu, plain_menu
+
+        changes = diff_menus(*[plain_menu(extract_menu(document))
+                               for document in documents])
+    print(json.dumps(changes, indent=4, sort_keys=True))
+    if changes['changed']:
+        raise SystemExit(1)
@@ -1,42 +1,367 @@
 import argparse
+import concurrent.futures as cf
+import datetime as dt
+import hashlib
+import itertools as it
+import json
 import logging
 import os
 import re
+import uuid
 
-import dateparser
 import requests
+import requests.adapters
+from six.moves.html_parser import HTMLParser
+from urllib3.util.retry import Retry
 
 from .menu import extract_menu
 
 DEFAULT_STORE = os.environ.get('DINNER_DAILY_STORE', 'Any Store')
+LOGIN_URL = 'https://thedinnerdaily.com/cms/wp-login.php'
+MENUS_URL = 'https://db.thedinnerdaily.com/menus/'
+WEEKS = ('current', 'previous')
+PAGES = ('weekly-menu', 'shopping-list')
+#: Name of manifest file (in output directory) used by incremental downloads.
+MANIFEST_NAME = '.dinner-daily-manifest.json'
+#: End of weekly menu header.
+CRE_HEADER_END = re.compile(r'</header\s*>', re.IGNORECASE)
+#: Weekly menu date in ``<month> <start> to <end>`` format, e.g., ``"Oct 28
+#: to 03"`` or ``"September 30 to 06"``.
+CRE_MENU_DATE = re.compile(r'\b(?P<month>[A-Za-z]{3})[A-Za-z]*\.?\s+'
+                           r'(?P<start>\d{1,2})\s+to\s+(?P<end>\d{1,2})\b')
+MONTHS = ('jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep',
+          'oct', 'nov', 'dec')
+#: HTML elements without end tag.
+VOID_ELEMENTS = frozenset(['area', 'base', 'br', 'col', 'embed', 'hr', 'img',
+                           'input', 'link', 'meta', 'source', 'track', 'wbr'])
+#: Start tags which implicitly close an open element (without an end tag),
+#: keyed by the implicitly closed element, e.g., ``<p>a<p>b`` or
+#: ``<li>a<li>b``.
+IMPLICIT_END = {'p': frozenset(['address', 'article', 'aside', 'blockquote',
+                                'div', 'dl', 'fieldset', 'footer', 'form',
+                                'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header',
+                                'hr', 'main', 'nav', 'ol', 'p', 'pre',
+                                'section', 'table', 'ul']),
+                'li': frozenset(['li']), 'dt': frozenset(['dd', 'dt']),
+                'dd': frozenset(['dd', 'dt']),
+                'option': frozenset(['optgroup', 'option'])}
 
 
-def login(username, password):
+def create_session(retries=3, backoff_factor=0.5, pool_size=10):
+    '''
+    Parameters
+    ----------
+    retries : int, optional
+        Number of times to retry failed requests (connection errors and
+        ``5xx``/``429`` responses).
+    backoff_factor : float, optional
+        Exponential backoff factor (in seconds) between retries.
+    pool_size : int, optional
+        Maximum number of pooled connections per host.
+
+    Returns
+    -------
+    requests.Session
+        Session with pooled connections that retries failed requests.
+    '''
+    session = requests.Session()
+    retry = Retry(total=retries, backoff_factor=backoff_factor,
+                  status_forcelist=(429, 500, 502, 503, 504))
+    adapter = requests.adapters.HTTPAdapter(pool_connections=pool_size,
+                                            pool_maxsize=pool_size,
+                                            max_retries=retry)
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def login(username, password, session=None, login_url=LOGIN_URL):
     '''
     Log in to the Dinner Daily website.
 
+    .. versionchanged:: X.X.X
+        Add ``session`` and ``login_url`` kwargs.
+
     Returns
     -------
     requests.Session
         Use session methods (e.g., ``get()``, ``post()``) to use
         authenticated access.
     '''
-    session = requests.Session()
-    url = 'https://thedinnerdaily.com/cms/wp-login.php'
+    if session is None:
+        session = requests.Session()
 
     data = {'log': username, 'pwd': password,
             'wp-submit': 'Log In',
             'redirect_to': 'https://thedinnerdaily.com/cms/wp-admin/',
             'testcookie': 1}
     headers = {'referer': 'https://thedinnerdaily.com/'}
-    response = session.get(url)
-    response = session.post(url, data=data, headers=headers)
+    response = session.get(login_url)
+    response = session.post(login_url, data=data, headers=headers)
     assert(response.status_code == 200)
     return session
 
 
+class _HeaderParser(HTMLParser):
+    '''
+    Event-based parser collecting the date text of a weekly menu header, in
+    either the format used up until 2019-03-17 (``header > h2``, e.g.,
+    ``"Any Store - Oct 28 to 03 - 4 servings"``) or after
+    (``header .theme-date``, e.g., ``"Week of - Oct 28 to 03"``).
+    '''
+    def __init__(self):
+        HTMLParser.__init__(self)
+        #: Date text, or ``None`` if not found.
+        self.date_text = None
+        # Open elements within `header` (including `header`), innermost last.
+        self._stack = []
+        # Stack size with the element currently collected open (`None` if
+        # not collecting).
+        self._collect_depth = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_ELEMENTS:
+            return
+        if not self._stack:
+            if tag == 'header':
+                self._stack.append(tag)
+            return
+        # Close elements implicitly ended by this tag (see `IMPLICIT_END`).
+        while tag in IMPLICIT_END.get(self._stack[-1], ()):
+            self._pop()
+        self._stack.append(tag)
+        if self._collect_depth is None and self.date_text is None:
+            classes = (dict(attrs).get('class') or '').split()
+            if ((tag == 'h2' and len(self._stack) == 2) or
+                    'theme-date' in classes):
+                self.date_text = ''
+                self._collect_depth = len(self._stack)
+
+    def handle_endtag(self, tag):
+        if tag not in self._stack:
+            # Stray end tag (or not in header).
+            return
+        # Close unclosed descendants, e.g., `<li>` at `</ul>`.
+        while self._pop() != tag:
+            pass
+
+    def handle_data(self, data):
+        if self._collect_depth is not None:
+            self.date_text += data
+
+    def _pop(self):
+        if len(self._stack) == self._collect_depth:
+            self._collect_depth = None
+        return self._stack.pop()
+
+
+def header_date(menu_html):
+    '''
+    Extract date text from weekly menu header, parsing only up to the end of
+    the ``<header>`` element.
+
+    Returns
+    -------
+    str
+        Date text of weekly menu header (see :class:`_HeaderParser`), or
+        ``None`` if not found.
+    '''
+    match = CRE_HEADER_END.search(menu_html)
+    if match is None:
+        return None
+    parser = _HeaderParser()
+    parser.feed(menu_html[:match.end()])
+    parser.close()
+    return parser.date_text
+
+
+def parse_start_date(date_text):
+    '''
+    Parameters
+    ----------
+    date_text : str
+        Weekly menu date, e.g., ``"Oct 28 to 03"``.
+
+    Returns
+    -------
+    datetime.datetime
+        Start date of weekly menu (in the current year, like
+        ``dateparser``), or ``None`` if :data:`date_text` is not recognized.
+
+        Dates in ``<month> <start> to <end>`` format are parsed using
+        :data:`CRE_MENU_DATE`; ``dateparser`` is only used for other formats.
+    '''
+    match = CRE_MENU_DATE.search(date_text)
+    if match is not None and match.group('month').lower() in MONTHS:
+        try:
+            return dt.datetime(dt.datetime.now().year,
+                               MONTHS.index(match.group('month').lower()) + 1,
+                               int(match.group('start')))
+        except ValueError:
+            pass
+    import dateparser
+
+    return dateparser.parse(re.sub(r' to .*', '', date_text))
+
+
+def menu_date(menu_html):
+    '''
+    .. versionchanged:: X.X.X
+        Only parse weekly menu header (see :func:`header_date`), falling back
+        to extracting the full menu if the header date is not recognized.
+
+    Returns
+    -------
+    datetime.datetime
+        Start date of weekly menu.
+    '''
+    date_text = header_date(menu_html)
+    if date_text is not None:
+        match = CRE_MENU_DATE.search(date_text)
+        if match is not None:
+            date = parse_start_date(match.group(0))
+            if date is not None:
+                return date
+    return start_date(extract_menu(menu_html))
+
+
+def start_date(menu):
+    '''
+    Parameters
+    ----------
+    menu : dict
+        Menu in format returned by :func:`menu.extract_menu`.
+
+    Returns
+    -------
+    datetime.datetime
+        Start date of weekly menu (without parsing the menu again).
+    '''
+    return parse_start_date(menu['date'])
+
+
+def write_atomic(path, text):
+    '''
+    Write text to file by writing to a temporary file in the same directory
+    and then renaming it, so readers never see a partially written file.
+    '''
+    temp_path = '%s.%s.tmp' % (path, uuid.uuid4().hex)
+    try:
+        with open(temp_path, 'w') as output:
+            output.write(text)
+        os.replace(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def load_manifest(output_dir):
+    '''
+    Returns
+    -------
+    dict
+        Incremental download manifest of :data:`output_dir`, i.e., mapping
+        from ``"<store>/<week>"`` to start ``date`` and, for each page in
+        :data:`PAGES`, ``etag``, ``last_modified``, ``sha256``, ``size``, and
+        output file ``name``.  Empty if no manifest exists.
+    '''
+    try:
+        with open(os.path.join(output_dir, MANIFEST_NAME), 'r') as input_:
+            return json.load(input_)
+    except (IOError, OSError, ValueError):
+        return {}
+
+
+def _fetch(session, url, entry=None):
+    '''
+    Returns
+    -------
+    text : str
+        Page text, or ``None`` if page is unchanged since :data:`entry` was
+        recorded.
+    entry : dict
+        Manifest entry of page (see :func:`load_manifest`).
+    bytes_saved : int
+        Number of bytes not downloaded because page was not modified.
+    '''
+    headers = {}
+    if entry is not None:
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    response = session.get(url, headers=headers)
+    if entry is not None and response.status_code == 304:
+        return None, entry, entry.get('size', 0)
+    response.raise_for_status()
+
+    text = response.text
+    new_entry = {'etag': response.headers.get('ETag'),
+                 'last_modified': response.headers.get('Last-Modified'),
+                 'sha256': hashlib.sha256(text.encode('utf8')).hexdigest(),
+                 'size': len(response.content)}
+    if entry is not None and entry.get('sha256') == new_entry['sha256']:
+        new_entry['name'] = entry['name']
+        return None, new_entry, 0
+    return text, new_entry, 0
+
+
+def _page_urls(store, week_, base_url=MENUS_URL):
+    if week_ not in WEEKS:
+        raise ValueError('`week` must be either `current` or `previous`.')
+    return (base_url + 'print/%s/%s' % (store, week_),
+            base_url + 'print-shopping-list/%s/%s' % (store, week_))
+
+
+def _manifest_entries(output_dir, manifest, store, week_):
+    # Only use entries for pages with existing output files.
+    job_entry = manifest.get('%s/%s' % (store, week_), {})
+    return [job_entry.get(page) if job_entry.get(page) and
+            os.path.exists(os.path.join(output_dir, job_entry[page]['name']))
+            else None for page in PAGES]
+
+
+def _write_week(output_dir, store, fetched, job_entry, report):
+    texts = [text for text, entry, bytes_saved in fetched]
+    entries = [entry for text, entry, bytes_saved in fetched]
+
+    if texts[0] is not None:
+        # Scrape date from menu HTML to use in file name.
+        date = menu_date(texts[0]).strftime('%Y-%m-%d')
+    else:
+        # Weekly menu is unchanged, so reuse date from manifest.
+        date = job_entry['date']
+    out_name_fmt = '%s-%%s-%s.html' % (date, store)
+
+    paths = []
+    for page, text, entry in zip(PAGES, texts, entries):
+        name = out_name_fmt % page
+        path = os.path.join(output_dir, name)
+        if text is None and entry['name'] != name:
+            # Page is unchanged, but start date changed.
+            with open(os.path.join(output_dir, entry['name']), 'r') as input_:
+                text = input_.read()
+        if text is None:
+            report['skipped'].append(path)
+            logging.info('Skipped unchanged %s: `%s`', page, path)
+        else:
+            write_atomic(path, text)
+            report['fetched'].append(path)
+            logging.info('Wrote %s to: `%s`', page, path)
+        entry['name'] = name
+        paths.append(path)
+
+    job_entry.clear()
+    job_entry['date'] = date
+    job_entry.update(zip(PAGES, entries))
+    report['bytes_saved'] += sum(bytes_saved for text, entry, bytes_saved
+                                 in fetched)
+    return tuple(paths)
+
+
 def download(week_, output_dir, session=None, username=None, password=None,
-             store=DEFAULT_STORE):
+             store=DEFAULT_STORE, base_url=MENUS_URL, incremental=False,
+             report=None):
     '''
     .. versionchanged:: X.X.X
         Parse start date from new ``<month> <start> to <end>`` format (e.g.,
@@ -44,53 +369,124 @@ def download(week_, output_dir, session=None, username=None, password=None,
     .. versionchanged:: X.X.X
         Add ``username`` and ``password`` kwargs. Use these to authenticate
         session for download.
+    .. versionchanged:: X.X.X
+        Write files atomically to :data:`output_dir` without changing the
+        working directory.  Add ``base_url`` kwarg.  Return output paths.
+    .. versionchanged:: X.X.X
+        Add ``incremental`` and ``report`` kwargs (see
+        :func:`download_many`).
+
+    Returns
+    -------
+    tuple[str, str]
+        Weekly menu and shopping list output paths.
     '''
-    if week_ not in ('current', 'previous'):
-        raise ValueError('`week` must be either `current` or `previous`.')
+    errors = {}
+    results = download_many([store], [week_], output_dir, session=session,
+                            username=username, password=password,
+                            max_workers=len(PAGES), base_url=base_url,
+                            incremental=incremental, report=report,
+                            errors=errors)
+    if errors:
+        raise errors[(store, week_)]
+    return results[(store, week_)]
+
+
+def download_many(stores, weeks, output_dir, session=None, username=None,
+                  password=None, max_workers=4, retries=3, backoff_factor=0.5,
+                  base_url=MENUS_URL, login_url=LOGIN_URL, errors=None,
+                  incremental=False, report=None):
+    '''
+    Download weekly menus and shopping lists for every combination of
+    :data:`stores` and :data:`weeks`, fetching pages concurrently through a
+    single authenticated session.
 
-    base_url = 'https://db.thedinnerdaily.com/menus/'
+    Parameters
+    ----------
+    stores : list[str]
+        Store names.
+    weeks : list[str]
+        Weeks, each either ``"current"`` or ``"previous"``.
+    output_dir : str
+        Output directory.
+    session : requests.Session, optional
+        Authenticated session.  If not specified, log in using
+        :data:`username` and :data:`password` with a pooled session (see
+        :func:`create_session`).
+    max_workers : int, optional
+        Maximum number of concurrent requests.
+    retries, backoff_factor : optional
+        Retry settings of pooled session (see :func:`create_session`).
+    errors : dict, optional
+        If specified, add ``(store, week) -> exception`` entry for each
+        store/week that failed to download.
+    incremental : bool, optional
+        If ``True``, send conditional requests based on the manifest in
+        :data:`output_dir` (see :func:`load_manifest`), and skip parsing and
+        writing pages that are unchanged since the last download.
+    report : dict, optional
+        If specified, set ``fetched`` (list of paths written), ``skipped``
+        (list of unchanged paths), and ``bytes_saved`` (number of bytes not
+        downloaded due to ``304 Not Modified`` responses).
+
+    Returns
+    -------
+    dict
+        Mapping from ``(store, week)`` to weekly menu and shopping list
+        output paths, for each store/week downloaded successfully.
+    '''
+    jobs = list(it.product(stores, weeks))
+    urls = {job: _page_urls(job[0], job[1], base_url) for job in jobs}
 
     if session is None:
         if any((username is None, password is None)):
             raise ValueError('Either `session` or `username` _and_ `password` '
                              'must be specified.')
-        else:
-            session = login(username, password)
-
-    # Download weekly menu using browser cookies.
-    menu_response = session.get(base_url + 'print/%s/%s' % (store, week_))
-    # Scrape date from menu HTML to use in file name.
-    menu = extract_menu(menu_response.text)
-    menu['date'] = re.sub(r' to .*', '', menu['date'])
-    menu_date = dateparser.parse(menu['date'])
-    # Download weekly shopping list using browser cookies.
-    list_response = session.get(base_url + 'print-shopping-list/%s/%s' %
-                                (store, week_))
-
-    cwd = os.getcwd()
-    try:
-        os.chdir(output_dir)
-        out_name_fmt = '%s-%%s-%s.html' % (menu_date.strftime('%Y-%m-%d'),
-                                           store)
+        session = login(username, password,
+                        session=create_session(retries=retries,
+                                               backoff_factor=backoff_factor,
+                                               pool_size=max_workers),
+                        login_url=login_url)
 
-        out_name = out_name_fmt % 'weekly-menu'
-        with open(out_name, 'w') as output:
-            output.write(menu_response.text)
-        logging.info('Wrote weekly menu to: `%s`' % out_name)
+    # Manifest is only read and written by incremental downloads.
+    manifest = load_manifest(output_dir) if incremental else {}
+    if report is None:
+        report = {}
+    report.update(fetched=[], skipped=[], bytes_saved=0)
 
-        out_name = out_name_fmt % 'shopping-list'
-        with open(out_name, 'w') as output:
-            output.write(list_response.text)
-        logging.info('Wrote weekly menu to: `%s`' % out_name)
-    finally:
-        os.chdir(cwd)
+    results = {}
+    with cf.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pages = {job: [executor.submit(_fetch, session, url, entry)
+                       for url, entry in
+                       zip(urls[job],
+                           _manifest_entries(output_dir, manifest, *job))]
+                 for job in jobs}
+        for job in jobs:
+            try:
+                fetched = [page.result() for page in pages[job]]
+                results[job] = _write_week(output_dir, job[0], fetched,
+                                           manifest.setdefault('%s/%s' % job,
+                                                               {}), report)
+            except Exception as exception:
+                logging.error('Failed to download `%s` week of `%s`: %s',
+                              job[1], job[0], exception)
+                manifest.pop('%s/%s' % job, None)
+                if errors is not None:
+                    errors[job] = exception
 
+    if incremental:
+        write_atomic(os.path.join(output_dir, MANIFEST_NAME),
+                     json.dumps(manifest, indent=2, sort_keys=True))
+    logging.info('Fetched %d files, skipped %d unchanged files (%d bytes '
+                 'saved)', len(report['fetched']), len(report['skipped']),
+                 report['bytes_saved'])
+    return results
 
 
 def parse_args():
     parser = argparse.ArgumentParser()
 
-    parser.add_argument('week', choices=('current', 'previous'))
+    parser.add_argument('week', choices=WEEKS, nargs='+')
     parser.add_argument('--username',
                         default=os.environ.get('DINNER_DAILY_USERNAME'),
                         help='Dinner Daily username (default: '
@@ -99,8 +495,18 @@ def parse_args():
                         default=os.environ.get('DINNER_DAILY_PASSWORD'),
                         help='Dinner Daily password (default: '
                         '`DINNER_DAILY_PASSWORD` environment variable).')
-    parser.add_argument('--store', default=DEFAULT_STORE, help='Store '
-                        '(default: %(default)s)')
+    parser.add_argument('--store', action='append', help='Store (default: '
+                        '%s).  May be specified multiple times.' %
+                        DEFAULT_STORE)
+    parser.add_argument('--max-workers', type=int, default=4, help='Maximum '
+                        'number of concurrent requests (default: '
+                        '%(default)s).')
+    parser.add_argument('--retries', type=int, default=3, help='Number of '
+                        'times to retry failed requests (default: '
+                        '%(default)s).')
+    parser.add_argument('--incremental', action='store_true', help='Skip '
+                        'pages unchanged since the last download to '
+                        '`output_dir`.')
     parser.add_argument('output_dir', help='Output directory.')
 
     return parser.parse_args()
@@ -109,5 +515,10 @@ def parse_args():
 if __name__ == '__main__':
     logging.basicConfig(level=logging.INFO)
     args = parse_args()
-    download(args.week, args.output_dir, username=args.username,
-             password=args.password, store=args.store)
\ No newline at end of file
+    errors = {}
+    download_many(args.store or [DEFAULT_STORE], args.week, args.output_dir,
+                  username=args.username, password=args.password,
+                  max_workers=args.max_workers, retries=args.retries,
+                  errors=errors, incremental=args.incremental)
+    if errors:
+        raise SystemExit(1)
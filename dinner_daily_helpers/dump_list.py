@@ -1,21 +1,18 @@
 from __future__ import unicode_literals, print_function
+import concurrent.futures as cf
 import datetime as dt
-import io
-
-import bs4
-import dinner_daily_helpers as ddh
+import re
 
+import six
 
-def dump_list(df_ingredients):
-    soup = bs4.BeautifulSoup(df_ingredients.to_html(), 'html5lib')
-
-    table = soup.find('table')
-    table.attrs['class'] = 'table table-striped'
-    del table.attrs['border']
+import dinner_daily_helpers as ddh
 
 
-    with io.StringIO() as tf:
-        tf.write(r'''
+#: Opening tag of rendered shopping list table.
+TABLE_TAG = '<table class="table table-striped">'
+#: Opening tag written by :meth:`pandas.DataFrame.to_html`.
+CRE_TABLE_TAG = re.compile(r'<table\b[^>]*>')
+HEADER = r'''
     <html>
     <head>
     <!-- Latest compiled and minified CSS -->
@@ -25,13 +22,72 @@ def dump_list(df_ingredients):
     <link rel="stylesheet" href="https://maxcdn.bootstrapcdn.com/bootstrap/3.3.7/css/bootstrap-theme.min.css" integrity="sha384-rHyoN1iRsVXV4nD0JutlnGaslCJuC7uwjduW9SVrLvRYooPp2bWYgmgJQIXwl/Sp" crossorigin="anonymous">
     </head>
     <body>
-    '''.strip())
-        tf.write(soup.prettify())
-        tf.write(r'''
+    '''.strip()
+FOOTER = r'''
     </body>
     </html>
-    ''')
-        return tf.getvalue()
+    '''
+
+
+def table_html(df_ingredients):
+    '''
+    Returns
+    -------
+    str
+        Table rendered by :meth:`pandas.DataFrame.to_html`, with the opening
+        tag replaced by :data:`TABLE_TAG` (i.e., without reparsing the
+        table).
+    '''
+    return CRE_TABLE_TAG.sub(TABLE_TAG, df_ingredients.to_html(), count=1)
+
+
+def dump_list(df_ingredients, parser=None):
+    '''
+    .. versionchanged:: X.X.X
+        Add ``parser`` kwarg (see :func:`dinner_daily_helpers.parse_html`).
+    .. versionchanged:: X.X.X
+        Render table directly (see :func:`table_html`) instead of reparsing
+        and pretty-printing the output of ``to_html()``; ``parser`` is
+        ignored.
+    '''
+    return ''.join([HEADER, table_html(df_ingredients), FOOTER])
+
+
+def _dump_shopping_list(shopping_list):
+    if isinstance(shopping_list, six.string_types):
+        shopping_list = ddh.get_section_ingredients(shopping_list)
+    return dump_list(shopping_list)
+
+
+def dump_lists(shopping_lists, processes=None):
+    '''
+    Render many shopping lists (e.g., for several households and weeks)
+    using a process pool.
+
+    Parameters
+    ----------
+    shopping_lists : dict
+        Mapping from key (e.g., ``(household, week)``) to either shopping
+        list HTML document, or table returned by
+        :func:`dinner_daily_helpers.get_section_ingredients`.  HTML documents
+        are also parsed in the worker processes.
+    processes : int, optional
+        Number of worker processes (default: number of CPUs).
+
+    Returns
+    -------
+    dict
+        Mapping from each key to rendered HTML document (see
+        :func:`dump_list`).
+    '''
+    keys = list(shopping_lists)
+    # Tables hold quantities with custom units (e.g., `package`), which are
+    # unpickled using the unit registry of the worker process.
+    with cf.ProcessPoolExecutor(max_workers=processes,
+                                initializer=ddh.get_ureg) as executor:
+        return dict(zip(keys, executor.map(_dump_shopping_list,
+                                           [shopping_lists[key]
+                                            for key in keys])))
 
 
 if __name__ == '__main__':
@@ -1,103 +1,221 @@
 from __future__ import print_function, unicode_literals, division
-import io
-import itertools as it
+import fractions
 import re
 
-import bs4
-import pandas as pd
-import pint
 import six
+from six.moves import zip_longest
 
-from . import ureg
+from . import is_unit, parse_html, parser_fallback, profiling
 
+#: Processing instructions split from ingredient descriptions by
+#: :func:`ingredients_table`.
+PROCESSING_ACTIONS = ('chopped', 'peeled', 'minced', 'diced', 'sliced',
+                      'drained', 'rinsed', 'ends trimmed', 'shredded')
+#: Quantity, unit and description of ingredient, e.g.,
+#: ``"8 oz black beans, drained & rinsed, divided"``.
+CRE_INGREDIENT = re.compile(r'^(?P<quantity>[\d\/]+(\s+[\d\/]+)?)\s+'
+                            r'((?P<unit>\S+)\s+)?(?P<description>\S+.*?)'
+                            r'(,\s+divided)?$')
+#: Description with trailing processing instructions, e.g.,
+#: ``"black beans, drained & rinsed"``.
+CRE_PROCESSING = re.compile(r'(?P<root>.*?)(,\s+(?P<processing>[^,]*(%s)'
+                            r'[^,]*))?$' % '|'.join(PROCESSING_ACTIONS))
 
-def dish_to_markdown(dish):
-    output = io.StringIO()
-
-    print('# %s' % dish['title'], file=output)
-    print('', file=output)
 
+def dish_to_markdown(dish):
+    '''
+    .. versionchanged:: X.X.X
+        Fix pairing of ingredients on Python 3 (``six.moves.zip_longest``),
+        and build output from a single list of lines.
+    '''
     # Write ingredients list as Markdown table.
     ingredients_ij = dish['ingredients']
     ingredients_count_ij = len(ingredients_ij)
     left_ij = ingredients_ij[:ingredients_count_ij // 2]
     right_ij = ingredients_ij[ingredients_count_ij // 2:]
 
-    print('## Ingredients', file=output)
-    print('', file=output)
-    print('| |', file=output)
-    print('|------|------|', file=output)
-
-    for left, right in it.izip_longest(left_ij, right_ij):
+    lines = ['# %s' % dish['title'], '', '## Ingredients', '', '| |',
+             '|------|------|']
+    for left, right in zip_longest(left_ij, right_ij):
         if left is not None:
-            print('| %s | %s |' % (left, right), file=output)
+            lines.append('| %s | %s |' % (left, right))
         else:
-            print('| %s |    |' % right, file=output)
-    print('', file=output)
+            lines.append('| %s |    |' % right)
+    lines += ['', '## Instructions', '']
+    lines.extend(' %d. %s' % (i + 1, instruction)
+                 for i, instruction in enumerate(dish['instructions']))
+    return '\n'.join(lines).strip()
 
-    print('## Instructions', file=output)
-    print('', file=output)
-    instructions_i = [' %d. %s' % (i + 1, instruction)
-                      for i, instruction in enumerate(dish['instructions'])]
-    print('\n'.join(instructions_i), file=output)
-    return output.getvalue().strip()
 
+#: ``id`` of weekly menu meal items, e.g., ``"item-1"``.
+CRE_MEAL_ID = re.compile(r'item-\d+')
+#: End of sentence in recipe instructions.
+CRE_SENTENCE_END = re.compile(r'\.\s+')
 
-def extract_meal(meal_div):
-    # Duration
-    duration_i = meal_div.find('span', class_='duration').contents[0]
 
-    # Main dish title
-    title_i = meal_div.select_one('h3 span.label').contents[0]
+class _Recipe(object):
+    __slots__ = ('title', 'heading', 'ingredients', 'instructions')
 
-    def extract_recipe(recipe_div):
-        recipe = {}
+    def __init__(self):
+        self.title = None
+        # Label of `h5.side-heading`, e.g., "Add a Side".
+        self.heading = None
+        self.ingredients = []
+        self.instructions = None
 
-        # ## Title
-        title_span = recipe_div.select_one('h5 > span.label')
-        if title_span is not None:
-            recipe['title'] = title_span.contents[0]
-
-        # ## Ingredients
-        recipe['ingredients'] = [li.contents[0]
-                                 for li in recipe_div.select('li')]
-
-        # ## Instructions
-        recipe['instructions'] = re.sub(r'\.\s+', '.\n',
-                                        recipe_div
-                                        .select_one('div.instructions p')
-                                        .contents[0]).splitlines()
+    def to_dict(self):
+        if self.instructions is None:
+            raise AttributeError('Recipe instructions not found.')
+        recipe = {}
+        if self.title is not None:
+            recipe['title'] = self.title
+        recipe['ingredients'] = self.ingredients
+        recipe['instructions'] = (CRE_SENTENCE_END
+                                  .sub('.\n', self.instructions)
+                                  .splitlines())
         return recipe
 
-    # Main dish
-    main_dish_div_i = meal_div.select_one('div.dishes > div.details')
-    main_dish_i = extract_recipe(main_dish_div_i)
-    main_dish_i['title'] = title_i
 
-    # Side dishes
-    side_dishes_i = [extract_recipe(dish_div_ij) for dish_div_ij in meal_div
-                     .select('div.dishes > div.side-dishes > div.details')
-                     if dish_div_ij.select_one('h5.side-heading > span.label')
-                     .contents[0].lower() != 'add a side']
+class _Meal(object):
+    __slots__ = ('title', 'duration', 'main_dish', 'side_dishes',
+                 'nutrition', 'notes')
+
+    def __init__(self):
+        self.title = None
+        self.duration = None
+        self.main_dish = None
+        self.side_dishes = []
+        self.nutrition = []
+        self.notes = None
+
+    def to_dict(self):
+        if self.duration is None or self.title is None:
+            raise AttributeError('Meal duration or title not found.')
+        if self.main_dish is None:
+            raise AttributeError('Main dish not found.')
+        main_dish = self.main_dish.to_dict()
+        main_dish['title'] = self.title
+        meal = {'main_dish': main_dish,
+                'side_dishes': [dish_i.to_dict()
+                                for dish_i in self.side_dishes],
+                'duration': self.duration,
+                'nutrition': self.nutrition}
+        if self.notes is not None:
+            meal['notes'] = self.notes
+        return meal
+
+
+def _meal_field(child, name, classes, meal, in_h3):
+    # Meal-level fields, which may also be nested in dishes.
+    if name == 'span' and 'duration' in classes:
+        if meal.duration is None:
+            meal.duration = child.contents[0]
+    elif (name == 'span' and 'label' in classes and in_h3 and
+          meal.title is None):
+        meal.title = child.contents[0]
+    elif name == 'ul' and 'nutrition' in classes:
+        meal.nutrition.extend(li.contents[0] for li in child.children
+                              if li.name == 'li')
+    elif (name == 'div' and 'recipe-notes' in classes and
+          meal.notes is None):
+        meal.notes = [p.contents[0] for p in child.find_all('p')]
+
+
+def _walk_recipe(node, recipe, meal=None, in_h3=False):
+    for child in node.children:
+        name = child.name
+        if name is None:
+            # Text.
+            continue
+        classes = child.get('class') or ()
+        if meal is not None:
+            _meal_field(child, name, classes, meal, in_h3)
+        if name == 'li':
+            recipe.ingredients.append(child.contents[0])
+        elif name == 'span' and node.name == 'h5' and 'label' in classes:
+            if recipe.title is None:
+                recipe.title = child.contents[0]
+            if recipe.heading is None and 'side-heading' in (node.get('class')
+                                                             or ()):
+                recipe.heading = child.contents[0]
+        elif (name == 'div' and 'instructions' in classes and
+              recipe.instructions is None):
+            p = child.find('p')
+            if p is not None:
+                recipe.instructions = p.contents[0]
+        _walk_recipe(child, recipe, meal, in_h3 or name == 'h3')
+
+
+def _recipe(recipe_div, meal=None, in_h3=False):
+    recipe = _Recipe()
+    _walk_recipe(recipe_div, recipe, meal, in_h3)
+    return recipe
+
+
+def _walk_meal(node, meal, in_h3=False, parent=None):
+    # `parent` is the dishes class of `node` (if any), i.e., `"dishes"` or
+    # `"side-dishes"` (in `div.dishes`).
+    for child in node.children:
+        name = child.name
+        if name is None:
+            continue
+        classes = child.get('class') or ()
+        _meal_field(child, name, classes, meal, in_h3)
+        if name == 'div' and 'details' in classes and parent is not None:
+            # Recipe subtree (including nested meal-level fields) is handled
+            # by a single walk.
+            if parent == 'dishes' and meal.main_dish is None:
+                meal.main_dish = _recipe(child, meal, in_h3)
+                continue
+            elif parent == 'side-dishes':
+                side = _recipe(child, meal, in_h3)
+                if side.heading is None:
+                    raise AttributeError('Side dish heading not found.')
+                if side.heading.lower() != 'add a side':
+                    meal.side_dishes.append(side)
+                continue
+        if name == 'div' and 'dishes' in classes:
+            parent_i = 'dishes'
+        elif (name == 'div' and 'side-dishes' in classes and
+              parent == 'dishes'):
+            parent_i = 'side-dishes'
+        else:
+            parent_i = None
+        _walk_meal(child, meal, in_h3 or name == 'h3', parent_i)
 
-    # Meal nutrition
-    nutrition_i = [li.contents[0]
-                   for li in meal_div.select('ul.nutrition > li')]
 
-    meal = {'main_dish': main_dish_i,
-            'side_dishes': side_dishes_i,
-            'duration': duration_i,
-            'nutrition': nutrition_i}
+@profiling.stage('extract_meal')
+def extract_meal(meal_div):
+    '''
+    .. versionchanged:: X.X.X
+        Extract all fields in a single walk of the meal subtree.
+
+    Parameters
+    ----------
+    meal_div : bs4.element.Tag
+        Meal item (``li#item-<n>``) of weekly menu.
 
-    # Meal notes
-    notes_div_i = meal_div.find('div', class_='recipe-notes')
-    if notes_div_i is not None:
-        meal['notes'] = [p.contents[0] for p in notes_div_i.select('p')]
-    return meal
+    Returns
+    -------
+    dict
+        Meal with the keys ``main_dish``, ``side_dishes`` (excluding "Add a
+        Side" placeholder), ``duration``, ``nutrition`` and (if available)
+        ``notes``.
+    '''
+    meal = _Meal()
+    _walk_meal(meal_div, meal)
+    return meal.to_dict()
 
 
-def extract_menu(weekly_html):
-    soup = bs4.BeautifulSoup(weekly_html, 'html5lib')
+@profiling.stage('extract_menu')
+@parser_fallback
+def extract_menu(weekly_html, parser=None):
+    '''
+    .. versionchanged:: X.X.X
+        Add ``parser`` kwarg (see :func:`dinner_daily_helpers.parse_html`).
+        Retry using ``html5lib`` if extraction fails using faster parser.
+    '''
+    soup = parse_html(weekly_html, parser)
     try:
         # Parse title, store, date, and servings from menus up until 2019-03-17
         result = dict(zip(['store', 'date', 'servings'],
@@ -113,16 +231,160 @@ def extract_menu(weekly_html):
             result['date'] = soup.select_one('header .theme-date').text.split('-')[-1].strip()
             result['store'] = soup.select_one('header .theme-store-name').text
             result['servings'] = soup.select_one('header div#family-label > h2').text
-        except Exception:
-            import pdb; pdb.set_trace()  # XXX BREAKPOINT
+        except AttributeError:
+            raise ValueError('Unrecognized weekly menu header format.')
     menu_list = soup.find('ul', id='menu')
-    meal_items = menu_list.find_all('li', id=re.compile('item-\d+'))
+    meal_items = menu_list.find_all('li', id=CRE_MEAL_ID)
     result['meals'] = [extract_meal(meal_div_i) for meal_div_i in meal_items]
+    profiling.count('meals', len(result['meals']))
     return result
 
 
+def plain_menu(menu):
+    '''
+    Parameters
+    ----------
+    menu : dict
+        Menu in format returned by :func:`extract_menu`.
+
+    Returns
+    -------
+    dict
+        Copy of menu with parsed ``bs4`` strings converted to plain strings.
+
+        Parsed strings hold references into the whole parse tree, so the
+        converted copy is much cheaper to keep around, pickle, or send to
+        another process.
+    '''
+    if isinstance(menu, dict):
+        return {k: plain_menu(v) for k, v in menu.items()}
+    elif isinstance(menu, list):
+        return [plain_menu(v) for v in menu]
+    elif isinstance(menu, six.string_types):
+        return six.text_type(menu)
+    return menu
+
+
+def decode_ingredient(ingredient):
+    '''
+    Decode a single ingredient string (see :func:`decode_ingredients`).
+
+    If the token following the quantity is not a recognized unit (see
+    :func:`dinner_daily_helpers.is_unit`), unit is ``"each"`` and the token
+    is prepended to the description (e.g., ``"2 garlic cloves"`` becomes
+    ``2 | each | garlic cloves``).
+
+    Parameters
+    ----------
+    ingredient : str
+        Ingredient string, e.g., ``"1/4 onion, small, chopped"``.
+
+    Returns
+    -------
+    tuple
+        ``(quantity, unit, description, processing)``, e.g., ``("1/4",
+        "each", "onion, small", "chopped")``; ``quantity``, ``unit`` and
+        ``processing`` are ``None`` if not specified.
+    '''
+    match = CRE_INGREDIENT.match(ingredient)
+    if match is None:
+        quantity, unit, description = None, None, ingredient
+    else:
+        quantity, unit, description = match.group('quantity', 'unit',
+                                                  'description')
+        if unit is not None and not is_unit(unit):
+            description = '%s %s' % (unit, description)
+            unit = 'each'
+    root, processing = CRE_PROCESSING.match(description).group('root',
+                                                               'processing')
+    return quantity, unit, root, processing
+
+
+def _quantity_number(quantity):
+    # E.g., `"1 1/2"` -> 1.5.
+    try:
+        return float(sum(fractions.Fraction(part)
+                         for part in quantity.split()))
+    except (ValueError, ZeroDivisionError):
+        return float('nan')
+
+
+@profiling.stage('decode_ingredients')
+def decode_ingredients(ingredients, typed=True):
+    '''
+    Decode ingredient strings into quantity, unit, description, and
+    processing instructions.
+
+    Each distinct ingredient string is decoded once (in a single pass with
+    precompiled patterns), so decoding scales to millions of (repeated)
+    ingredient strings.
+
+    Parameters
+    ----------
+    ingredients : pandas.Series or list[str]
+        Ingredient strings, e.g., ``"8 oz black beans, drained & rinsed"``.
+    typed : bool, optional
+        If ``True``, ``quantity`` is numeric (``float``, e.g., ``1.5`` for
+        ``"1 1/2"``; null if not a valid number) and ``unit`` is
+        ``category``.  Otherwise, ``quantity`` and ``unit`` are strings, as
+        in :func:`ingredients_table`.  In both cases, ``quantity`` is ``1``
+        if not specified.
+
+    Returns
+    -------
+    pandas.DataFrame
+        Table with the columns ``quantity``, ``unit`` (``"each"`` if unit is
+        not recognized, see :func:`decode_ingredient`; null if not specified),
+        ``description`` and ``processing`` (null if not specified), indexed
+        like :data:`ingredients`.
+    '''
+    import numpy as np
+    import pandas as pd
+
+    codes, uniques = pd.factorize(ingredients)
+    decoded = [decode_ingredient(ingredient) for ingredient in uniques]
+    # Append null entry, selected by code -1 (i.e., missing ingredient).
+    columns = [list(column) + [None]
+               for column in (zip(*decoded) if decoded else [()] * 4)]
+    quantities, units, descriptions, processing = columns
+    if typed:
+        quantities = np.array([1. if quantity is None
+                               else _quantity_number(quantity)
+                               for quantity in quantities[:-1]] + [np.nan])
+        unit_codes, unit_categories = pd.factorize(units)
+        unit_column = pd.Categorical.from_codes(unit_codes[codes],
+                                                categories=unit_categories)
+    else:
+        quantities = np.array([1 if quantity is None else quantity
+                               for quantity in quantities[:-1]] + [np.nan],
+                              dtype=object)
+        unit_column = np.array([np.nan if unit is None else unit
+                                for unit in units], dtype=object)[codes]
+    descriptions = np.array(descriptions[:-1] + [np.nan], dtype=object)
+    processing = np.array([np.nan if processing_i is None else processing_i
+                           for processing_i in processing], dtype=object)
+    df_decoded = pd.DataFrame({'quantity': quantities[codes],
+                               'unit': unit_column,
+                               'description': descriptions[codes],
+                               'processing': processing[codes]},
+                              columns=['quantity', 'unit', 'description',
+                                       'processing'],
+                              index=ingredients.index
+                              if isinstance(ingredients, pd.Series)
+                              else None)
+    return df_decoded
+
+
+@profiling.stage('ingredients_table')
 def ingredients_table(menu, decode_processing=True):
     '''
+    .. versionchanged:: X.X.X
+        If the token following the quantity is not a recognized unit, set
+        unit to ``"each"`` and prepend the token to the ingredient (e.g.,
+        ``1/4 | each | onion, small``; see :func:`decode_ingredient`).
+        Previously, this fix up assigned to row copies and had no effect,
+        i.e., the token was kept as unit (e.g., ``"onion,"``).
+
     Parameters
     ----------
     menu : dict
@@ -153,6 +415,8 @@ def ingredients_table(menu, decode_processing=True):
             3     0  Southwest Chicken Wraps  False      1/2   cup             frozen corn               NaN
             4     0  Southwest Chicken Wraps  False        8    oz             black beans  drained & rinsed
     '''
+    import pandas as pd
+
     ingredients = []
 
     for i, meal_i in enumerate(menu['meals']):
@@ -166,52 +430,16 @@ def ingredients_table(menu, decode_processing=True):
     df_ingredients = pd.DataFrame(ingredients, columns=['meal', 'dish',
                                                         'ingredient',
                                                         'side'])
+    profiling.count('ingredients', len(df_ingredients))
 
     if not decode_processing:
         return df_ingredients
 
-    df_decode_ingredients = \
-        df_ingredients.ingredient.str.extract(r'^(?P<quantity>[\d\/]+'
-                                              r'(\s+[\d\/]+)?)\s+'
-                                              r'((?P<unit>\S+)\s+)?'
-                                              r'(?P<description>\S+.*?)'
-                                              r'(,\s+divided)?$',
-                                              expand=False)
-    # Drop implied unnamed groups: 1) from `quantity` named group, and 2) from
-    # `", divided"`.
-    df_decode_ingredients.drop([1, 2, 5], axis=1, inplace=True)
-
-    isna = df_decode_ingredients['quantity'].isna()
-    df_decode_ingredients.loc[isna, 'description'] =\
-        df_ingredients['ingredient']
-    df_decode_ingredients.loc[isna, 'quantity'] = 1
-
-    # Set unit to `"each"` for ingredients where no units were specified.
-    for i, ingredient_i in df_decode_ingredients.iterrows():
-        (quantity_i, unit_i, desc_i) = ingredient_i
-        try:
-            ureg.parse_expression('%s %s' % (quantity_i, unit_i))
-        except pint.UndefinedUnitError:
-            # No recognized unit.  Assume unit is omitted, and assume "each".
-            if unit_i == unit_i and isinstance(unit_i, six.string_types):
-                desc_i = '%s %s' % (unit_i, desc_i)
-            unit_i = 'each'
-            ingredient_i.description = desc_i
-            ingredient_i.unit = unit_i
-
-    # Extract any processing instructions.
-    actions = ['chopped', 'peeled', 'minced', 'diced', 'sliced', 'drained',
-               'rinsed', 'ends trimmed', 'shredded']
-    df_processing = (df_decode_ingredients.description.str
-                     .extract(r'(?P<root>.*?)'
-                              r'(,\s+(?P<processing>[^,]*(%s)[^,]*))?$'
-                              % '|'.join(actions), expand=True)[['root',
-                                                                 'processing']])
-    df_decode_ingredients['description'] = df_processing['root']
-    df_decode_ingredients['processing'] = df_processing['processing']
-
-    df_decode_ingredients = df_ingredients.join(df_decode_ingredients)
-    df_decode_ingredients.drop('ingredient', axis=1, inplace=True)
-    df_decode_ingredients.rename(columns={'description': 'ingredient'},
-                                 inplace=True)
+    df_decoded = decode_ingredients(df_ingredients['ingredient'],
+                                    typed=False)
+    df_ingredients = df_ingredients.drop('ingredient', axis=1)
+    for column in df_decoded.columns:
+        df_ingredients[column] = df_decoded[column]
+    df_decode_ingredients = df_ingredients.rename(columns={'description':
+                                                           'ingredient'})
     return df_decode_ingredients
@@ -0,0 +1,204 @@
+'''
+Compact record model of weekly menus.
+
+Fields extracted by :func:`menu.extract_menu` are ``bs4`` strings holding
+references into the whole parse tree.  Records hold plain strings instead,
+so the parse tree can be freed as soon as a menu is extracted::
+
+    menu = Menu.from_html(weekly_html)
+    data = menu.to_msgpack()  # or `menu.to_json()`
+    assert Menu.from_msgpack(data) == menu
+
+:meth:`Menu.to_dict` matches the ``--json`` output of
+``python -m dinner_daily_helpers``.
+'''
+from __future__ import print_function, unicode_literals, division
+import json
+
+import six
+
+from .menu import decode_ingredient, extract_menu
+
+
+def _text(value):
+    return None if value is None else six.text_type(value)
+
+
+class _Record(object):
+    __slots__ = ()
+
+    def __eq__(self, other):
+        return (type(self) is type(other) and
+                all(getattr(self, k) == getattr(other, k)
+                    for k in self.__slots__))
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__,
+                           ', '.join('%s=%r' % (k, getattr(self, k))
+                                     for k in self.__slots__))
+
+
+class Ingredient(_Record):
+    '''
+    Recipe ingredient, e.g., ``"1 1/2 cups brown rice"``.
+    '''
+    __slots__ = ('text', )
+
+    def __init__(self, text):
+        self.text = _text(text)
+
+    def __str__(self):
+        return self.text
+
+    def decode(self):
+        '''
+        Returns
+        -------
+        dict
+            ``quantity``, ``unit``, ``description`` and ``processing`` of
+            ingredient, decoded as in :func:`menu.ingredients_table` (see
+            :func:`menu.decode_ingredients`); ``quantity`` is ``1`` if not
+            specified, and ``unit`` and ``processing`` are ``None`` if not
+            specified.
+        '''
+        quantity, unit, description, processing = \
+            decode_ingredient(self.text)
+        return {'quantity': 1 if quantity is None else quantity,
+                'unit': unit, 'description': description,
+                'processing': processing}
+
+
+class Recipe(_Record):
+    __slots__ = ('title', 'ingredients', 'instructions')
+
+    def __init__(self, title=None, ingredients=None, instructions=None):
+        self.title = _text(title)
+        self.ingredients = [ingredient if isinstance(ingredient, Ingredient)
+                            else Ingredient(ingredient)
+                            for ingredient in ingredients or []]
+        self.instructions = [_text(line) for line in instructions or []]
+
+    @classmethod
+    def from_dict(cls, recipe):
+        return cls(recipe.get('title'), recipe['ingredients'],
+                   recipe['instructions'])
+
+    def to_dict(self):
+        recipe = {'ingredients': [ingredient.text
+                                  for ingredient in self.ingredients],
+                  'instructions': list(self.instructions)}
+        if self.title is not None:
+            recipe['title'] = self.title
+        return recipe
+
+
+class Meal(_Record):
+    __slots__ = ('main_dish', 'side_dishes', 'duration', 'nutrition', 'notes')
+
+    def __init__(self, main_dish, side_dishes=None, duration=None,
+                 nutrition=None, notes=None):
+        self.main_dish = main_dish
+        self.side_dishes = list(side_dishes or [])
+        self.duration = _text(duration)
+        self.nutrition = [_text(item) for item in nutrition or []]
+        self.notes = None if notes is None else [_text(note)
+                                                 for note in notes]
+
+    @classmethod
+    def from_dict(cls, meal):
+        return cls(Recipe.from_dict(meal['main_dish']),
+                   [Recipe.from_dict(dish) for dish in meal['side_dishes']],
+                   meal['duration'], meal['nutrition'], meal.get('notes'))
+
+    def to_dict(self):
+        meal = {'main_dish': self.main_dish.to_dict(),
+                'side_dishes': [dish.to_dict() for dish in self.side_dishes],
+                'duration': self.duration, 'nutrition': list(self.nutrition)}
+        if self.notes is not None:
+            meal['notes'] = list(self.notes)
+        return meal
+
+
+class Menu(_Record):
+    __slots__ = ('title', 'store', 'date', 'servings', 'meals')
+
+    def __init__(self, title=None, store=None, date=None, servings=None,
+                 meals=None):
+        self.title = _text(title)
+        self.store = _text(store)
+        self.date = _text(date)
+        self.servings = _text(servings)
+        self.meals = list(meals or [])
+
+    @classmethod
+    def from_dict(cls, menu):
+        '''
+        Parameters
+        ----------
+        menu : dict
+            Menu in format returned by :func:`menu.extract_menu` (or
+            :meth:`to_dict`).
+        '''
+        return cls(menu.get('title'), menu.get('store'), menu.get('date'),
+                   menu.get('servings'),
+                   [Meal.from_dict(meal) for meal in menu['meals']])
+
+    @classmethod
+    def from_html(cls, weekly_html, parser=None):
+        '''
+        Extract menu from weekly menu HTML document (see
+        :func:`menu.extract_menu`).  The parse tree is released on return.
+        '''
+        return cls.from_dict(extract_menu(weekly_html, parser=parser))
+
+    def to_dict(self):
+        '''
+        Returns
+        -------
+        dict
+            Menu in format returned by :func:`menu.extract_menu`, with plain
+            strings.
+        '''
+        menu = {'meals': [meal.to_dict() for meal in self.meals]}
+        for key in ('title', 'store', 'date', 'servings'):
+            if getattr(self, key) is not None:
+                menu[key] = getattr(self, key)
+        return menu
+
+    def to_json(self, **kwargs):
+        '''
+        Parameters
+        ----------
+        **kwargs
+            Keyword arguments passed to :func:`json.dumps`.
+        '''
+        return json.dumps(self.to_dict(), **kwargs)
+
+    @classmethod
+    def from_json(cls, data):
+        return cls.from_dict(json.loads(data))
+
+    def to_msgpack(self):
+        '''
+        Returns
+        -------
+        bytes
+            Menu (see :meth:`to_dict`) serialized using ``msgpack``.
+
+        Raises
+        ------
+        ImportError
+            If ``msgpack`` is not installed.
+        '''
+        import msgpack
+
+        return msgpack.packb(self.to_dict(), use_bin_type=True)
+
+    @classmethod
+    def from_msgpack(cls, data):
+        import msgpack
+
+        return cls.from_dict(msgpack.unpackb(data, raw=False))
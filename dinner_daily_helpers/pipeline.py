@@ -0,0 +1,251 @@
+'''
+Download, parse and render weekly menus in a single overlapped pipeline.
+
+Pages are downloaded concurrently (in a thread pool), and each weekly menu
+is parsed *once* in a process pool as soon as it arrives, while other pages
+are still downloading.  The parsed menu provides both the start date used in
+output file names and the rendered output, e.g.::
+
+    python -m dinner_daily_helpers.pipeline current previous menus/ \\
+        --format html --format json
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import asyncio
+import concurrent.futures as cf
+import itertools as it
+import json
+import logging
+import os
+
+from .download import (DEFAULT_STORE, LOGIN_URL, MENUS_URL, PAGES, WEEKS,
+                       _page_urls, create_session, login, start_date,
+                       write_atomic)
+
+#: Rendered output formats (see :func:`process_menu`).
+FORMATS = ('html', 'md', 'json')
+
+
+def process_menu(menu_html, formats=('html', ), html_backend='markdown'):
+    '''
+    Parse weekly menu once, and render it in each of :data:`formats`.
+
+    Parameters
+    ----------
+    menu_html : str
+        Weekly menu HTML document.
+    formats : list[str], optional
+        Output formats (see :data:`FORMATS`): ``"html"`` and ``"md"``
+        (rendered menu, see :func:`render.render_markdown`), or ``"json"``
+        (extracted menu, as written by ``python -m dinner_daily_helpers
+        --json``).
+    html_backend : str, optional
+        Markdown to HTML converter (see :func:`render.markdown_to_html`).
+
+    Returns
+    -------
+    date : str
+        Start date of weekly menu, formatted as ``YYYY-MM-DD``.
+    outputs : dict
+        Mapping from each format to rendered text.
+    '''
+    from .menu import extract_menu, ingredients_table, plain_menu
+    from .render import markdown_to_html, render_markdown
+
+    menu = plain_menu(extract_menu(menu_html))
+    outputs = {}
+    if 'json' in formats:
+        outputs['json'] = json.dumps(menu, indent=4, sort_keys=True)
+    if 'md' in formats or 'html' in formats:
+        menu_markdown = render_markdown(menu, ingredients_table(menu)) + '\n'
+        if 'md' in formats:
+            outputs['md'] = menu_markdown
+        if 'html' in formats:
+            outputs['html'] = markdown_to_html(menu_markdown,
+                                               backend=html_backend)
+    return start_date(menu).strftime('%Y-%m-%d'), outputs
+
+
+def _get_text(session, url):
+    response = session.get(url)
+    response.raise_for_status()
+    return response.text
+
+
+async def _run_week(loop, threads, processes, session, output_dir, store,
+                    urls, formats, html_backend):
+    pages = [loop.run_in_executor(threads, _get_text, session, url)
+             for url in urls]
+    try:
+        # Parse and render weekly menu while shopping list is downloading.
+        menu_html = await pages[0]
+        date, outputs = await loop.run_in_executor(processes, process_menu,
+                                                   menu_html, formats,
+                                                   html_backend)
+        texts = dict(zip(PAGES, [menu_html, await pages[1]]))
+    finally:
+        # E.g., weekly menu failed to download or parse; do not leave
+        # shopping list download pending.
+        for page in pages:
+            page.cancel()
+        await asyncio.gather(*pages, return_exceptions=True)
+
+    paths = {page: os.path.join(output_dir, '%s-%s-%s.html' %
+                                (date, page, store)) for page in PAGES}
+    for format_, text in outputs.items():
+        name = 'menu.%s' % format_
+        paths[name] = os.path.join(output_dir, '%s-menu-%s.%s' %
+                                   (date, store, format_))
+        texts[name] = text
+    writes = [loop.run_in_executor(threads, write_atomic, paths[name],
+                                   texts[name]) for name in paths]
+    await asyncio.gather(*writes)
+    for path in sorted(paths.values()):
+        logging.info('Wrote: `%s`', path)
+    return paths
+
+
+async def run_pipeline(stores, weeks, output_dir, session=None,
+                       username=None, password=None, max_workers=4,
+                       processes=None, formats=('html', ),
+                       html_backend='markdown', retries=3,
+                       backoff_factor=0.5, base_url=MENUS_URL,
+                       login_url=LOGIN_URL, errors=None):
+    '''
+    Download, parse and render weekly menus for every combination of
+    :data:`stores` and :data:`weeks`.
+
+    For each store/week, write the downloaded weekly menu and shopping list
+    (named like :func:`download.download`), and the rendered menu in each
+    of :data:`formats` (named ``<date>-menu-<store>.<format>``).
+
+    Parameters
+    ----------
+    stores : list[str]
+        Store names.
+    weeks : list[str]
+        Weeks, each either ``"current"`` or ``"previous"``.
+    output_dir : str
+        Output directory (created if it does not exist).
+    session : requests.Session, optional
+        Authenticated session.  If not specified, log in using
+        :data:`username` and :data:`password` (see
+        :func:`download.download_many`).
+    max_workers : int, optional
+        Maximum number of concurrent requests (and file writes).
+    processes : int, optional
+        Number of worker processes for parsing and rendering (default:
+        number of CPUs).
+    formats : list[str], optional
+        Rendered output formats (see :func:`process_menu`).
+    errors : dict, optional
+        If specified, add ``(store, week) -> exception`` entry for each
+        store/week that failed.
+
+    Returns
+    -------
+    dict
+        Mapping from ``(store, week)`` to output paths (mapping from each
+        page in :data:`download.PAGES`, and ``"menu.<format>"``, to path),
+        for each store/week processed successfully.
+    '''
+    jobs = list(it.product(stores, weeks))
+    unknown = set(formats) - set(FORMATS)
+    if unknown:
+        raise ValueError('Unknown output format(s): %s' %
+                         ', '.join(sorted(unknown)))
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    loop = asyncio.get_running_loop()
+    with cf.ThreadPoolExecutor(max_workers=max_workers) as threads, \
+            cf.ProcessPoolExecutor(max_workers=processes) as processes_:
+        if session is None:
+            if any((username is None, password is None)):
+                raise ValueError('Either `session` or `username` _and_ '
+                                 '`password` must be specified.')
+            session = create_session(retries=retries,
+                                     backoff_factor=backoff_factor,
+                                     pool_size=max_workers)
+            await loop.run_in_executor(threads, login, username, password,
+                                       session, login_url)
+
+        results = await asyncio.gather(*[_run_week(loop, threads, processes_,
+                                                   session, output_dir,
+                                                   job[0],
+                                                   _page_urls(job[0], job[1],
+                                                              base_url),
+                                                   formats, html_backend)
+                                         for job in jobs],
+                                       return_exceptions=True)
+
+    paths = {}
+    for job, result in zip(jobs, results):
+        if isinstance(result, Exception):
+            logging.error('Failed to process `%s` week of `%s`: %s', job[1],
+                          job[0], result)
+            if errors is not None:
+                errors[job] = result
+        else:
+            paths[job] = result
+    return paths
+
+
+def pipeline(*args, **kwargs):
+    '''
+    Blocking version of :func:`run_pipeline`.
+    '''
+    return asyncio.run(run_pipeline(*args, **kwargs))
+
+
+def parse_args():
+    from .render import HTML_BACKENDS
+
+    parser = argparse.ArgumentParser(description='Download, parse and render '
+                                     'weekly menus.')
+
+    parser.add_argument('week', choices=WEEKS, nargs='+')
+    parser.add_argument('output_dir', help='Output directory.')
+    parser.add_argument('--username',
+                        default=os.environ.get('DINNER_DAILY_USERNAME'),
+                        help='Dinner Daily username (default: '
+                        '`DINNER_DAILY_USERNAME` environment variable).')
+    parser.add_argument('--password',
+                        default=os.environ.get('DINNER_DAILY_PASSWORD'),
+                        help='Dinner Daily password (default: '
+                        '`DINNER_DAILY_PASSWORD` environment variable).')
+    parser.add_argument('--store', action='append', help='Store (default: '
+                        '%s).  May be specified multiple times.' %
+                        DEFAULT_STORE)
+    parser.add_argument('--base-url', default=MENUS_URL, help='Menus URL '
+                        '(default: %(default)s).')
+    parser.add_argument('--login-url', default=LOGIN_URL, help='Login URL '
+                        '(default: %(default)s).')
+    parser.add_argument('--format', action='append', choices=FORMATS,
+                        help='Rendered output format (default: html).  May '
+                        'be specified multiple times.')
+    parser.add_argument('--html-backend', choices=HTML_BACKENDS,
+                        default='markdown', help='Markdown to HTML converter '
+                        '(default: %(default)s).')
+    parser.add_argument('--max-workers', type=int, default=4, help='Maximum '
+                        'number of concurrent requests (default: '
+                        '%(default)s).')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='Number of worker processes (default: number of '
+                        'CPUs).')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    errors = {}
+    pipeline(args.store or [DEFAULT_STORE], args.week, args.output_dir,
+             username=args.username, password=args.password,
+             max_workers=args.max_workers, processes=args.processes,
+             formats=args.format or ['html'],
+             html_backend=args.html_backend, base_url=args.base_url,
+             login_url=args.login_url, errors=errors)
+    if errors:
+        raise SystemExit(1)
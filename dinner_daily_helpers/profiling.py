@@ -0,0 +1,162 @@
+'''
+Per-stage timers and counters.
+
+Disabled by default; enable using :func:`enable` (e.g., ``--profile``
+command-line flag), or by setting the ``DINNER_DAILY_PROFILE`` environment
+variable (also inherited by worker processes).  When disabled, each
+instrumented call only costs a single flag check.
+'''
+from __future__ import print_function, unicode_literals, division
+import contextlib
+import functools
+import os
+import threading
+import time
+
+#: Environment variable which enables profiling (if set to a non-empty value
+#: other than ``0``).
+ENVIRONMENT_VARIABLE = 'DINNER_DAILY_PROFILE'
+
+_enabled = os.environ.get(ENVIRONMENT_VARIABLE, '') not in ('', '0')
+_lock = threading.Lock()
+# Stage name -> [calls, seconds].
+_stages = {}
+# Counter name -> count.
+_counters = {}
+
+
+def enabled():
+    return _enabled
+
+
+def enable():
+    global _enabled
+    _enabled = True
+
+
+def disable():
+    global _enabled
+    _enabled = False
+
+
+def reset():
+    with _lock:
+        _stages.clear()
+        _counters.clear()
+
+
+def _record(name, seconds):
+    with _lock:
+        stats = _stages.setdefault(name, [0, 0.])
+        stats[0] += 1
+        stats[1] += seconds
+
+
+def stage(name):
+    '''
+    Decorator recording number of calls and cumulative run time of function
+    as stage :data:`name` (only while profiling is enabled).
+
+    Run time of nested stages is included in the run time of the enclosing
+    stage.
+    '''
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+@contextlib.contextmanager
+def timer(name):
+    '''
+    Context manager recording run time of block as stage :data:`name` (see
+    :func:`stage`).
+    '''
+    if not _enabled:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _record(name, time.perf_counter() - start)
+
+
+def count(name, n=1):
+    '''
+    Add :data:`n` to counter :data:`name` (only while profiling is enabled).
+    '''
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + n
+
+
+def report():
+    '''
+    Returns
+    -------
+    dict
+        Profiling results with the following keys:
+
+         - ``stages``: ``{name: {"calls": int, "seconds": float}}``;
+         - ``counters``: ``{name: int}``;
+         - ``caches``: memoization statistics of unit and quantity parsing
+           (see :func:`dinner_daily_helpers.quantity_cache_info`).
+    '''
+    from . import quantity_cache_info
+
+    with _lock:
+        return {'stages': {name: {'calls': calls, 'seconds': seconds}
+                           for name, (calls, seconds) in _stages.items()},
+                'counters': dict(_counters),
+                'caches': quantity_cache_info()}
+
+
+def format_report(report_=None):
+    '''
+    Returns
+    -------
+    str
+        Profiling results (default: :func:`report`) as text table, with
+        stages sorted by cumulative run time.
+    '''
+    report_ = report_ or report()
+    lines = ['%-32s %8s %12s' % ('stage', 'calls', 'ms')]
+    for name, stats in sorted(report_['stages'].items(),
+                              key=lambda item: -item[1]['seconds']):
+        lines.append('%-32s %8d %12.2f' % (name, stats['calls'],
+                                           stats['seconds'] * 1e3))
+    lines.append('')
+    lines.append('%-32s %8s' % ('counter', 'count'))
+    for name, count_ in sorted(report_['counters'].items()):
+        lines.append('%-32s %8d' % (name, count_))
+    for name, info in sorted(report_['caches'].items()):
+        lines.append('%-32s %8d' % ('%s hits' % name, info['hits']))
+        lines.append('%-32s %8d' % ('%s misses' % name, info['misses']))
+    return '\n'.join(lines)
+
+
+@contextlib.contextmanager
+def cprofile(path):
+    '''
+    Context manager profiling block using :mod:`cProfile`, writing
+    :mod:`pstats` output to :data:`path` (e.g., view using ``python -m pstats
+    path``).
+    '''
+    import cProfile
+
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        yield profile
+    finally:
+        profile.disable()
+        profile.dump_stats(path)
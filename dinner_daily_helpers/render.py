@@ -0,0 +1,304 @@
+from __future__ import print_function, unicode_literals, division
+import argparse
+import logging
+import os
+import subprocess as sp
+import sys
+import threading
+from html import escape
+
+from . import profiling
+
+PARENT_DIR = os.path.realpath(os.path.join(__file__, os.path.pardir))
+TEMPLATES_DIR = os.path.join(PARENT_DIR, 'templates')
+#: Backends supported by :func:`markdown_to_html`.
+HTML_BACKENDS = ('markdown', 'pandoc')
+
+_environment = None
+_local = threading.local()
+
+
+def get_environment():
+    '''
+    Returns
+    -------
+    jinja2.Environment
+        Environment loading templates from :data:`TEMPLATES_DIR`.  Templates
+        are compiled once (on first use) and cached by the environment.
+    '''
+    global _environment
+
+    if _environment is None:
+        import jinja2
+
+        _environment = jinja2.Environment(loader=jinja2
+                                          .FileSystemLoader(TEMPLATES_DIR))
+    return _environment
+
+
+@profiling.stage('render_markdown')
+def render_markdown(menu, df_ingredients):
+    '''
+    Parameters
+    ----------
+    menu : dict
+        Menu in format returned by :func:`menu.extract_menu`.
+    df_ingredients : pandas.DataFrame
+        Table of decoded ingredients returned by
+        :func:`menu.ingredients_table`.
+
+    Returns
+    -------
+    str
+        Weekly menu rendered as GitHub-flavoured markdown.
+    '''
+    template = get_environment().get_template('weekly_menu.template.md')
+    return template.render(menu=menu, df_ingredients=df_ingredients)
+
+
+def _markdown():
+    # `markdown.Markdown` instances are reusable, but not thread-safe.
+    md = getattr(_local, 'markdown', None)
+    if md is None:
+        import markdown
+
+        md = markdown.Markdown(extensions=['tables', 'sane_lists', 'toc'],
+                               extension_configs={'toc': {'toc_depth': 2}},
+                               output_format='html5')
+        _local.markdown = md
+    return md.reset()
+
+
+@profiling.stage('markdown_to_html')
+def markdown_to_html(menu_markdown, backend='markdown', title='-'):
+    '''
+    Parameters
+    ----------
+    menu_markdown : str
+        GitHub-flavoured markdown, e.g., returned by :func:`render_markdown`.
+    backend : str, optional
+        One of :data:`HTML_BACKENDS`:
+
+         - ``"markdown"``: convert in-process using the ``markdown`` package.
+         - ``"pandoc"``: convert using the ``pandoc`` executable.
+    title : str, optional
+        HTML page title.
+
+    Returns
+    -------
+    str
+        Standalone HTML document (with table of contents), styled using the
+        GitHub HTML5 template.
+    '''
+    if backend == 'markdown':
+        md = _markdown()
+        body = md.convert(menu_markdown)
+        template = get_environment().get_template('GitHub.template.html')
+        return template.render(title=title, toc=md.toc, body=body)
+    elif backend == 'pandoc':
+        p = sp.Popen(['pandoc', '-f', 'gfm', '-t', 'html', '-', '--template',
+                      os.path.join(TEMPLATES_DIR, 'GitHub.html5'), '--toc',
+                      '--toc-depth', '2', '--metadata', 'pagetitle=%s' %
+                      title], stdout=sp.PIPE, stdin=sp.PIPE)
+        with profiling.timer('pandoc'):
+            stdout, stderr = p.communicate(menu_markdown.encode('utf8'))
+        if p.returncode:
+            raise RuntimeError('`pandoc` failed with exit code %d.' %
+                               p.returncode)
+        return stdout.decode('utf8')
+    raise ValueError('`backend` must be one of: %s' % ', '.join(HTML_BACKENDS))
+
+
+def _menu_label(menu):
+    return '%s (%s, %s)' % (menu['title'], menu['store'], menu['date'])
+
+
+def _menu_link(i, menu):
+    # Link to anchor `menu-<n>` of menu.
+    return '<a href="#menu-%d">%s</a>' % (i + 1, escape(_menu_label(menu)))
+
+
+def _toc(links):
+    return '<ul>\n%s</ul>' % ''.join('<li>%s</li>\n' % link
+                                     for link in links)
+
+
+def generate_markdown(menus, title='Menus'):
+    '''
+    Render many weekly menus as a single markdown document, one chunk at a
+    time.
+
+    Parameters
+    ----------
+    menus : list[dict] or iterable
+        Menus in format returned by :func:`menu.extract_menu`.  If not a
+        ``list`` (or ``tuple``), e.g., a generator of menus as they are
+        extracted, menus are iterated only once and each is rendered as soon
+        as it is available; the table of contents then follows the menus.
+    title : str, optional
+        Document title.
+
+    Yields
+    ------
+    str
+        Chunks of markdown: title and table of contents, followed by each
+        menu rendered using the weekly menu template.  Only the ingredients
+        table of the menu currently being rendered is kept in memory.
+
+    .. versionchanged:: X.X.X
+        Stream menus from any iterable.
+    '''
+    from .menu import ingredients_table
+
+    yield '# %s\n\n' % title
+    streamed = not isinstance(menus, (list, tuple))
+    if not streamed:
+        for i, menu in enumerate(menus):
+            yield ' - %s\n' % _menu_link(i, menu)
+    template = get_environment().get_template('weekly_menu.template.md')
+    links = []
+    for i, menu in enumerate(menus):
+        links.append(_menu_link(i, menu))
+        yield '\n------------------------------------------------------------'\
+            '------------\n\n<a id="menu-%d"></a>\n\n' % (i + 1)
+        for chunk in template.generate(menu=menu,
+                                       df_ingredients=ingredients_table(menu)):
+            yield chunk
+        yield '\n'
+    if streamed:
+        yield '\n------------------------------------------------------------'\
+            '------------\n\n## Contents\n\n'
+        for link in links:
+            yield ' - %s\n' % link
+
+
+def generate_html(menus, title='Menus'):
+    '''
+    Render many weekly menus as a single standalone HTML document, one chunk
+    at a time (see :func:`generate_markdown`).
+
+    Each menu is rendered to markdown and converted to HTML (using the
+    ``markdown`` package) only when its chunk is generated, so at most one
+    rendered menu is held in memory.  Heading ``id`` attributes are prefixed
+    with ``menu-<n>-`` to keep them unique across menus.  As for
+    :func:`generate_markdown`, the table of contents follows the menus if
+    :data:`menus` is not a ``list`` (or ``tuple``).
+
+    Yields
+    ------
+    str
+        Chunks of HTML, styled using the GitHub HTML5 template, with a
+        combined table of contents linking to each menu.
+    '''
+    import markdown
+    from markdown.extensions.toc import slugify
+
+    from .menu import ingredients_table
+
+    prefix = ['']
+    md = markdown.Markdown(extensions=['tables', 'sane_lists', 'toc'],
+                           extension_configs={'toc':
+                                              {'slugify': lambda value, sep:
+                                               prefix[0] + slugify(value,
+                                                                   sep)}},
+                           output_format='html5')
+    template = get_environment().get_template('weekly_menu.template.md')
+    toc_template = get_environment().get_template('toc.template.html')
+    streamed = not isinstance(menus, (list, tuple))
+
+    def bodies():
+        links = []
+        for i, menu in enumerate(menus):
+            links.append(_menu_link(i, menu))
+            prefix[0] = 'menu-%d-' % (i + 1)
+            menu_markdown = template.render(menu=menu,
+                                            df_ingredients=
+                                            ingredients_table(menu))
+            yield ('<section id="menu-%d">\n%s\n</section>\n' %
+                   (i + 1, md.reset().convert(menu_markdown)))
+        if streamed:
+            yield '<hr>\n%s\n' % toc_template.render(toc=_toc(links))
+
+    toc = (None if streamed else
+           _toc([_menu_link(i, menu) for i, menu in enumerate(menus)]))
+    return (get_environment().get_template('GitHub.template.html')
+            .generate(title=title, toc=toc, body=bodies()))
+
+
+def write_menus(menus, output, format_='html', title='Menus'):
+    '''
+    Write many weekly menus as a single document, writing each chunk to
+    :data:`output` as soon as it is rendered (see :func:`generate_html` and
+    :func:`generate_markdown`).
+
+    Parameters
+    ----------
+    output : file-like
+        Output file, or e.g., ``socket.makefile('w')``.
+    format_ : str, optional
+        Either ``"html"`` or ``"md"``.
+    '''
+    if format_ == 'html':
+        chunks = generate_html(menus, title=title)
+    elif format_ == 'md':
+        chunks = generate_markdown(menus, title=title)
+    else:
+        raise ValueError('`format_` must be one of: html, md')
+    for chunk in chunks:
+        output.write(chunk)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Render many weekly menus '
+                                     'as a single document.')
+
+    parser.add_argument('input', help='Directory containing weekly menu HTML '
+                        'documents, or glob pattern (e.g., `"2019-*.html"`).')
+    parser.add_argument('output_path', default='-', help='Output path '
+                        '(default: write to `stdout`)', nargs='?')
+    parser.add_argument('--markdown', action='store_true', help='Write '
+                        'markdown instead of HTML.')
+    parser.add_argument('--title', default='Menus', help='Document title '
+                        '(default: %(default)s).')
+    parser.add_argument('-j', '--processes', type=int, default=None,
+                        help='Number of worker processes (default: number of '
+                        'CPUs).')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from .batch import find_menus, iter_extract_menus
+
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    paths = find_menus(args.input)
+    if not paths:
+        raise SystemExit('No weekly menu documents found matching `%s`.' %
+                         args.input)
+    errors = []
+
+    def menus():
+        # Render each menu (in order of `paths`) as soon as it is extracted.
+        for path, menu, error in iter_extract_menus(paths,
+                                                    processes=args.processes,
+                                                    ordered=True):
+            if error is None:
+                yield menu
+            else:
+                errors.append(path)
+
+    if args.output_path == '-':
+        output = sys.stdout
+    else:
+        output = open(args.output_path, 'w')
+    try:
+        write_menus(menus(), output,
+                    format_='md' if args.markdown else 'html',
+                    title=args.title)
+    finally:
+        if args.output_path != '-':
+            output.close()
+    logging.info('Rendered %d of %d weekly menus', len(paths) - len(errors),
+                 len(paths))
@@ -0,0 +1,223 @@
+'''
+Long-running render service.
+
+Keeps parsers, the unit registry and compiled templates warm in a pool of
+worker processes, e.g.::
+
+    python -m dinner_daily_helpers.server --port 8000 --workers 4
+    curl --data-binary @weekly-menu.html localhost:8000/menu?format=html
+
+Endpoints (``POST`` request body is the HTML document):
+
+ - ``POST /menu?format=json|markdown|html[&backend=markdown|pandoc]``
+ - ``POST /ingredients?format=json|csv``: see :func:`menu.ingredients_table`
+ - ``POST /shopping-list?format=json|csv``: see
+   :func:`shopping_list.extract_shopping_list`
+ - ``GET /health``
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import concurrent.futures as cf
+import io
+import json
+import logging
+import http.server
+import os
+import signal
+import socketserver
+import sys
+import urllib.parse
+
+from . import EXTRACTION_ERRORS, get_ureg
+from .menu import extract_menu, ingredients_table, plain_menu
+from .render import HTML_BACKENDS, markdown_to_html, render_markdown
+from .shopping_list import extract_shopping_list
+from .synthetic import FIXTURES_DIR
+
+CONTENT_TYPES = {'csv': 'text/csv', 'html': 'text/html',
+                 'json': 'application/json', 'markdown': 'text/markdown'}
+#: Output formats supported by each endpoint.
+FORMATS = {'/menu': ('json', 'markdown', 'html'),
+           '/ingredients': ('json', 'csv'),
+           '/shopping-list': ('json', 'csv')}
+
+
+def warm_up():
+    '''
+    Import parsers and renderers, load templates and initialize unit registry
+    in (worker) process, by extracting and rendering the sample weekly menu
+    and shopping list in :data:`synthetic.FIXTURES_DIR`.
+
+    Used as worker process pool initializer, so every worker is warm before
+    handling its first request.
+    '''
+    get_ureg()
+    for endpoint, name in (('/menu', 'weekly-menu-new-header.html'),
+                           ('/shopping-list', 'shopping-list.html')):
+        with io.open(os.path.join(FIXTURES_DIR, name), encoding='utf8') as \
+                input_:
+            render(endpoint, FORMATS[endpoint][-1], input_.read())
+
+
+def render(endpoint, format_, html, backend='markdown'):
+    '''
+    Returns
+    -------
+    str
+        :data:`html` document extracted by :data:`endpoint`, in
+        :data:`format_` (see :data:`FORMATS`).
+    '''
+    if endpoint == '/shopping-list':
+        df_list = extract_shopping_list(html)
+        if format_ == 'csv':
+            return df_list.to_csv(index=False)
+        return df_list.to_json(orient='records')
+
+    menu = plain_menu(extract_menu(html))
+    if format_ == 'json' and endpoint == '/menu':
+        return json.dumps(menu, indent=4, sort_keys=True)
+
+    df_ingredients = ingredients_table(menu)
+    if endpoint == '/ingredients':
+        if format_ == 'csv':
+            return df_ingredients.to_csv(index=False)
+        return df_ingredients.to_json(orient='records')
+
+    menu_markdown = render_markdown(menu, df_ingredients) + '\n'
+    if format_ == 'markdown':
+        return menu_markdown
+    return markdown_to_html(menu_markdown, backend=backend)
+
+
+class RenderRequestHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format_, *args):
+        logging.debug(format_, *args)
+
+    def _send(self, status, body, content_type='text/plain'):
+        body = body.encode('utf8')
+        self.send_response(status)
+        self.send_header('Content-Type', '%s; charset=utf-8' % content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if urllib.parse.urlparse(self.path).path == '/health':
+            self._send(200, 'ok')
+        else:
+            self._send(404, 'Not found: `%s`' % self.path)
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        query = {k: v[-1] for k, v in
+                 urllib.parse.parse_qs(url.query).items()}
+        html = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+
+        if url.path not in FORMATS:
+            return self._send(404, 'Not found: `%s`' % url.path)
+        format_ = query.get('format', FORMATS[url.path][0])
+        backend = query.get('backend', 'markdown')
+        if format_ not in FORMATS[url.path] or backend not in HTML_BACKENDS:
+            return self._send(400, '`format` must be one of: %s (`backend` '
+                              'must be one of: %s)' %
+                              (', '.join(FORMATS[url.path]),
+                               ', '.join(HTML_BACKENDS)))
+
+        future = self.server.executor.submit(render, url.path, format_,
+                                             html.decode('utf8'), backend)
+        try:
+            body = future.result()
+        except EXTRACTION_ERRORS as exception:
+            return self._send(400, 'Failed to extract document: %s' %
+                              exception)
+        except Exception as exception:
+            logging.exception('Failed to render `%s`', self.path)
+            return self._send(500, '%s: %s' % (type(exception).__name__,
+                                               exception))
+        self._send(200, body, CONTENT_TYPES[format_])
+
+
+class RenderServer(socketserver.ThreadingMixIn, http.server.HTTPServer):
+    '''
+    Threaded HTTP server handing requests to a pool of warm workers.
+    '''
+    daemon_threads = True
+
+    def __init__(self, address, workers=None, threads=False):
+        http.server.HTTPServer.__init__(self, address, RenderRequestHandler)
+        workers = workers or os.cpu_count() or 1
+        if threads:
+            # Worker threads share imports, templates and unit registry.
+            warm_up()
+            self.executor = cf.ThreadPoolExecutor(max_workers=workers)
+        else:
+            self.executor = cf.ProcessPoolExecutor(max_workers=workers,
+                                                   initializer=warm_up)
+            # Start (and warm up) worker processes before serving requests.
+            starts = [self.executor.submit(os.getpid) for i in range(workers)]
+            cf.wait(starts)
+        logging.info('Warmed up %d workers', workers)
+
+    def server_close(self):
+        http.server.HTTPServer.server_close(self)
+        self.executor.shutdown()
+
+
+if hasattr(socketserver, 'UnixStreamServer'):
+    class UnixRenderServer(socketserver.UnixStreamServer, RenderServer):
+        '''
+        Same as :class:`RenderServer`, but listening on a Unix socket.
+        '''
+        def __init__(self, path, workers=None, threads=False):
+            RenderServer.__init__(self, path, workers=workers,
+                                  threads=threads)
+
+        def get_request(self):
+            request, client_address = socketserver.UnixStreamServer\
+                .get_request(self)
+            # `BaseHTTPRequestHandler` expects `(host, port)` address.
+            return request, ('unix', 0)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument('--host', default='127.0.0.1', help='Host (default: '
+                        '%(default)s).')
+    parser.add_argument('--port', type=int, default=8000, help='Port '
+                        '(default: %(default)s).')
+    parser.add_argument('--unix-socket', help='Listen on Unix socket at this '
+                        'path instead of TCP host/port.')
+    parser.add_argument('-j', '--workers', type=int, default=None,
+                        help='Number of worker processes (default: number of '
+                        'CPUs).')
+    parser.add_argument('--threads', action='store_true', help='Use worker '
+                        'threads instead of processes.')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+    # Shut down cleanly (e.g., remove Unix socket) when terminated.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    if args.unix_socket:
+        server = UnixRenderServer(args.unix_socket, workers=args.workers,
+                                  threads=args.threads)
+        logging.info('Listening on `%s`', args.unix_socket)
+    else:
+        server = RenderServer((args.host, args.port), workers=args.workers,
+                              threads=args.threads)
+        logging.info('Listening on http://%s:%d', *server.server_address[:2])
+    try:
+        server.serve_forever()
+    except (KeyboardInterrupt, SystemExit):
+        pass
+    finally:
+        server.server_close()
+        if args.unix_socket:
+            os.remove(args.unix_socket)
@@ -1,14 +1,29 @@
 # coding: utf-8
+import collections
+import csv as csv_
+import io
 import re
 
-import bs4
-import pandas as pd
+from six.moves.html_parser import HTMLParser
 
-from . import ureg
+from . import parse_html, parser_fallback, profiling
 
+#: Fields of records yielded by :func:`iter_shopping_list` (same as columns of
+#: table returned by :func:`extract_shopping_list`).
+FIELDS = ('category', 'meal', 'ingredient', 'side_dish', 'quantity')
+ShoppingListItem = collections.namedtuple('ShoppingListItem', FIELDS)
 
-def extract_shopping_list(shopping_list_html, csv=False):
+CRE_MEAL_CLASS = re.compile(r'^list-([1-5]|multi)$')
+CRE_ITEM_DETAILS = re.compile(r'^(?P<name>.*?)\s*\((?P<quantity>[^\)]+)\)$')
+
+
+@profiling.stage('extract_shopping_list')
+@parser_fallback
+def extract_shopping_list(shopping_list_html, csv=False, parser=None):
     '''
+    .. versionchanged:: X.X.X
+        Add ``parser`` kwarg (see :func:`dinner_daily_helpers.parse_html`).
+
     Returns
     -------
     pandas.DataFrame or str
@@ -63,7 +78,9 @@ def extract_shopping_list(shopping_list_html, csv=False):
             43        NaN        staple               toasted sesame oil      5     False
             44        NaN        staple                         turmeric      3     False
     '''
-    soup = bs4.BeautifulSoup(shopping_list_html, 'html5lib')
+    import pandas as pd
+
+    soup = parse_html(shopping_list_html, parser)
     staple_ingredient_items = soup.select('section#menu-key div#staple > '
                                           'ul.shopping-list > li')
 
@@ -99,13 +116,7 @@ def extract_shopping_list(shopping_list_html, csv=False):
     df_ingredients = pd.concat([df_staple_ingredients, df_ingredients])
     df_ingredients.sort_values(['category', 'ingredient', 'meal'], inplace=True)
     df_ingredients.reset_index(inplace=True, drop=True)
-
-    # df_ingredients.insert(2, 'quantity_imperial',
-                          # df_ingredients.quantity.astype(str)
-                          # .map(ureg.parse_expression))
-    # df_ingredients.insert(3, 'quantity_metric',
-                          # [q.to_base_units() if isinstance(q, ureg.Quantity)
-                           # else q for q in df_ingredients.quantity_imperial])
+    profiling.count('shopping list items', len(df_ingredients))
 
     if csv:
         return df_ingredients.to_csv(index=False, encoding='utf8')
@@ -116,7 +127,7 @@ def extract_shopping_list(shopping_list_html, csv=False):
 def extract_ingredient(ingredient_item):
     category_i = ingredient_item.find_parent('div').attrs['id']
 
-    for i in range(1, 6) + ['multi']:
+    for i in list(range(1, 6)) + ['multi']:
         if u'list-%s' % i in ingredient_item.attrs['class']:
             meal_i = i
             break
@@ -129,3 +140,155 @@ def extract_ingredient(ingredient_item):
     else:
         side_dish_i = None
     return (meal_i, category_i, name_i, side_dish_i)
+
+
+class _ShoppingListParser(HTMLParser):
+    '''
+    Event-based parser collecting :class:`ShoppingListItem` records in
+    :attr:`items` as each list item is closed.
+
+    Only the state of the list item currently being parsed is kept, i.e., no
+    document tree is built.
+    '''
+    def __init__(self):
+        HTMLParser.__init__(self)
+        self.items = []
+        # Stack of `(tag, category)` for open `section` and `div` elements.
+        self._stack = []
+        self._category = None
+        self._staple_count = 0
+        self._staples = set()
+        # Spans of current list item (`None` if not in a list item).
+        self._spans = None
+        self._meal = None
+        self._in_span = False
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag in ('section', 'div'):
+            classes = (attrs.get('class') or '').split()
+            if tag == 'div' and attrs.get('id') == 'staple':
+                category = 'staple'
+            elif tag == 'div' and 'list-section' in classes:
+                category = attrs.get('id')
+            else:
+                category = self._category
+            self._stack.append((tag, self._category))
+            self._category = category
+        elif tag == 'li' and self._category is not None:
+            self._end_item()
+            classes = (attrs.get('class') or '').split()
+            if self._category == 'staple':
+                self._staple_count += 1
+                self._meal = self._staple_count
+            elif 'list-item' in classes:
+                self._meal = next((int(match.group(1))
+                                   if match.group(1).isdigit()
+                                   else match.group(1)
+                                   for match in map(CRE_MEAL_CLASS.match,
+                                                    classes) if match), None)
+            else:
+                return
+            self._spans = []
+        elif tag == 'span' and self._spans is not None:
+            self._spans.append('')
+            self._in_span = True
+
+    def handle_endtag(self, tag):
+        if tag == 'span':
+            self._in_span = False
+        elif tag in ('li', 'ul'):
+            self._end_item()
+        elif tag in ('section', 'div'):
+            # Tolerate unbalanced tags by unwinding to matching open element.
+            while self._stack:
+                tag_i, self._category = self._stack.pop()
+                if tag_i == tag:
+                    break
+            self._end_item()
+
+    def handle_data(self, data):
+        if self._in_span and self._spans:
+            self._spans[-1] += data
+
+    def _end_item(self):
+        spans, meal = self._spans, self._meal
+        self._spans = self._meal = None
+        self._in_span = False
+        if not spans:
+            return
+        if self._category == 'staple':
+            for ingredient in re.split(r',\s*', spans[-1].strip()):
+                name = ingredient.replace('*', '').lower()
+                if name not in self._staples:
+                    self._staples.add(name)
+                    self.items.append(ShoppingListItem('staple', meal, name,
+                                                       '*' in ingredient,
+                                                       None))
+        elif meal is not None and len(spans) > 3:
+            details = spans[3].strip()
+            match = CRE_ITEM_DETAILS.match(details)
+            name, quantity = (match.groups() if match else (details, None))
+            self.items.append(ShoppingListItem(self._category, meal,
+                                               name.replace('*', '').lower(),
+                                               '*' in name, quantity))
+
+
+def iter_shopping_list(shopping_list_html, csv=False, chunk_size=1 << 16):
+    '''
+    Extract shopping list items in a single pass, without building a document
+    tree.
+
+    .. versionadded:: X.X.X
+
+    Parameters
+    ----------
+    shopping_list_html : str or file-like
+        Shopping list HTML document.  File-like objects are read
+        incrementally (in chunks of :data:`chunk_size` characters), so memory
+        use does not depend on the size of the document.
+    csv : bool, optional
+        If ``True``, yield CSV lines (starting with a header row) instead of
+        records, e.g., to write straight to a file::
+
+            output.writelines(iter_shopping_list(input_, csv=True))
+
+    Yields
+    ------
+    ShoppingListItem or str
+        One record per ingredient (see :data:`FIELDS`), in document order.
+
+        Unlike :func:`extract_shopping_list`, records are **not** sorted;
+        e.g., ``pd.DataFrame(iter_shopping_list(html)).sort_values(['category',
+        'ingredient', 'meal'])`` gives the same table.
+    '''
+    if csv:
+        buffer_ = io.StringIO()
+        writer = csv_.writer(buffer_, lineterminator='\n')
+
+        def to_csv(row):
+            buffer_.seek(0)
+            buffer_.truncate()
+            writer.writerow(row)
+            return buffer_.getvalue()
+
+        yield to_csv(FIELDS)
+        for item in iter_shopping_list(shopping_list_html,
+                                       chunk_size=chunk_size):
+            yield to_csv(item)
+        return
+
+    if hasattr(shopping_list_html, 'read'):
+        chunks = iter(lambda: shopping_list_html.read(chunk_size), '')
+    else:
+        chunks = [shopping_list_html]
+
+    parser = _ShoppingListParser()
+    for chunk in chunks:
+        parser.feed(chunk)
+        for item in parser.items:
+            yield item
+        del parser.items[:]
+    parser.close()
+    for item in parser.items:
+        yield item
@@ -0,0 +1,446 @@
+'''
+Persistent store of extracted menus (SQLite), to query many weeks of menus
+without re-parsing HTML documents, e.g.::
+
+    python -m dinner_daily_helpers.store menus.db ingest menus/
+    python -m dinner_daily_helpers.store menus.db query \
+        "SELECT start_date FROM menus JOIN ingredients USING (menu_id) \
+         WHERE canonical = 'ground turkey'"
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import concurrent.futures as cf
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import sys
+
+from .menu import extract_menu, ingredients_table, plain_menu
+
+#: Version of database schema (stored as ``PRAGMA user_version``).
+SCHEMA_VERSION = 1
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS menus (
+    menu_id INTEGER PRIMARY KEY,
+    content_hash TEXT NOT NULL UNIQUE,
+    path TEXT,
+    start_date TEXT,
+    store TEXT,
+    title TEXT,
+    date TEXT,
+    servings TEXT,
+    menu_json TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS meals (
+    menu_id INTEGER NOT NULL REFERENCES menus (menu_id) ON DELETE CASCADE,
+    meal INTEGER NOT NULL,
+    main_dish TEXT,
+    side_dishes TEXT,
+    duration TEXT,
+    duration_minutes INTEGER,
+    nutrition TEXT,
+    PRIMARY KEY (menu_id, meal)
+);
+CREATE TABLE IF NOT EXISTS ingredients (
+    menu_id INTEGER NOT NULL REFERENCES menus (menu_id) ON DELETE CASCADE,
+    meal INTEGER NOT NULL,
+    dish TEXT,
+    side INTEGER,
+    quantity TEXT,
+    unit TEXT,
+    ingredient TEXT,
+    processing TEXT,
+    canonical TEXT,
+    magnitude REAL,
+    base_unit TEXT
+);
+CREATE INDEX IF NOT EXISTS menus_start_date ON menus (start_date);
+CREATE INDEX IF NOT EXISTS menus_store ON menus (store);
+CREATE INDEX IF NOT EXISTS ingredients_canonical ON ingredients (canonical);
+CREATE INDEX IF NOT EXISTS ingredients_menu_id ON ingredients (menu_id, meal);
+'''
+#: Start date and store in names of weekly menus written by
+#: :func:`download.download`, e.g., ``2019-01-06-weekly-menu-giant.html``.
+CRE_MENU_NAME = re.compile(r'^(?P<start_date>\d{4}-\d{2}-\d{2})-weekly-menu-'
+                           r'(?P<store>.*)\.html$')
+#: Meal duration, e.g., ``"1 hr 15 min"``.
+CRE_DURATION = re.compile(r'^\s*(?:(?P<hours>\d+)\s*(?:hr|hour)s?)?\s*'
+                          r'(?:(?P<minutes>\d+)\s*min(?:ute)?s?)?\s*$')
+
+
+def content_hash(menu_html):
+    return hashlib.sha256(menu_html.encode('utf8')).hexdigest()
+
+
+def duration_minutes(duration):
+    '''
+    Returns
+    -------
+    int
+        Number of minutes in meal duration (e.g., ``"1 hr 15 min"``), or
+        ``None`` if duration is not recognized.
+    '''
+    match = CRE_DURATION.match(duration or '')
+    if not match or not any(match.groups()):
+        return None
+    return (60 * int(match.group('hours') or 0) +
+            int(match.group('minutes') or 0))
+
+
+def _extract_menu_file(path):
+    with open(path, 'r') as input_:
+        menu_html = input_.read()
+    menu = plain_menu(extract_menu(menu_html))
+    return content_hash(menu_html), menu, ingredients_table(menu)
+
+
+class MenuStore(object):
+    '''
+    SQLite database of extracted menus, with the tables:
+
+     - ``menus``: one row per weekly menu, including the whole menu as JSON
+       (see :meth:`menu`);
+     - ``meals``: one row per meal, including duration in minutes;
+     - ``ingredients``: one row per ingredient (see
+       :func:`menu.ingredients_table`), including canonical name (see
+       :func:`canonical.canonicalize`) and quantity in base units (see
+       :func:`aggregate.normalized_quantities`).
+
+    Menus are identified by content hash of the HTML document, so ingesting
+    the same document again has no effect.
+
+    Parameters
+    ----------
+    path : str, optional
+        Database path (default: in-memory database).
+    '''
+    def __init__(self, path=':memory:'):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError('Unsupported schema version %d in `%s` '
+                             '(expected %d).' % (version, path,
+                                                 SCHEMA_VERSION))
+        with self.connection:
+            self.connection.executescript(SCHEMA)
+            self.connection.execute('PRAGMA user_version = %d' %
+                                    SCHEMA_VERSION)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def has(self, content_hash_):
+        row = self.connection.execute('SELECT 1 FROM menus WHERE '
+                                      'content_hash = ?',
+                                      (content_hash_, )).fetchone()
+        return row is not None
+
+    def ingest(self, menu_html, path=None, start_date=None):
+        '''
+        Extract and insert weekly menu (unless already ingested).
+
+        Parameters
+        ----------
+        menu_html : str
+            Weekly menu HTML document.
+        path : str, optional
+            Path of document.  If the name matches :data:`CRE_MENU_NAME`,
+            it sets the default :data:`start_date`.
+        start_date : str, optional
+            Start date of menu (``YYYY-MM-DD``).
+
+        Returns
+        -------
+        bool
+            ``True`` if menu was inserted, ``False`` if it was already in the
+            store.
+        '''
+        hash_ = content_hash(menu_html)
+        if self.has(hash_):
+            return False
+        menu = plain_menu(extract_menu(menu_html))
+        return self.insert(hash_, menu, ingredients_table(menu), path=path,
+                           start_date=start_date)
+
+    def insert(self, content_hash_, menu, df_ingredients, path=None,
+               start_date=None):
+        '''
+        Insert already extracted menu (unless already ingested).
+
+        Parameters
+        ----------
+        content_hash_ : str
+            Content hash of weekly menu HTML document (see
+            :func:`content_hash`).
+        menu : dict
+            Menu in format returned by :func:`menu.extract_menu` (with plain
+            strings, see :func:`menu.plain_menu`).
+        df_ingredients : pandas.DataFrame
+            Table returned by :func:`menu.ingredients_table`.
+
+        Returns
+        -------
+        bool
+            ``True`` if menu was inserted.
+        '''
+        from .aggregate import normalized_quantities
+        from .canonical import canonicalize
+
+        if start_date is None and path is not None:
+            match = CRE_MENU_NAME.match(os.path.basename(path))
+            if match:
+                start_date = match.group('start_date')
+
+        df_quantities = normalized_quantities(df_ingredients)
+        canonical = canonicalize(df_ingredients['ingredient'])
+        ingredient_rows = [(int(row_i.meal), row_i.dish, int(row_i.side),
+                            _text(row_i.quantity), _text(row_i.unit),
+                            _text(row_i.ingredient), _text(row_i.processing),
+                            _text(canonical_i), _number(magnitude_i),
+                            _text(unit_i))
+                           for row_i, canonical_i, magnitude_i, unit_i in
+                           zip(df_ingredients.itertuples(), canonical,
+                               df_quantities['magnitude'],
+                               df_quantities['unit'])]
+
+        with self.connection:
+            cursor = self.connection.execute(
+                'INSERT OR IGNORE INTO menus (content_hash, path, start_date, '
+                'store, title, date, servings, menu_json) VALUES (?, ?, ?, ?, '
+                '?, ?, ?, ?)', (content_hash_, path, start_date,
+                                menu.get('store'), menu.get('title'),
+                                menu.get('date'), menu.get('servings'),
+                                json.dumps(menu, sort_keys=True)))
+            if not cursor.rowcount:
+                return False
+            menu_id = cursor.lastrowid
+            self.connection.executemany(
+                'INSERT INTO meals VALUES (?, ?, ?, ?, ?, ?, ?)',
+                [(menu_id, i + 1, meal_i['main_dish']['title'],
+                  json.dumps([side_j['title']
+                              for side_j in meal_i['side_dishes']]),
+                  meal_i.get('duration'),
+                  duration_minutes(meal_i.get('duration')),
+                  json.dumps(meal_i.get('nutrition', [])))
+                 for i, meal_i in enumerate(menu['meals'])])
+            self.connection.executemany(
+                'INSERT INTO ingredients VALUES (%d, ?, ?, ?, ?, ?, ?, ?, ?, '
+                '?, ?)' % menu_id, ingredient_rows)
+        return True
+
+    def ingest_files(self, paths, processes=None, errors=None):
+        '''
+        Ingest weekly menu HTML documents, extracting menus that are not
+        already in the store in a process pool.
+
+        Parameters
+        ----------
+        paths : list[str]
+            Weekly menu HTML document paths.
+        processes : int, optional
+            Number of worker processes (default: number of CPUs).
+        errors : dict, optional
+            If specified, add ``path -> error`` entry for each file that
+            failed to parse.
+
+        Returns
+        -------
+        int
+            Number of menus inserted.
+        '''
+        new_paths = []
+        for path in paths:
+            with open(path, 'r') as input_:
+                if not self.has(content_hash(input_.read())):
+                    new_paths.append(path)
+        logging.info('Ingesting %d new of %d weekly menus', len(new_paths),
+                     len(paths))
+        if not new_paths:
+            return 0
+
+        inserted = 0
+        with cf.ProcessPoolExecutor(max_workers=processes) as executor:
+            futures = {executor.submit(_extract_menu_file, path): path
+                       for path in new_paths}
+            for future in cf.as_completed(futures):
+                path = futures[future]
+                try:
+                    hash_, menu, df_ingredients = future.result()
+                except Exception as exception:
+                    error = '%s: %s' % (type(exception).__name__, exception)
+                    logging.warning('Failed to extract menu from `%s`: %s',
+                                    path, error)
+                    if errors is not None:
+                        errors[path] = error
+                    continue
+                inserted += self.insert(hash_, menu, df_ingredients,
+                                        path=path)
+        return inserted
+
+    def query(self, sql, params=()):
+        '''
+        Returns
+        -------
+        pandas.DataFrame
+            Result of SQL query.
+        '''
+        import pandas as pd
+
+        return pd.read_sql_query(sql, self.connection, params=params)
+
+    def menus(self, start=None, end=None, store=None, ingredient=None):
+        '''
+        Parameters
+        ----------
+        start, end : str, optional
+            Only include menus with start date in this (inclusive) range
+            (``YYYY-MM-DD``).
+        store : str, optional
+            Only include menus for this store.
+        ingredient : str, optional
+            Only include menus using this ingredient (canonical name, e.g.,
+            ``"ground turkey"``).
+
+        Returns
+        -------
+        pandas.DataFrame
+            Table of menus (without ``menu_json`` column), sorted by start
+            date.
+        '''
+        where, params = self._filters(start, end, store)
+        if ingredient is not None:
+            where.append('menu_id IN (SELECT menu_id FROM ingredients WHERE '
+                         'canonical = ?)')
+            params.append(ingredient)
+        return self.query('SELECT menu_id, content_hash, path, start_date, '
+                          'store, title, date, servings FROM menus%s ORDER BY '
+                          'start_date, menu_id' % _where(where), params)
+
+    def meals(self, start=None, end=None, store=None, ingredient=None):
+        '''
+        Same as :meth:`menus`, but returns table of meals (including start
+        date and store of menu), where :data:`ingredient` selects meals
+        using the ingredient.
+
+        For example, average duration of meals with fish::
+
+            store.meals(ingredient='fresh fish fillet').duration_minutes.mean()
+        '''
+        where, params = self._filters(start, end, store)
+        if ingredient is not None:
+            where.append('(meals.menu_id, meals.meal) IN (SELECT menu_id, '
+                         'meal FROM ingredients WHERE canonical = ?)')
+            params.append(ingredient)
+        return self.query('SELECT meals.*, start_date, store FROM meals JOIN '
+                          'menus USING (menu_id)%s ORDER BY start_date, '
+                          'menu_id, meal' % _where(where), params)
+
+    def ingredients(self, start=None, end=None, store=None, ingredient=None):
+        '''
+        Same as :meth:`menus`, but returns table of ingredients (including
+        start date and store of menu).
+        '''
+        where, params = self._filters(start, end, store)
+        if ingredient is not None:
+            where.append('canonical = ?')
+            params.append(ingredient)
+        return self.query('SELECT ingredients.*, start_date, store FROM '
+                          'ingredients JOIN menus USING (menu_id)%s ORDER BY '
+                          'start_date, menu_id, meal' % _where(where), params)
+
+    def menu(self, menu_id):
+        '''
+        Returns
+        -------
+        dict
+            Menu in format returned by :func:`menu.extract_menu`.
+        '''
+        # Menu IDs in query results are `numpy.int64`, which `sqlite3` does
+        # not bind as integers.
+        row = self.connection.execute('SELECT menu_json FROM menus WHERE '
+                                      'menu_id = ?',
+                                      (int(menu_id), )).fetchone()
+        if row is None:
+            raise KeyError(menu_id)
+        return json.loads(row[0])
+
+    def _filters(self, start, end, store):
+        where, params = [], []
+        for condition, value in (('start_date >= ?', start),
+                                 ('start_date <= ?', end),
+                                 ('store = ?', store)):
+            if value is not None:
+                where.append(condition)
+                params.append(value)
+        return where, params
+
+
+def _where(conditions):
+    return ' WHERE %s' % ' AND '.join(conditions) if conditions else ''
+
+
+def _text(value):
+    # Convert `NaN` (i.e., missing value) to `NULL`.
+    if value is None or value != value:
+        return None
+    return '%s' % value
+
+
+def _number(value):
+    return None if value != value else float(value)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Store of extracted weekly '
+                                     'menus.')
+    parser.add_argument('database', help='SQLite database path.')
+    subparsers = parser.add_subparsers(dest='command')
+    subparsers.required = True
+
+    ingest = subparsers.add_parser('ingest', help='Ingest weekly menus '
+                                   '(skipping menus already in the store).')
+    ingest.add_argument('input', help='Directory containing weekly menu HTML '
+                        'documents, or glob pattern (e.g., `"2019-*.html"`).')
+    ingest.add_argument('-j', '--processes', type=int, default=None,
+                        help='Number of worker processes (default: number of '
+                        'CPUs).')
+
+    query = subparsers.add_parser('query', help='Run SQL query and write '
+                                  'result as CSV to `stdout`.')
+    query.add_argument('sql', help='SQL query.')
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    from .batch import find_menus
+
+    logging.basicConfig(level=logging.INFO)
+    args = parse_args()
+
+    with MenuStore(args.database) as store:
+        if args.command == 'ingest':
+            paths = find_menus(args.input)
+            if not paths:
+                raise SystemExit('No weekly menu documents found matching '
+                                 '`%s`.' % args.input)
+            errors = {}
+            inserted = store.ingest_files(paths, processes=args.processes,
+                                          errors=errors)
+            logging.info('Inserted %d weekly menus (%d errors)', inserted,
+                         len(errors))
+            if errors:
+                raise SystemExit(1)
+        else:
+            store.query(args.sql).to_csv(sys.stdout, index=False)
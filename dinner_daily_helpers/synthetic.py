@@ -0,0 +1,255 @@
+'''
+Synthetic Dinner Daily documents, e.g., for benchmarks.
+
+Documents follow the structure of the Dinner Daily website, in both the
+weekly menu header format used up until 2019-03-17 (``header="old"``) and
+after (``header="new"``).  Sample documents are included in
+:data:`FIXTURES_DIR`; to write an archive of weekly menus::
+
+    python -m dinner_daily_helpers.synthetic menus/ --weeks 156
+'''
+from __future__ import print_function, unicode_literals, division
+import argparse
+import datetime as dt
+import os
+import random
+from html import escape
+
+#: Directory containing sample (anonymized) documents.
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.realpath(__file__)),
+                            'fixtures')
+#: Ingredient strings in the format used by Dinner Daily menus.
+SAMPLE_INGREDIENTS = ['3/4 lb chicken breast tenders', '1 tbs olive oil',
+                      '1/4 onion, small, chopped', '1/2 cup frozen corn',
+                      '8 oz black beans, drained & rinsed',
+                      '1 1/2 cups brown rice', 'salt and pepper',
+                      '2 garlic cloves, minced, divided', '1 head cauliflower',
+                      '1 bunch kale, chopped', '1 bulb garlic', '2 lemons',
+                      '1 package salad mix', '1/2 lb green beans, ends '
+                      'trimmed', '3 oz mushrooms, sliced', '1 loaf bread',
+                      '2 tsp cumin (ground)', '1 lb fresh fish fillets',
+                      '1 zucchini, diced', '3 oz shredded parmesan cheese']
+#: Main dish titles.
+SAMPLE_TITLES = ['Southwest Chicken Wraps', 'Lemon Garlic Fish',
+                 'Turkey Meatballs with Ziti', 'Black Bean Burrito Bowls',
+                 'Mushroom Risotto', 'Chicken Stir-Fry', 'Vegetable Curry',
+                 'Sheet Pan Fajitas', 'Greek Turkey Burgers',
+                 'Pasta Primavera']
+#: Shopping list items, by section: ``(name, quantity)``.
+SAMPLE_ITEMS = {
+    'produce': [('asparagus', '1 bunch'), ('baby spinach', '2 oz'),
+                ('cauliflower, small', '1 head'), ('fresh parsley',
+                                                   '1 bunch'),
+                ('garlic', '1 bulb'), ('green beans', '1/2 lb'),
+                ('kale', '1 bunch'), ('lemons', '2'), ('onions', '2'),
+                ('salad mix', '1 package'), ('zucchini', '1')],
+    'meat-poultry': [('chicken breast tenders', '3/4 lb'),
+                     ('ground turkey', '3/4 lb'), ('turkey cutlets',
+                                                   '3/4 lb')],
+    'seafood': [('fresh fish fillets, any choice', '1 lb')],
+    'dairy': [('feta cheese', '1 oz'), ('low fat sour cream', '2 oz'),
+              ('shredded parmesan cheese', '1 oz')],
+    'grocery': [('burrito-size tortillas', '3'), ('canned black beans',
+                                                  '8 oz'),
+                ('chicken broth', '2 oz'), ('naan (or flatbread)',
+                                            '1 package'),
+                ('ziti pasta', '8 oz')],
+    'frozen': [('frozen corn (fresh works, too)', '3 oz'),
+               ('frozen peas', '3 oz')]}
+#: Staple ingredients.
+SAMPLE_STAPLES = ['olive oil', 'butter', 'dijon mustard', 'garlic powder',
+                  'cumin (ground)', 'oregano (dried)', 'salad dressing',
+                  'toasted sesame oil', 'turmeric']
+
+
+def synthetic_menu(meals=5, sides=2, ingredients=8, seed=0):
+    '''
+    Returns
+    -------
+    dict
+        Menu in format returned by :func:`menu.extract_menu`, with dishes
+        populated using random :data:`SAMPLE_INGREDIENTS`.
+    '''
+    random_ = random.Random(seed)
+
+    def dish(title):
+        return {'title': title, 'instructions': ['Cook.'],
+                'ingredients': [random_.choice(SAMPLE_INGREDIENTS)
+                                for i in range(ingredients)]}
+
+    return {'title': 'Weekly Menu', 'store': 'Any Store',
+            'date': 'Jan 06 to 12', 'servings': '4 servings',
+            'meals': [{'main_dish': dish('Main dish %d' % (i + 1)),
+                       'side_dishes': [dish('Side dish %d.%d' % (i + 1, j))
+                                       for j in range(sides)],
+                       'duration': '30 min', 'nutrition': []}
+                      for i in range(meals)]}
+
+
+def _recipe_html(recipe):
+    return ('<ul>%s</ul><div class="instructions"><p>%s</p></div>' %
+            (''.join('<li>%s</li>' % escape(ingredient, quote=False)
+                     for ingredient in recipe['ingredients']),
+             escape(' '.join(recipe['instructions']), quote=False)))
+
+
+def weekly_menu_html(menu=None, header='new', **kwargs):
+    '''
+    Parameters
+    ----------
+    menu : dict, optional
+        Menu in format returned by :func:`menu.extract_menu` (default:
+        ``synthetic_menu(**kwargs)``).
+    header : str, optional
+        Header format: ``"old"`` (up until 2019-03-17) or ``"new"``.
+
+    Returns
+    -------
+    str
+        Weekly menu HTML document.
+    '''
+    if menu is None:
+        menu = synthetic_menu(**kwargs)
+    if header == 'old':
+        header_html = ('<header><h1>%(title)s</h1><h2>%(store)s - %(date)s - '
+                       '%(servings)s</h2></header>' % menu)
+    elif header == 'new':
+        header_html = ('<header><div class="theme-date">Week of - %(date)s'
+                       '</div><div class="theme-store-name">%(store)s</div>'
+                       '<div id="family-label"><h1>%(title)s</h1>'
+                       '<h2>%(servings)s</h2></div></header>' % menu)
+    else:
+        raise ValueError('`header` must be one of: old, new')
+
+    meals = []
+    for i, meal_i in enumerate(menu['meals']):
+        sides_i = ''.join('<div class="details"><h5 class="side-heading">'
+                          '<span class="label">%s</span></h5>%s</div>' %
+                          (escape(side_j['title'], quote=False),
+                           _recipe_html(side_j))
+                          for side_j in meal_i['side_dishes'] +
+                          [{'title': 'Add a Side', 'ingredients': [],
+                            'instructions': ['Any side you like.']}])
+        notes_i = ''.join('<p>%s</p>' % escape(note, quote=False)
+                          for note in meal_i.get('notes', []))
+        meals.append('<li id="item-%d" class="menu-item"><h3><span '
+                     'class="label">%s</span></h3><span class="duration">%s'
+                     '</span><div class="dishes"><div class="details">%s'
+                     '</div><div class="side-dishes">%s</div></div>'
+                     '<ul class="nutrition">%s</ul>%s</li>' %
+                     (i + 1, escape(meal_i['main_dish']['title'],
+                                    quote=False),
+                      meal_i['duration'], _recipe_html(meal_i['main_dish']),
+                      sides_i, ''.join('<li>%s</li>' % nutrition
+                                       for nutrition in
+                                       meal_i['nutrition']),
+                      '<div class="recipe-notes">%s</div>' % notes_i
+                      if notes_i else ''))
+    return ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>'
+            'Weekly Menu</title></head><body>%s<ul id="menu">%s</ul></body>'
+            '</html>\n' % (header_html, '\n'.join(meals)))
+
+
+def shopping_list_html(meals=5, items=40, seed=0):
+    '''
+    Parameters
+    ----------
+    meals : int, optional
+        Number of meals.
+    items : int, optional
+        Number of shopping list items (excluding staples).
+
+    Returns
+    -------
+    str
+        Shopping list HTML document, with items drawn at random from
+        :data:`SAMPLE_ITEMS`.
+    '''
+    random_ = random.Random(seed)
+    sections = sorted(SAMPLE_ITEMS)
+    by_section = dict((section, []) for section in sections)
+    for i in range(items):
+        section = random_.choice(sections)
+        name, quantity = random_.choice(SAMPLE_ITEMS[section])
+        meal = random_.choice(list(range(1, meals + 1)) + ['multi'])
+        # Side dish ingredients are marked with `*`.
+        side = '*' if random_.random() < .25 else ''
+        hidden = ' hidden' if random_.random() < .05 else ''
+        by_section[section].append('<li class="list-item list-%s%s"><span '
+                                   'class="check"></span><span class="meal">'
+                                   '%s</span><span class="x"></span><span '
+                                   'class="item-details">%s%s (%s)</span>'
+                                   '</li>' % (meal, hidden, meal, side,
+                                              escape(name, quote=False),
+                                              quantity))
+    staples = ''.join('<li><span>%d</span><span>%s</span></li>' %
+                      (i + 1, ', '.join(('*' if random_.random() < .25
+                                         else '') + staple for staple in
+                                        random_.sample(SAMPLE_STAPLES, 3)))
+                      for i in range(meals))
+    lists = ''.join('<div><div class="list-section" id="%s"><h4>%s</h4><ul '
+                    'class="shopping-list">%s</ul></div></div>' %
+                    (section, section.title(), ''.join(by_section[section]))
+                    for section in sections if by_section[section])
+    return ('<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>'
+            'Shopping List</title></head><body><section id="menu-key"><div '
+            'id="staple"><h4>Staples</h4><ul class="shopping-list">%s</ul>'
+            '</div></section><section id="main-list">%s</section></body>'
+            '</html>\n' % (staples, lists))
+
+
+def write_archive(output_dir, weeks=52, start=dt.date(2018, 1, 7),
+                  store='any-store', meals=5, seed=0):
+    '''
+    Write synthetic weekly menus (using header format by date), named like
+    documents written by :func:`download.download`.
+
+    Returns
+    -------
+    list[str]
+        Paths of weekly menu HTML documents.
+    '''
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+    random_ = random.Random(seed)
+    paths = []
+    for i in range(weeks):
+        date_i = start + dt.timedelta(weeks=i)
+        menu_i = synthetic_menu(meals=meals, seed=random_.random())
+        for j, meal_ij in enumerate(menu_i['meals']):
+            meal_ij['main_dish']['title'] = random_.choice(SAMPLE_TITLES)
+        menu_i['date'] = '%s to %s' % (date_i.strftime('%b %d'),
+                                       (date_i + dt.timedelta(days=6))
+                                       .strftime('%d'))
+        header = 'old' if date_i <= dt.date(2019, 3, 17) else 'new'
+        path = os.path.join(output_dir, '%s-weekly-menu-%s.html' %
+                            (date_i.strftime('%Y-%m-%d'), store))
+        with open(path, 'w') as output:
+            output.write(weekly_menu_html(menu_i, header=header))
+        paths.append(path)
+    return paths
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Write archive of synthetic '
+                                     'weekly menus.')
+
+    parser.add_argument('output_dir', help='Output directory.')
+    parser.add_argument('--weeks', type=int, default=52, help='Number of '
+                        'weeks (default: %(default)s).')
+    parser.add_argument('--meals', type=int, default=5, help='Number of meals '
+                        'per week (default: %(default)s).')
+    parser.add_argument('--start', default='2018-01-07', help='Date of first '
+                        'week (default: %(default)s).')
+    parser.add_argument('--seed', type=int, default=0)
+
+    return parser.parse_args()
+
+
+if __name__ == '__main__':
+    args = parse_args()
+    paths = write_archive(args.output_dir, weeks=args.weeks,
+                          start=dt.datetime.strptime(args.start,
+                                                     '%Y-%m-%d').date(),
+                          meals=args.meals, seed=args.seed)
+    print('Wrote %d weekly menus to `%s`.' % (len(paths), args.output_dir))
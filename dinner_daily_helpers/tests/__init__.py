@@ -0,0 +1,16 @@
+from __future__ import unicode_literals
+import io
+import os
+
+from ..synthetic import FIXTURES_DIR
+
+
+def read_fixture(name):
+    '''
+    Returns
+    -------
+    str
+        Contents of sample document in :data:`synthetic.FIXTURES_DIR`.
+    '''
+    with io.open(os.path.join(FIXTURES_DIR, name), encoding='utf8') as input_:
+        return input_.read()
@@ -0,0 +1,65 @@
+from __future__ import unicode_literals
+import hashlib
+import http.server
+import threading
+import urllib.parse
+
+import pytest
+
+from . import read_fixture
+
+#: Sample document served for each page, by URL prefix.
+PAGE_FIXTURES = {'print': 'weekly-menu-new-header.html',
+                 'print-shopping-list': 'shopping-list.html'}
+#: Store name for which the fake menu server responds with an error.
+BROKEN_STORE = 'Broken Store'
+#: Store name for which the fake menu server serves an invalid weekly menu.
+INVALID_STORE = 'Invalid Store'
+
+
+class MenuRequestHandler(http.server.BaseHTTPRequestHandler):
+    def log_message(self, format_, *args):
+        pass
+
+    def do_GET(self):
+        # E.g., `/menus/print/<store>/<week>`.
+        parts = urllib.parse.unquote(self.path).strip('/').split('/')
+        if (len(parts) != 4 or parts[1] not in PAGE_FIXTURES or
+                parts[2] == BROKEN_STORE):
+            self.send_error(404)
+            return
+        if parts[1] == 'print' and parts[2] == INVALID_STORE:
+            body = b'<html><body>Not a weekly menu.</body></html>'
+        else:
+            body = read_fixture(PAGE_FIXTURES[parts[1]]).encode('utf8')
+        # Answer conditional requests for unchanged pages.
+        etag = '"%s"' % hashlib.sha1(body).hexdigest()
+        if self.headers.get('If-None-Match') == etag:
+            self.send_response(304)
+            self.send_header('ETag', etag)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('ETag', etag)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+@pytest.fixture
+def menus_url():
+    '''
+    Base URL of fake Dinner Daily menu server serving sample documents.
+    '''
+    server = http.server.ThreadingHTTPServer(('127.0.0.1', 0),
+                                             MenuRequestHandler)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        yield 'http://%s:%d/menus/' % server.server_address[:2]
+    finally:
+        server.shutdown()
+        server.server_close()
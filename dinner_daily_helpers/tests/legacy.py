@@ -0,0 +1,115 @@
+'''
+Reference (previous) implementations of optimized code paths, checked for
+equivalence in the tests and timed by :mod:`dinner_daily_helpers.benchmark`.
+'''
+from __future__ import unicode_literals
+import re
+
+import pint
+import six
+
+from .. import get_ureg, is_unit
+from ..menu import CRE_INGREDIENT, CRE_PROCESSING
+
+
+def legacy_extract_meal(meal_div):
+    '''
+    Reference implementation of :func:`menu.extract_meal`, using a separate
+    CSS selector query (i.e., tree search) for each field.
+    '''
+    duration = meal_div.find('span', class_='duration').contents[0]
+    title = meal_div.select_one('h3 span.label').contents[0]
+
+    def extract_recipe(recipe_div):
+        recipe = {}
+        title = recipe_div.select_one('h5 > span.label')
+        if title is not None:
+            recipe['title'] = title.contents[0]
+        recipe['ingredients'] = [li.contents[0]
+                                 for li in recipe_div.select('li')]
+        instructions = recipe_div.select_one('div.instructions p').contents[0]
+        recipe['instructions'] = (re.sub(r'\.\s+', '.\n', instructions)
+                                  .splitlines())
+        return recipe
+
+    main_dish = extract_recipe(meal_div.select_one('div.dishes > '
+                                                   'div.details'))
+    main_dish['title'] = title
+    side_dishes = [extract_recipe(div)
+                   for div in meal_div.select('div.dishes > div.side-dishes '
+                                              '> div.details')
+                   if div.select_one('h5.side-heading > span.label')
+                   .contents[0].lower() != 'add a side']
+    meal = {'main_dish': main_dish, 'side_dishes': side_dishes,
+            'duration': duration,
+            'nutrition': [li.contents[0]
+                          for li in meal_div.select('ul.nutrition > li')]}
+    notes_div = meal_div.find('div', class_='recipe-notes')
+    if notes_div is not None:
+        meal['notes'] = [p.contents[0] for p in notes_div.find_all('p')]
+    return meal
+
+
+def legacy_default_units(df_decode_ingredients):
+    '''
+    Row-wise reference of the unit classification *intended* by the original
+    :func:`menu.ingredients_table` loop, parsing every row with ``pint``.
+
+    This is **not** the original code: the original loop assigned to the row
+    copies yielded by ``iterrows()``, so it never changed the table (i.e.,
+    unrecognized tokens such as ``"onion,"`` were kept as unit).  Here,
+    changes are written back, so results match the current (changed)
+    behavior of :func:`menu.decode_ingredients`.
+    '''
+    for i, ingredient_i in df_decode_ingredients.iterrows():
+        (quantity_i, unit_i, desc_i) = ingredient_i[['quantity', 'unit',
+                                                     'description']]
+        try:
+            get_ureg().parse_expression('%s %s' % (quantity_i, unit_i))
+        except pint.UndefinedUnitError:
+            if unit_i == unit_i and isinstance(unit_i, six.string_types):
+                desc_i = '%s %s' % (unit_i, desc_i)
+            df_decode_ingredients.at[i, 'description'] = desc_i
+            df_decode_ingredients.at[i, 'unit'] = 'each'
+
+
+def legacy_vectorized_default_units(df_decode_ingredients):
+    '''
+    Reference implementation of unit classification (as previously done by
+    :func:`menu.ingredients_table`), looking up each distinct unit token once
+    and fixing up rows in place.
+    '''
+    units = df_decode_ingredients['unit']
+    known = {unit_i: is_unit(unit_i) for unit_i in units.dropna().unique()}
+    unknown = units.map(known).eq(False)
+    if unknown.any():
+        df_decode_ingredients.loc[unknown, 'description'] = \
+            (units[unknown] + ' ' +
+             df_decode_ingredients.loc[unknown, 'description'])
+        df_decode_ingredients.loc[unknown, 'unit'] = 'each'
+
+
+def legacy_decode_ingredients(ingredients,
+                              default_units=legacy_vectorized_default_units):
+    '''
+    Reference implementation of :func:`menu.decode_ingredients` (as
+    previously done by :func:`menu.ingredients_table`), using two
+    ``str.extract`` passes and in-place fix ups.
+
+    Parameters
+    ----------
+    default_units : function, optional
+        Unit classification, e.g., :func:`legacy_default_units`.
+    '''
+    df_decode = ingredients.str.extract(CRE_INGREDIENT, expand=False)
+    df_decode.drop([1, 2, 5], axis=1, inplace=True)
+    isna = df_decode['quantity'].isna()
+    df_decode.loc[isna, 'description'] = ingredients
+    df_decode.loc[isna, 'quantity'] = 1
+    default_units(df_decode)
+    df_processing = (df_decode.description.str
+                     .extract(CRE_PROCESSING, expand=True)[['root',
+                                                            'processing']])
+    df_decode['description'] = df_processing['root']
+    df_decode['processing'] = df_processing['processing']
+    return df_decode
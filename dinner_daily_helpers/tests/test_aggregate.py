@@ -0,0 +1,45 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from ..aggregate import aggregate_ingredients
+from ..menu import ingredients_table
+
+
+def _menu(*dishes):
+    return {'meals': [{'main_dish': {'title': 'Dish %d' % i,
+                                     'ingredients': list(ingredients),
+                                     'instructions': []},
+                       'side_dishes': [], 'duration': None,
+                       'nutrition': []}
+                      for i, ingredients in enumerate(dishes)]}
+
+
+def test_aggregate_tbs_tsp():
+    tables = {1: ingredients_table(_menu(['1 tbs olive oil',
+                                          '2 tsp olive oil'])),
+              2: ingredients_table(_menu(['1 tbs olive oil', '1 onion'],
+                                         ['1/4 onion, small, chopped']))}
+    assert tables[1]['unit'].tolist() == ['tbs', 'tsp']
+    df_aggregate = aggregate_ingredients(tables, units=['tbs', 'cup'])
+    records = {ingredient: (unit, magnitude, count)
+               for ingredient, unit, magnitude, count
+               in df_aggregate[['ingredient', 'unit', 'magnitude', 'count']]
+               .itertuples(index=False)}
+    assert records['olive oil'][0] == 'tbs'
+    assert records['olive oil'][1:] == (pytest.approx(2 + 2 / 3), 3)
+    assert records['onion'] == ('dimensionless', 1.25, 2)
+
+
+def test_aggregate_missing_name_and_invalid_quantity():
+    import pandas as pd
+
+    tables = {1: pd.DataFrame({'ingredient': ['onion', None, 'garlic',
+                                              'onion'],
+                               'quantity': ['1', '2', '/', '1/0'],
+                               'unit': [None, 'lb', None, 'cup']})}
+    df_aggregate = aggregate_ingredients(tables)
+    # Unnamed ingredient is not counted as (last) `garlic` and unparsable
+    # quantities are omitted.
+    assert (df_aggregate[['ingredient', 'unit', 'magnitude', 'count']]
+            .values.tolist() == [['onion', 'dimensionless', 1, 1]])
@@ -0,0 +1,28 @@
+'''
+``pytest-benchmark`` suite timing each parsing and rendering stage (see
+:func:`benchmark.suite_stages`), e.g., to save a baseline and fail on
+regressions::
+
+    python -m pytest dinner_daily_helpers/tests/test_benchmarks.py \\
+        --benchmark-autosave
+    python -m pytest dinner_daily_helpers/tests/test_benchmarks.py \\
+        --benchmark-compare --benchmark-compare-fail=mean:25%
+
+Skipped if ``pytest-benchmark`` is not installed.
+'''
+from __future__ import unicode_literals
+
+import pytest
+
+pytest.importorskip('pytest_benchmark')
+
+from ..benchmark import suite_stages  # noqa: E402
+
+STAGES = dict(suite_stages())
+
+
+@pytest.mark.parametrize('name', sorted(STAGES))
+def test_stage(benchmark, name):
+    benchmark.group = 'stages'
+    result = benchmark(STAGES[name])
+    assert result is not None
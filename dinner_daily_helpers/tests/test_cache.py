@@ -0,0 +1,41 @@
+from __future__ import unicode_literals
+
+import pandas as pd
+
+from . import read_fixture
+from .. import cache
+from ..cache import load_menu, load_shopping_list
+from ..menu import extract_menu, ingredients_table, plain_menu
+from ..shopping_list import extract_shopping_list
+
+
+def test_load_menu(tmpdir):
+    html = read_fixture('weekly-menu-new-header.html')
+    menu = plain_menu(extract_menu(html))
+    for i in range(2):
+        # Cache miss, then cache hit.
+        menu_i, df_ingredients = load_menu(html, cache_dir=str(tmpdir))
+        assert menu_i == menu
+        assert df_ingredients.equals(ingredients_table(menu))
+
+
+def test_load_shopping_list(tmpdir):
+    html = read_fixture('shopping-list.html')
+    df_list = extract_shopping_list(html)
+    for i in range(2):
+        assert load_shopping_list(html, cache_dir=str(tmpdir),
+                                  parser='lxml').equals(df_list)
+
+
+def test_key(tmpdir, monkeypatch):
+    parse_cache = cache.ParseCache(str(tmpdir))
+    key = parse_cache.key('<html></html>', 'menu')
+    assert parse_cache.key('<html></html>', 'menu') == key
+    assert parse_cache.key('<html></html>', 'menu', 'html5lib') != key
+    # Entries are invalidated when extraction output (or the version of a
+    # library used to pickle results) changes.
+    monkeypatch.setattr(cache, 'PARSER_VERSION', cache.PARSER_VERSION + 1)
+    key_i = parse_cache.key('<html></html>', 'menu')
+    assert key_i != key
+    monkeypatch.setattr(pd, '__version__', pd.__version__ + '+test')
+    assert parse_cache.key('<html></html>', 'menu') != key_i
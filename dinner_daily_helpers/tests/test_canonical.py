@@ -0,0 +1,83 @@
+from __future__ import unicode_literals
+
+import pandas as pd
+import pytest
+
+from ..canonical import (CanonicalIndex, TermTrie, accuracy_report,
+                         canonicalize, singular)
+
+
+@pytest.mark.parametrize('token, expected',
+                         [('berries', 'berry'), ('tomatoes', 'tomato'),
+                          ('onions', 'onion'), ('asparagus', 'asparagus'),
+                          ('swiss', 'swiss'), ('peas', 'pea'),
+                          ('kale', 'kale'), ('gas', 'gas')])
+def test_singular(token, expected):
+    assert singular(token) == expected
+
+
+def test_term_trie():
+    trie = TermTrie()
+    trie.add(['sesame'], 1)
+    trie.add(['sesame', 'oil'], 2)
+    trie.add(['oil'], 3)
+    trie.add(['olive', 'oil'], 4)
+    # Longest match at each start position, without overlapping matches.
+    assert (trie.matches('toasted sesame oil and olive oil'.split()) ==
+            [(1, 3, 2), (4, 6, 4)])
+    assert trie.matches('sesame seeds'.split()) == [(0, 1, 1)]
+    assert trie.matches(['salt']) == []
+    assert trie.matches([]) == []
+
+
+@pytest.mark.parametrize('raw_name, expected',
+                         [('Cauliflower, small', 'cauliflower'),
+                          ('cauliflower', 'cauliflower'),
+                          ('frozen corn (fresh works, too)', 'frozen corn'),
+                          ('onions, chopped', 'onion'),
+                          ('large onion', 'onion'),
+                          ('Tomatoes*', 'tomato'),
+                          ('can black beans', 'black bean'),
+                          ('garlic clove, minced', 'garlic'),
+                          ('garlic powder', 'garlic powder'),
+                          ('fresh parsley', 'parsley')])
+def test_canonical(raw_name, expected):
+    assert CanonicalIndex().canonical(raw_name) == expected
+
+
+def test_canonical_known_names():
+    index = CanonicalIndex(names=['sesame oil', 'oil', 'olive oil'])
+    # Longest known name contained in normalized name.
+    assert index.canonical('toasted sesame oil') == 'sesame oil'
+    assert index.canonical('extra virgin olive oil') == 'olive oil'
+    assert index.canonical('canola oil') == 'oil'
+    assert index.canonical('sesame seeds') == 'sesame seed'
+    # Adding a known name invalidates memoized canonical names.
+    index.add('sesame seeds')
+    assert index.canonical('toasted sesame seeds') == 'sesame seed'
+
+
+def test_canonicalize():
+    raw_names = pd.Series(['Onions', 'onion, small', None, 'Onions',
+                           'berries'], index=list('abcde'), name='ingredient')
+    canonical = CanonicalIndex().canonicalize(raw_names)
+    assert canonical.index.tolist() == list('abcde')
+    assert canonical.name == 'ingredient'
+    assert canonical.tolist() == ['onion', 'onion', None, 'onion', 'berry']
+    assert canonicalize(raw_names).tolist() == canonical.tolist()
+
+
+def test_accuracy_report():
+    raw_names = pd.Series(['Onions', 'onion, small', 'berries', None,
+                           'tomatoes'])
+    report = accuracy_report(raw_names, index=CanonicalIndex(),
+                             expected={'Onions': 'onion',
+                                       'berries': 'berries'})
+    assert report['raw_names'] == 4
+    assert report['canonical_names'] == 3
+    assert report['merged'] == {'onion': ['Onions', 'onion, small']}
+    assert report['labelled'] == 2
+    assert report['correct'] == 1
+    assert report['accuracy'] == 0.5
+    assert report['errors'] == [('berries', 'berries', 'berry')]
+    assert 'accuracy' not in accuracy_report(raw_names)
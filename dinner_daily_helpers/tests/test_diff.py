@@ -0,0 +1,96 @@
+from __future__ import unicode_literals
+import copy
+
+import pytest
+
+from . import read_fixture
+from ..diff import (diff_menus, diff_shopping_lists, menu_digest,
+                    shopping_list_digest)
+from ..menu import extract_menu, plain_menu
+from ..shopping_list import (ShoppingListItem, extract_shopping_list,
+                             iter_shopping_list)
+
+
+@pytest.fixture(scope='module')
+def menu():
+    return plain_menu(extract_menu(read_fixture('weekly-menu-new-header'
+                                                '.html')))
+
+
+@pytest.fixture(scope='module')
+def shopping_list():
+    return list(iter_shopping_list(read_fixture('shopping-list.html')))
+
+
+def test_diff_menus_unchanged(menu):
+    assert diff_menus(menu, copy.deepcopy(menu)) == {'changed': False}
+    # Digest does not depend on key order.
+    reordered = dict(reversed(list(copy.deepcopy(menu).items())))
+    assert menu_digest(reordered) == menu_digest(menu)
+    assert diff_menus(menu, reordered) == {'changed': False}
+
+
+def test_diff_menus_meals(menu):
+    new = copy.deepcopy(menu)
+    removed = new['meals'].pop(1)
+    added = copy.deepcopy(new['meals'][0])
+    added['main_dish']['title'] = 'Chicken Fajitas'
+    new['meals'].append(added)
+    new['date'] = 'Mar 31 to 06'
+    assert diff_menus(menu, new) == \
+        {'changed': True,
+         'fields': {'date': [menu['date'], 'Mar 31 to 06']},
+         'meals': {'added': ['Chicken Fajitas'],
+                   'removed': [removed['main_dish']['title']]}}
+    # Reordered menu is changed, but each meal is matched as unchanged.
+    new = copy.deepcopy(menu)
+    new['meals'].reverse()
+    assert diff_menus(menu, new) == {'changed': True}
+
+
+def test_diff_menus_ingredient_quantity(menu):
+    new = copy.deepcopy(menu)
+    meal = new['meals'][0]
+    ingredients = meal['main_dish']['ingredients']
+    old_ingredient = ingredients[0]
+    assert old_ingredient == '3/4 lb chicken breast tenders'
+    ingredients[0] = '1 lb chicken breast tenders'
+    ingredients.append('1 tsp chili powder')
+    meal['duration'] = '35 min'
+    assert diff_menus(menu, new) == \
+        {'changed': True,
+         'meals': {'modified':
+                   [{'title': meal['main_dish']['title'],
+                     'fields': {'duration': ['30 min', '35 min']},
+                     'recipes': {'modified':
+                                 [{'title': meal['main_dish']['title'],
+                                   'ingredients':
+                                   {'added': ['1 tsp chili powder'],
+                                    'quantity':
+                                    [[old_ingredient,
+                                      '1 lb chicken breast tenders']]}}]}}]}}
+
+
+def test_diff_shopping_lists_unchanged(shopping_list):
+    html = read_fixture('shopping-list.html')
+    df_list = extract_shopping_list(html)
+    # Records and table of the same list, in a different order.
+    assert diff_shopping_lists(shopping_list, df_list) == {'changed': False}
+    assert (shopping_list_digest(shopping_list[::-1]) ==
+            shopping_list_digest(df_list))
+
+
+def test_diff_shopping_lists(shopping_list):
+    new = list(shopping_list)
+    removed = new.pop(0)
+    # Quantity change.
+    i, old_item = next((i, item) for i, item in enumerate(new)
+                       if item.quantity == '3/4 lb')
+    new[i] = old_item._replace(quantity='1 lb')
+    added = ShoppingListItem('produce', 2, 'limes', False, '2')
+    new.append(added)
+    assert diff_shopping_lists(shopping_list, new) == \
+        {'changed': True, 'added': [added._asdict()],
+         'removed': [removed._asdict()],
+         'quantity': [dict(old_item._asdict(), quantity=['3/4 lb', '1 lb'])]}
+    assert shopping_list_digest(new) != shopping_list_digest(shopping_list)
@@ -0,0 +1,73 @@
+from __future__ import unicode_literals
+import os
+
+import pytest
+import requests
+
+from . import read_fixture
+from .conftest import BROKEN_STORE
+from ..download import MANIFEST_NAME, download_many, header_date, menu_date
+
+
+def test_download_many(tmpdir, menus_url):
+    errors = {}
+    results = download_many(['Any Store', BROKEN_STORE], ['current'],
+                            str(tmpdir), session=requests.Session(),
+                            base_url=menus_url, errors=errors)
+    assert list(errors) == [(BROKEN_STORE, 'current')]
+    paths = results[('Any Store', 'current')]
+    date = menu_date(read_fixture('weekly-menu-new-header.html'))
+    assert [os.path.basename(path) for path in paths] == \
+        ['%s-%s-Any Store.html' % (date.strftime('%Y-%m-%d'), page)
+         for page in ('weekly-menu', 'shopping-list')]
+    assert all(os.path.exists(path) for path in paths)
+    # Manifest is only written by incremental downloads.
+    assert not tmpdir.join(MANIFEST_NAME).check()
+
+
+def test_download_many_incremental(tmpdir, menus_url):
+    reports = []
+    for i in range(2):
+        report = {}
+        download_many(['Any Store'], ['current'], str(tmpdir),
+                      session=requests.Session(), base_url=menus_url,
+                      incremental=True, report=report)
+        assert tmpdir.join(MANIFEST_NAME).check()
+        reports.append(report)
+        if i == 0:
+            # Mark files as old to detect rewrites.
+            for path in report['fetched']:
+                os.utime(path, (0, 0))
+    assert len(reports[0]['fetched']) == 2
+    assert reports[0]['bytes_saved'] == 0
+    # Pages are unchanged since first download, i.e., server responds with
+    # `304 Not Modified` to conditional requests.
+    assert sorted(reports[1]['skipped']) == sorted(reports[0]['fetched'])
+    assert not reports[1]['fetched']
+    assert all(os.path.getmtime(path) == 0 for path in reports[1]['skipped'])
+    assert reports[1]['bytes_saved'] == \
+        sum(len(read_fixture(name).encode('utf8'))
+            for name in ('weekly-menu-new-header.html', 'shopping-list.html'))
+
+
+@pytest.mark.parametrize('header, expected', [
+    # Old and new format.
+    ('<header><h1>Weekly Menu</h1><h2>Any Store - Oct 28 to 03 - 4 '
+     'servings</h2></header>', 'Any Store - Oct 28 to 03 - 4 servings'),
+    ('<header><div class="theme-date">Week of - Oct 28 to 03</div>'
+     '</header>', 'Week of - Oct 28 to 03'),
+    # Class on any tag.
+    ('<header><p><span class="theme-date">Week of - Oct 28 to 03</span>'
+     '</p></header>', 'Week of - Oct 28 to 03'),
+    # Implicitly closed `p` and `li` elements before `header > h2`.
+    ('<header><p>Welcome<p>back<ul><li>a<li>b</ul><br><h2>Any Store - '
+     'Oct 28 to 03 - 4 servings</h2></header>',
+     'Any Store - Oct 28 to 03 - 4 servings'),
+    # Nested `h2` is not the header date; stray end tags are ignored.
+    ('<header></p><div><h2>Recipes</h2></div><ul><li>x</ul>'
+     '<div class="theme-date">Week of - Oct 28 to 03<p>!</div></header>',
+     'Week of - Oct 28 to 03!'),
+    ('<header><h1>Weekly Menu</h1></header><h2>Oct 28 to 03</h2>', None),
+    ('<html><h2>Oct 28 to 03</h2></html>', None)])
+def test_header_date(header, expected):
+    assert header_date('<html><body>%s</body></html>' % header) == expected
@@ -0,0 +1,61 @@
+from __future__ import unicode_literals
+import re
+
+import pytest
+
+from . import read_fixture
+from .. import get_section_ingredients
+from ..dump_list import dump_list, dump_lists, table_html
+from ..shopping_list import extract_shopping_list
+
+
+def test_dump_lists():
+    html = read_fixture('shopping-list.html')
+    df_ingredients = get_section_ingredients(html)
+    # Tables hold `pint` quantities with custom units (e.g., `package`).
+    assert (df_ingredients['quantity_imperial']
+            .map(lambda quantity: str(getattr(quantity, 'units', '')))
+            .eq('package').any())
+    documents = dump_lists({'table': df_ingredients, 'html': html},
+                           processes=2)
+    assert documents == {'table': dump_list(df_ingredients),
+                         'html': dump_list(df_ingredients)}
+
+
+def _normalize_whitespace(html):
+    # Remove whitespace around tags (e.g., added by `prettify()`), and
+    # collapse remaining runs of whitespace.
+    html = re.sub(r'\s*(<[^>]+>)\s*', r'\1', html)
+    return re.sub(r'\s+', ' ', html).strip()
+
+
+def _baseline_table_html(df_ingredients):
+    # Table as previously rendered by `dump_list()`, by reparsing the output
+    # of `to_html()` using `html5lib` and pretty-printing it.
+    import bs4
+
+    soup = bs4.BeautifulSoup(df_ingredients.to_html(), 'html5lib')
+    table = soup.find('table')
+    table.attrs['class'] = 'table table-striped'
+    del table.attrs['border']
+    prettified = soup.prettify()
+    return prettified[prettified.index('<table'):
+                      prettified.index('</table>') + len('</table>')]
+
+
+@pytest.mark.parametrize('compact', [False, True])
+def test_table_html(compact):
+    import pandas as pd
+
+    html = read_fixture('shopping-list.html')
+    # Text with characters escaped in HTML, and missing values.
+    df_special = pd.DataFrame({'ingredient': ['beans, drained & rinsed',
+                                              'salt <to taste>', 'oil'],
+                               'quantity': ['8 oz', None, float('nan')]})
+    for df_ingredients in (get_section_ingredients(html, compact=compact),
+                           extract_shopping_list(html), df_special):
+        expected = _baseline_table_html(df_ingredients)
+        assert (_normalize_whitespace(table_html(df_ingredients)) ==
+                _normalize_whitespace(expected))
+        assert dump_list(df_ingredients).count(table_html(df_ingredients)) \
+            == 1
@@ -0,0 +1,74 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from . import read_fixture
+from .. import parse_html
+from .legacy import (legacy_decode_ingredients, legacy_default_units,
+                     legacy_extract_meal)
+from ..menu import (CRE_MEAL_ID, decode_ingredient, decode_ingredients,
+                    extract_meal, ingredients_table)
+from ..synthetic import synthetic_menu, weekly_menu_html
+
+
+#: Meal with duration, nutrition and notes nested in the dishes (instead of
+#: following them).
+NESTED_MEAL = '''
+<ul id="menu"><li id="item-1" class="menu-item">
+<h3><span class="label">Tuscan Bean Soup</span></h3>
+<div class="dishes"><div class="details">
+<span class="duration">35 min</span>
+<ul><li>15 oz cannellini beans</li><li>2 oz chicken broth</li></ul>
+<div class="instructions"><p>Simmer beans in broth.  Serve hot.</p></div>
+<div class="recipe-notes"><p>Freezes well.</p></div>
+</div><div class="side-dishes"><div class="details">
+<h5 class="side-heading"><span class="label">Green Beans</span></h5>
+<ul><li>1/2 lb green beans</li></ul>
+<div class="instructions"><p>Steam green beans.</p></div>
+</div><ul class="nutrition"><li>310 calories</li><li>18g protein</li></ul>
+</div></div></li></ul>
+'''
+
+
+@pytest.mark.parametrize('parser', ['lxml', 'html5lib', 'html.parser'])
+def test_extract_meal(parser):
+    htmls = [read_fixture('weekly-menu-old-header.html'),
+             read_fixture('weekly-menu-new-header.html'),
+             weekly_menu_html(synthetic_menu(meals=10)), NESTED_MEAL]
+    for html in htmls:
+        meal_items = parse_html(html, parser).find_all('li', id=CRE_MEAL_ID)
+        assert meal_items
+        for meal_item in meal_items:
+            assert extract_meal(meal_item) == legacy_extract_meal(meal_item)
+
+    meal = extract_meal(parse_html(NESTED_MEAL, parser)
+                        .find('li', id=CRE_MEAL_ID))
+    assert meal == {'main_dish': {'title': 'Tuscan Bean Soup',
+                                  'ingredients': ['15 oz cannellini beans',
+                                                  '2 oz chicken broth'],
+                                  'instructions': ['Simmer beans in broth.',
+                                                   'Serve hot.']},
+                    'side_dishes': [{'title': 'Green Beans',
+                                     'ingredients': ['1/2 lb green beans'],
+                                     'instructions': ['Steam green beans.']}],
+                    'duration': '35 min',
+                    'nutrition': ['310 calories', '18g protein'],
+                    'notes': ['Freezes well.']}
+
+
+def test_decode_ingredients():
+    ingredients = ingredients_table(synthetic_menu(meals=20),
+                                    decode_processing=False).ingredient
+    df_decoded = decode_ingredients(ingredients, typed=False)
+    assert df_decoded.equals(legacy_decode_ingredients(ingredients))
+    assert df_decoded.equals(legacy_decode_ingredients
+                             (ingredients, default_units=legacy_default_units))
+
+
+def test_decode_ingredient():
+    assert decode_ingredient('1/4 onion, small, chopped') == \
+        ('1/4', 'each', 'onion, small', 'chopped')
+    assert decode_ingredient('1 1/2 cups brown rice') == \
+        ('1 1/2', 'cups', 'brown rice', None)
+    assert decode_ingredient('salt and pepper') == \
+        (None, None, 'salt and pepper', None)
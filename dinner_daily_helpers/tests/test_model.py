@@ -0,0 +1,26 @@
+from __future__ import unicode_literals
+
+from . import read_fixture
+from ..menu import decode_ingredients
+from ..model import Ingredient, Menu
+from ..synthetic import SAMPLE_INGREDIENTS
+
+
+def test_ingredient_decode():
+    ingredients = SAMPLE_INGREDIENTS + ['1/4 onion, small, chopped',
+                                        '2 garlic cloves', 'salt']
+    df_decoded = decode_ingredients(ingredients, typed=False)
+    for ingredient, row in zip(ingredients,
+                               df_decoded.to_dict(orient='records')):
+        expected = {k: None if v != v else v for k, v in row.items()}
+        assert Ingredient(ingredient).decode() == expected
+    assert Ingredient('1/4 onion, small, chopped').decode() == \
+        {'quantity': '1/4', 'unit': 'each', 'description': 'onion, small',
+         'processing': 'chopped'}
+
+
+def test_menu_round_trip():
+    menu = Menu.from_html(read_fixture('weekly-menu-new-header.html'))
+    assert menu.meals
+    assert Menu.from_json(menu.to_json()) == menu
+    assert Menu.from_dict(menu.to_dict()) == menu
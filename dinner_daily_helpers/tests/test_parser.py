@@ -0,0 +1,99 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from . import read_fixture
+from .. import (FALLBACK_PARSER, get_section_ingredients,
+                get_staple_ingredients, parser_fallback, staple_frequency)
+from ..menu import extract_menu, plain_menu
+from ..shopping_list import extract_shopping_list
+
+PARSERS = ('lxml', 'html5lib')
+
+
+@pytest.mark.parametrize('name', ['weekly-menu-old-header.html',
+                                  'weekly-menu-new-header.html'])
+def test_extract_menu_parity(name):
+    html = read_fixture(name)
+    menus = [plain_menu(extract_menu(html, parser=parser))
+             for parser in PARSERS]
+    assert menus[0]['meals']
+    assert menus[0] == menus[1]
+
+
+def test_extract_shopping_list_parity():
+    html = read_fixture('shopping-list.html')
+    tables = [extract_shopping_list(html, parser=parser)
+              for parser in PARSERS]
+    assert len(tables[0])
+    assert tables[0].equals(tables[1])
+
+
+def test_get_section_ingredients_parity():
+    html = read_fixture('shopping-list.html')
+    tables = [get_section_ingredients(html, parser=parser)
+              for parser in PARSERS]
+    assert len(tables[0])
+    assert tables[0].equals(tables[1])
+
+
+def test_get_staple_ingredients_parity():
+    html = read_fixture('shopping-list.html')
+    staples = [get_staple_ingredients(html, parser=parser)
+               for parser in PARSERS]
+    assert staples[0]
+    assert staples[0] == staples[1]
+
+
+@parser_fallback
+def _extract(html, parser=None, strict=False):
+    if parser != FALLBACK_PARSER:
+        raise AttributeError('`%s` parser failed' % parser)
+    return html, parser, strict
+
+
+@pytest.mark.parametrize('args, kwargs', [(('<p/>', 'lxml'), {}),
+                                          (('<p/>', ), {'parser': 'lxml'}),
+                                          (('<p/>', 'lxml', True), {}),
+                                          (('<p/>', ), {})])
+def test_parser_fallback(args, kwargs):
+    result = _extract(*args, **kwargs)
+    assert result[:2] == ('<p/>', FALLBACK_PARSER)
+    assert result[2] == (len(args) > 2)
+
+
+def test_parser_fallback_raises_extraction_error():
+    # Extraction error is raised (rather than, e.g., `TypeError` from the
+    # retry) if both parsers fail, including if `parser` is positional.
+    for args in (('<html><body>bad</body></html>', 'lxml'),
+                 ('<html><body>bad</body></html>', )):
+        with pytest.raises(ValueError):
+            extract_menu(*args)
+
+
+def _staples_html(*recipes):
+    # Shopping list with staples of each recipe, e.g., `"olive oil, *salt"`.
+    return ('<html><body><section id="menu-key"><div id="staple"><ul '
+            'class="shopping-list">%s</ul></div></section></body></html>' %
+            ''.join('<li><span>%d</span><span>%s</span></li>' %
+                    (i + 1, staples) for i, staples in enumerate(recipes)))
+
+
+def test_staple_frequency():
+    htmls = [_staples_html('Olive oil, salt', 'olive oil'),
+             _staples_html('salt, *butter'), _staples_html('olive oil')]
+    # Documents are only iterated once.
+    df_staples = staple_frequency(iter(htmls))
+    assert df_staples.index.name == 'staple'
+    assert df_staples.index.tolist() == ['olive oil', 'salt', 'butter']
+    assert df_staples['weeks'].tolist() == [2, 2, 1]
+    assert df_staples['recipes'].tolist() == [3, 2, 1]
+    assert df_staples['frequency'].tolist() == \
+        pytest.approx([2 / 3, 2 / 3, 1 / 3])
+
+
+def test_staple_frequency_empty():
+    df_staples = staple_frequency([])
+    assert df_staples.empty
+    assert df_staples.index.name == 'staple'
+    assert df_staples.columns.tolist() == ['weeks', 'recipes', 'frequency']
@@ -0,0 +1,76 @@
+from __future__ import unicode_literals
+import asyncio
+import gc
+import io
+import json
+import logging
+import os
+
+import requests
+
+from . import read_fixture
+from .conftest import BROKEN_STORE, INVALID_STORE
+from ..download import PAGES
+from ..menu import extract_menu, plain_menu
+from ..pipeline import FORMATS, pipeline, process_menu, run_pipeline
+
+
+def test_process_menu():
+    html = read_fixture('weekly-menu-new-header.html')
+    date, outputs = process_menu(html, formats=FORMATS)
+    assert sorted(outputs) == sorted(FORMATS)
+    assert json.loads(outputs['json']) == plain_menu(extract_menu(html))
+    assert outputs['md'].startswith('#')
+    assert '<table' in outputs['html']
+
+
+def test_pipeline(tmpdir, menus_url):
+    errors = {}
+    paths = pipeline(['Any Store', BROKEN_STORE, INVALID_STORE],
+                     ['current', 'previous'], str(tmpdir),
+                     session=requests.Session(), processes=2,
+                     formats=FORMATS, base_url=menus_url, errors=errors)
+
+    assert sorted(paths) == [('Any Store', 'current'),
+                             ('Any Store', 'previous')]
+    assert sorted(errors) == [(store, week)
+                              for store in (BROKEN_STORE, INVALID_STORE)
+                              for week in ('current', 'previous')]
+    assert all(isinstance(errors[(INVALID_STORE, week)], ValueError)
+               for week in ('current', 'previous'))
+
+    date, outputs = process_menu(read_fixture('weekly-menu-new-header.html'),
+                                 formats=FORMATS)
+    paths_i = paths[('Any Store', 'current')]
+    assert sorted(paths_i) == sorted(list(PAGES) +
+                                     ['menu.%s' % format_
+                                      for format_ in FORMATS])
+    assert os.path.basename(paths_i['weekly-menu']) == \
+        '%s-weekly-menu-Any Store.html' % date
+    for format_, text in outputs.items():
+        with io.open(paths_i['menu.%s' % format_], encoding='utf8') as input_:
+            assert input_.read() == text
+    assert sorted(os.listdir(str(tmpdir))) == \
+        sorted(os.path.basename(path) for path in paths_i.values())
+
+
+def test_pipeline_failed_weeks(tmpdir, menus_url):
+    # Shopping list download of a week whose weekly menu failed must be
+    # awaited, i.e., no "Future exception was never retrieved" errors.
+    contexts = []
+    loop = asyncio.new_event_loop()
+    loop.set_exception_handler(lambda loop, context:
+                               contexts.append(context))
+    # Log records would keep failed weeks (and their futures) alive.
+    logging.disable(logging.ERROR)
+    try:
+        paths = loop.run_until_complete(
+            run_pipeline([BROKEN_STORE, INVALID_STORE], ['current'],
+                         str(tmpdir), session=requests.Session(),
+                         processes=1, base_url=menus_url))
+    finally:
+        logging.disable(logging.NOTSET)
+        loop.close()
+    assert not paths
+    gc.collect()
+    assert not contexts
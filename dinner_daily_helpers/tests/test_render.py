@@ -0,0 +1,120 @@
+from __future__ import unicode_literals
+import io
+import os
+import re
+import subprocess as sp
+import sys
+
+import pytest
+
+from ..batch import iter_extract_menus
+from ..render import generate_html, generate_markdown, write_menus
+from ..synthetic import synthetic_menu, weekly_menu_html
+
+RULE = '\n%s\n\n' % ('-' * 72)
+
+
+def _menus():
+    menus = [synthetic_menu(meals=2, seed=i) for i in range(3)]
+    for i, menu_i in enumerate(menus):
+        menu_i['date'] = 'Jan %02d to %02d' % (7 * i + 6, 7 * i + 12)
+    return menus
+
+
+def _once(menus):
+    # One-pass iterable, e.g., menus as they are extracted.
+    for menu_i in menus:
+        yield menu_i
+
+
+def _toc_links(menus):
+    return ['<a href="#menu-%d">Weekly Menu (Any Store, %s)</a>' %
+            (i + 1, menu_i['date']) for i, menu_i in enumerate(menus)]
+
+
+def test_generate_markdown():
+    menus = _menus()
+    markdown_ = ''.join(generate_markdown(menus, title='Q1'))
+    toc = ''.join(' - %s\n' % link for link in _toc_links(menus))
+    assert markdown_.startswith('# Q1\n\n' + toc + RULE)
+    assert re.findall(r'<a id="(menu-\d+)"></a>', markdown_) == \
+        ['menu-1', 'menu-2', 'menu-3']
+    titles = [meal_j['main_dish']['title'] for menu_i in menus
+              for meal_j in menu_i['meals']]
+    assert all(title in markdown_ for title in titles)
+
+    # Menus from one-pass iterable are rendered in the same way, followed by
+    # the table of contents.
+    streamed = ''.join(generate_markdown(_once(menus), title='Q1'))
+    menus_markdown = markdown_[len('# Q1\n\n' + toc):]
+    assert streamed == ('# Q1\n\n' + menus_markdown + RULE +
+                        '## Contents\n\n' + toc)
+
+
+def test_generate_html():
+    menus = _menus()
+    html = ''.join(generate_html(menus, title='Q1'))
+    assert '<title>Q1</title>' in html
+    toc = '<ul>\n%s</ul>' % ''.join('<li>%s</li>\n' % link
+                                    for link in _toc_links(menus))
+    nav = ('<nav id="TOC">\n<h1 class="toc-title">Contents</h1>\n%s\n'
+           '</nav>\n' % toc)
+    assert html.index(nav) < html.index('<section id="menu-1">')
+    assert re.findall(r'<section id="(menu-\d+)">', html) == \
+        ['menu-1', 'menu-2', 'menu-3']
+    # Heading IDs are unique across menus.
+    ids = re.findall(r'<h\d id="([^"]+)"', html)
+    assert len(ids) == len(set(ids)) > len(menus)
+    assert all(re.match(r'^menu-[1-3]-', id_) for id_ in ids)
+
+    streamed = ''.join(generate_html(_once(menus), title='Q1'))
+    assert streamed.count(nav) == 1
+    assert streamed.index(nav) > streamed.index('<section id="menu-3">')
+    # Same document, with table of contents moved after the menus.
+    assert (streamed.replace('<hr>\n' + nav, '') ==
+            html.replace('<hr>\n' + nav + '<hr>\n', ''))
+
+
+@pytest.mark.parametrize('format_, generate', [('md', generate_markdown),
+                                               ('html', generate_html)])
+def test_write_menus(format_, generate):
+    menus = _menus()
+    output = io.StringIO()
+    write_menus(_once(menus), output, format_=format_, title='Q1')
+    assert output.getvalue() == ''.join(generate(_once(menus), title='Q1'))
+    with pytest.raises(ValueError):
+        write_menus(menus, io.StringIO(), format_='pdf')
+
+
+def test_iter_extract_menus_ordered(tmpdir):
+    paths = []
+    for i, menu_i in enumerate(_menus()):
+        path = os.path.join(str(tmpdir), '2019-01-%02d-weekly-menu-any.html'
+                            % (7 * i + 6))
+        with io.open(path, 'w', encoding='utf8') as output:
+            output.write(weekly_menu_html(menu_i))
+        paths.append(path)
+    broken = os.path.join(str(tmpdir), '2019-01-05-weekly-menu-any.html')
+    with io.open(broken, 'w', encoding='utf8') as output:
+        output.write('<html></html>')
+    paths.insert(1, broken)
+
+    results = list(iter_extract_menus(paths, processes=2, ordered=True))
+    assert [path for path, menu, error in results] == paths
+    assert [error is None for path, menu, error in results] == \
+        [True, False, True, True]
+    assert [menu['date'] for path, menu, error in results if menu] == \
+        ['Jan 06 to 12', 'Jan 13 to 19', 'Jan 20 to 26']
+
+    # Command line interface renders menus in order of path (skipping the
+    # broken menu).
+    output_path = os.path.join(str(tmpdir), 'menus.md')
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    sp.check_call([sys.executable, '-m', 'dinner_daily_helpers.render',
+                   str(tmpdir), output_path, '--markdown', '-j', '2'],
+                  cwd=os.path.abspath(root))
+    with io.open(output_path, encoding='utf8') as input_:
+        markdown_ = input_.read()
+    assert (re.findall(r'\(Any Store, (Jan \d+ to \d+)\)</a>',
+                       markdown_.split('## Contents')[1]) ==
+            ['Jan 06 to 12', 'Jan 13 to 19', 'Jan 20 to 26'])
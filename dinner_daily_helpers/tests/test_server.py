@@ -0,0 +1,43 @@
+from __future__ import unicode_literals
+import os
+import subprocess as sp
+import sys
+import threading
+
+import requests
+
+from . import read_fixture
+from ..server import RenderServer
+
+
+def test_warm_up_imports():
+    # Heavy dependencies are imported lazily, so warm-up must exercise them.
+    code = ('import sys\n'
+            'from dinner_daily_helpers.server import warm_up\n'
+            'warm_up()\n'
+            'print(" ".join(sorted(m for m in ("bs4", "lxml", "markdown", '
+            '"pandas", "pint", "jinja2") if m in sys.modules)))')
+    root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+    output = sp.check_output([sys.executable, '-c', code],
+                             cwd=os.path.abspath(root)).decode('utf8')
+    assert output.split() == ['bs4', 'jinja2', 'lxml', 'markdown', 'pandas',
+                              'pint']
+
+
+def test_render_server():
+    server = RenderServer(('127.0.0.1', 0), workers=1)
+    thread = threading.Thread(target=server.serve_forever)
+    thread.daemon = True
+    thread.start()
+    try:
+        url = 'http://%s:%d' % server.server_address[:2]
+        response = requests.post(url + '/menu?format=markdown',
+                                 data=read_fixture('weekly-menu-new-header'
+                                                   '.html').encode('utf8'))
+        assert response.status_code == 200
+        assert response.text.startswith('#')
+        assert requests.post(url + '/menu',
+                             data=b'<html></html>').status_code == 400
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,42 @@
+from __future__ import unicode_literals
+import io
+
+import pandas as pd
+import pytest
+
+from . import read_fixture
+from ..shopping_list import FIELDS, extract_shopping_list, iter_shopping_list
+
+SORT_KEYS = ['category', 'ingredient', 'meal']
+
+
+def _sorted(df_items):
+    return (df_items.sort_values(SORT_KEYS).reset_index(drop=True)
+            [list(FIELDS)])
+
+
+def test_iter_shopping_list():
+    html = read_fixture('shopping-list.html')
+    df_items = pd.DataFrame(list(iter_shopping_list(html)), columns=FIELDS)
+    assert len(df_items)
+    assert _sorted(df_items).equals(extract_shopping_list(html))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 7, 4096])
+def test_iter_shopping_list_chunks(chunk_size):
+    html = read_fixture('shopping-list.html')
+    assert (list(iter_shopping_list(io.StringIO(html),
+                                    chunk_size=chunk_size)) ==
+            list(iter_shopping_list(html)))
+
+
+def test_iter_shopping_list_csv():
+    html = read_fixture('shopping-list.html')
+    lines = list(iter_shopping_list(io.StringIO(html), csv=True,
+                                    chunk_size=256))
+    assert lines[0] == ','.join(FIELDS) + '\n'
+    df_items = pd.read_csv(io.StringIO(''.join(lines)), dtype=str)
+    df_expected = pd.read_csv(io.StringIO(extract_shopping_list(html,
+                                                                csv=True)),
+                              dtype=str)
+    assert _sorted(df_items).equals(_sorted(df_expected))
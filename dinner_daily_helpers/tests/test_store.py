@@ -0,0 +1,89 @@
+from __future__ import unicode_literals
+import io
+import os
+
+import pytest
+
+from . import read_fixture
+from ..store import MenuStore, duration_minutes
+
+FIXTURES = {'2019-01-06-weekly-menu-giant.html':
+            'weekly-menu-new-header.html',
+            '2019-01-13-weekly-menu-safeway.html':
+            'weekly-menu-old-header.html'}
+
+
+@pytest.fixture
+def menu_paths(tmpdir):
+    paths = []
+    for name, fixture in sorted(FIXTURES.items()):
+        path = os.path.join(str(tmpdir), name)
+        with io.open(path, 'w', encoding='utf8') as output:
+            output.write(read_fixture(fixture))
+        paths.append(path)
+    return paths
+
+
+@pytest.mark.parametrize('duration, expected',
+                         [('30 min', 30), ('1 hr 15 min', 75),
+                          ('2 hours', 120), ('', None), (None, None),
+                          ('overnight', None)])
+def test_duration_minutes(duration, expected):
+    assert duration_minutes(duration) == expected
+
+
+def test_ingest_dedupe(menu_paths):
+    with MenuStore() as store:
+        assert store.ingest_files(menu_paths, processes=2) == 2
+        # Same documents are not ingested again.
+        assert store.ingest_files(menu_paths, processes=2) == 0
+        for path in menu_paths:
+            with io.open(path, encoding='utf8') as input_:
+                assert not store.ingest(input_.read(), path=path)
+        assert len(store.menus()) == 2
+        assert store.query('SELECT COUNT(*) AS n FROM meals')['n'][0] == 10
+
+
+def test_queries(menu_paths):
+    with MenuStore() as store:
+        for path in menu_paths:
+            with io.open(path, encoding='utf8') as input_:
+                assert store.ingest(input_.read(), path=path)
+
+        df_menus = store.menus()
+        assert df_menus['start_date'].tolist() == ['2019-01-06',
+                                                   '2019-01-13']
+        # Store is extracted from menu (not from path).
+        assert df_menus['store'].tolist() == ['Any Store'] * 2
+        assert len(store.menus(store='Any Store')) == 2
+        assert store.menus(store='giant').empty
+        assert store.menus(start='2019-01-07')['start_date'].tolist() == \
+            ['2019-01-13']
+        assert store.menus(end='2019-01-06')['start_date'].tolist() == \
+            ['2019-01-06']
+        assert len(store.menus(ingredient='ground turkey')) == 2
+        assert store.menus(ingredient='unobtainium').empty
+        menu = store.menu(df_menus['menu_id'][0])
+        assert len(menu['meals']) == 5
+        with pytest.raises(KeyError):
+            store.menu(-1)
+
+        df_meals = store.meals(ingredient='ground turkey')
+        assert df_meals['main_dish'].tolist() == \
+            ['Turkey Burgers with Feta'] * 2
+        assert df_meals['duration_minutes'].tolist() == [30, 30]
+        df_meals = store.meals(end='2019-01-06', ingredient='olive oil')
+        assert (df_meals['start_date'] == '2019-01-06').all()
+        assert 1 < len(df_meals) <= 5
+
+        df_ingredients = store.ingredients(ingredient='olive oil')
+        assert len(df_ingredients) == 8
+        assert set(df_ingredients['canonical']) == {'olive oil'}
+        assert (store.ingredients(start='2019-01-13')['start_date'] ==
+                '2019-01-13').all()
+        df_turkey = store.ingredients(end='2019-01-06',
+                                      ingredient='ground turkey')
+        assert len(df_turkey) == 1
+        # Quantity in base units, e.g., `3/4 lb` in grams.
+        assert df_turkey['base_unit'][0] == 'gram'
+        assert df_turkey['magnitude'][0] == pytest.approx(0.75 * 453.59237)
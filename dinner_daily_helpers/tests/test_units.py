@@ -0,0 +1,32 @@
+from __future__ import unicode_literals
+
+import pytest
+
+from .. import CUSTOM_UNITS, is_unit, quantity_columns
+
+
+@pytest.mark.parametrize('token', ['cup', 'cups', 'lb', 'oz', 'tsp'] +
+                         list(CUSTOM_UNITS))
+def test_is_unit(token):
+    assert is_unit(token) is True
+
+
+@pytest.mark.parametrize('token', ['(15', 'lb)', '15-oz', 'lb/', '*', '~',
+                                   'lb/0', 'onion,', 'chicken'])
+def test_is_unit_not_unit(token):
+    assert is_unit(token) is False
+
+
+def test_quantity_columns_errors():
+    import pandas as pd
+
+    quantities = pd.Series(['3/4 lb', '/', None, '2'])
+    with pytest.raises(AssertionError):
+        quantity_columns(quantities)
+    df_quantities = quantity_columns(quantities, errors='coerce')
+    assert df_quantities['magnitude'].tolist()[::3] == [0.75, 2]
+    assert df_quantities['magnitude'].iloc[1:3].isna().all()
+    assert df_quantities['unit'].isna().tolist() == [False, True, True,
+                                                      False]
+    assert (df_quantities['unit'].dropna().tolist() ==
+            ['pound', 'dimensionless'])